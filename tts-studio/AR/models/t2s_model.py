@@ -5,11 +5,12 @@ import random
 import numpy as np
 
 from tqdm import tqdm
-from typing import List
+from typing import Callable, List, Optional
 from AR.models.utils import make_pad_mask
 from AR.models.utils import (
     topk_sampling,
     sample,
+    sample_fused,
     logits_to_probs,
     multinomial_sample_one_no_sync,
     dpo_loss,
@@ -100,7 +101,7 @@ class T2SBlock:
 
         attn = F.scaled_dot_product_attention(q, k, v, ~attn_mask)
 
-        attn = attn.permute(2, 0, 1, 3).reshape(batch_size, -1, self.hidden_dim)
+        attn = attn.transpose(1, 2).reshape(batch_size, q_len, self.hidden_dim)
         attn = F.linear(attn, self.out_w, self.out_b)
 
         x = F.layer_norm(
@@ -115,7 +116,8 @@ class T2SBlock:
         )
         return x, k_cache, v_cache
 
-    def decode_next_token(self, x, k_cache, v_cache):
+    def decode_next_token(self, x, k_cache, v_cache, attn_mask: Optional[torch.Tensor] = None):
+        # attn_mask: (bsz, 1, 1, kv_len), True 为屏蔽, 仅在 batch 中含 padding 时需要
         q, k, v = F.linear(x, self.qkv_w, self.qkv_b).chunk(3, dim=-1)
 
         k_cache = torch.cat([k_cache, k], dim=1)
@@ -129,9 +131,12 @@ class T2SBlock:
         k = k_cache.view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
         v = v_cache.view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
 
-        attn = F.scaled_dot_product_attention(q, k, v)
+        if attn_mask is not None:
+            attn = F.scaled_dot_product_attention(q, k, v, ~attn_mask)
+        else:
+            attn = F.scaled_dot_product_attention(q, k, v)
 
-        attn = attn.permute(2, 0, 1, 3).reshape(batch_size, -1, self.hidden_dim)
+        attn = attn.transpose(1, 2).reshape(batch_size, q_len, self.hidden_dim)
         attn = F.linear(attn, self.out_w, self.out_b)
 
         x = F.layer_norm(
@@ -146,6 +151,48 @@ class T2SBlock:
         )
         return x, k_cache, v_cache
 
+    def process_prompt_static(self, x, attn_mask: torch.Tensor, capacity: int):
+        # 预分配 capacity 长度的 kv 缓冲区, 后续 token 原地写入, 避免每步 torch.cat
+        x, k, v = self.process_prompt(x, attn_mask)
+        kv_len = k.shape[1]
+        k_cache = torch.empty((k.shape[0], capacity, k.shape[2]), dtype=k.dtype, device=k.device)
+        v_cache = torch.empty((v.shape[0], capacity, v.shape[2]), dtype=v.dtype, device=v.device)
+        k_cache[:, :kv_len] = k
+        v_cache[:, :kv_len] = v
+        return x, k_cache, v_cache
+
+    def decode_next_token_static(self, x, k_cache, v_cache, kv_len: int):
+        # kv_len 为缓冲区中已写入的长度, 新 token 写在 kv_len 处, 注意力只看 [:kv_len+1] 切片
+        q, k, v = F.linear(x, self.qkv_w, self.qkv_b).chunk(3, dim=-1)
+
+        k_cache[:, kv_len:kv_len + 1] = k
+        v_cache[:, kv_len:kv_len + 1] = v
+        kv_len = kv_len + 1
+
+        batch_size = q.shape[0]
+        q_len = q.shape[1]
+
+        q = q.view(batch_size, q_len, self.num_heads, -1).transpose(1, 2)
+        k = k_cache[:, :kv_len].view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
+        v = v_cache[:, :kv_len].view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
+
+        attn = F.scaled_dot_product_attention(q, k, v)
+
+        attn = attn.transpose(1, 2).reshape(batch_size, q_len, self.hidden_dim)
+        attn = F.linear(attn, self.out_w, self.out_b)
+
+        x = F.layer_norm(
+            x + attn, [self.hidden_dim], self.norm_w1, self.norm_b1, self.norm_eps1
+        )
+        x = F.layer_norm(
+            x + self.mlp.forward(x),
+            [self.hidden_dim],
+            self.norm_w2,
+            self.norm_b2,
+            self.norm_eps2,
+        )
+        return x
+
 
 @torch.jit.script
 class T2STransformer:
@@ -164,12 +211,30 @@ class T2STransformer:
         return x, k_cache, v_cache
 
     def decode_next_token(
-            self, x, k_cache: List[torch.Tensor], v_cache: List[torch.Tensor]
+            self, x, k_cache: List[torch.Tensor], v_cache: List[torch.Tensor],
+            attn_mask: Optional[torch.Tensor] = None
     ):
         for i in range(self.num_blocks):
-            x, k_cache[i], v_cache[i] = self.blocks[i].decode_next_token(x, k_cache[i], v_cache[i])
+            x, k_cache[i], v_cache[i] = self.blocks[i].decode_next_token(x, k_cache[i], v_cache[i], attn_mask)
         return x, k_cache, v_cache
 
+    def process_prompt_static(
+            self, x, attn_mask: torch.Tensor, capacity: int):
+        k_cache: List[torch.Tensor] = []
+        v_cache: List[torch.Tensor] = []
+        for i in range(self.num_blocks):
+            x, k_cache_, v_cache_ = self.blocks[i].process_prompt_static(x, attn_mask, capacity)
+            k_cache.append(k_cache_)
+            v_cache.append(v_cache_)
+        return x, k_cache, v_cache
+
+    def decode_next_token_static(
+            self, x, k_cache: List[torch.Tensor], v_cache: List[torch.Tensor], kv_len: int
+    ):
+        for i in range(self.num_blocks):
+            x = self.blocks[i].decode_next_token_static(x, k_cache[i], v_cache[i], kv_len)
+        return x
+
 
 class Text2SemanticDecoder(nn.Module):
     def __init__(self, config, norm_first=False, top_k=3):
@@ -488,6 +553,68 @@ class Text2SemanticDecoder(nn.Module):
         # 错位
         return targets[:, :-1], targets[:, 1:]
 
+    def _prepare_prompt(self, x, bert_feature, y, x_lens=None):
+        """
+        infer_panel / infer_panel_stream / infer_panel_batch 共用的首步准备:
+        文本 token 加 bert 特征和位置编码, 拼上参考音频 token, 构造 prompt 阶段的注意力掩码 (True 为屏蔽).
+        x: (B, x_len), bert_feature: (B, 1024, x_len), y: (B, y_len), 无参考音频时 y_len 为 0.
+        x_lens 不为空时文本右侧有补齐, 额外屏蔽 padding 列, 返回的 padding_mask 供之后的解码步使用.
+        返回 (xy_pos, xy_attn_mask, padding_mask)
+        """
+        x = self.ar_text_embedding(x)
+        x = x + self.bert_proj(bert_feature.transpose(1, 2))
+        x = self.ar_text_position(x)
+        x_len = x.shape[1]
+        y_len = y.shape[1]
+        if y_len > 0:
+            xy_pos = torch.concat([x, self.ar_audio_position(self.ar_audio_embedding(y))], dim=1)
+        else:
+            xy_pos = x
+
+        x_attn_mask_pad = F.pad(
+            torch.zeros((x_len, x_len), dtype=torch.bool),
+            (0, y_len),  ###xx的纯0扩展到xx纯0+xy纯1，(x,x+y)
+            value=True,
+        )
+        y_attn_mask = F.pad(  ###yy的右上1扩展到左边xy的0,(y,x+y)
+            torch.triu(torch.ones(y_len, y_len, dtype=torch.bool), diagonal=1),
+            (x_len, 0),
+            value=False,
+        )
+        xy_attn_mask = torch.concat([x_attn_mask_pad, y_attn_mask], dim=0).to(x.device)
+        if x_lens is None:
+            return xy_pos, xy_attn_mask, None
+        padding_mask = F.pad(make_pad_mask(x_lens, x_len), (0, y_len), value=False)
+        xy_attn_mask = (xy_attn_mask.unsqueeze(0) | padding_mask.unsqueeze(1)).unsqueeze(1)
+        return xy_pos, xy_attn_mask, padding_mask
+
+    @staticmethod
+    def _kv_capacity(prompt_len, early_stop_num):
+        """static_kv_cache 预分配的长度: prompt 加上最多解码的步数"""
+        max_steps = 1500
+        if early_stop_num != -1:
+            max_steps = min(max_steps, early_stop_num + 1)
+        return prompt_len + max_steps
+
+    def _decode_step(self, xy_pos, xy_attn_mask, k_cache, v_cache, kv_len, kv_capacity, static_kv_cache):
+        """单条序列的一步解码: xy_attn_mask 不为空时处理整个 prompt, 否则用 kv cache 解码一个 token. 返回 (xy_dec, k_cache, v_cache, kv_len)"""
+        if xy_attn_mask is not None:
+            if static_kv_cache:
+                xy_dec, k_cache, v_cache = self.t2s_transformer.process_prompt_static(xy_pos, xy_attn_mask, kv_capacity)
+                return xy_dec, k_cache, v_cache, xy_pos.shape[1]
+            xy_dec, k_cache, v_cache = self.t2s_transformer.process_prompt(xy_pos, xy_attn_mask)
+            return xy_dec, k_cache, v_cache, kv_len
+        if static_kv_cache:
+            xy_dec = self.t2s_transformer.decode_next_token_static(xy_pos, k_cache, v_cache, kv_len)
+            return xy_dec, k_cache, v_cache, kv_len + 1
+        xy_dec, k_cache, v_cache = self.t2s_transformer.decode_next_token(xy_pos, k_cache, v_cache)
+        return xy_dec, k_cache, v_cache, kv_len
+
+    def _next_pos(self, y, pos):
+        """最新一个 token 的嵌入加上第 pos 个位置编码, 作为下一步的输入"""
+        y_emb = self.ar_audio_embedding(y[:, -1:])
+        return y_emb * self.ar_audio_position.x_scale + self.ar_audio_position.alpha * self.ar_audio_position.pe[:, pos].to(dtype=y_emb.dtype,device=y_emb.device)
+
     def infer_panel(
             self,
             x,  #####全部文本token
@@ -498,58 +625,47 @@ class Text2SemanticDecoder(nn.Module):
             top_p: int = 100,
             early_stop_num: int = -1,
             temperature: float = 1.0,
+            static_kv_cache: bool = False,
+            should_stop: Optional[Callable[[], bool]] = None,
+            fused_sampling: bool = False,
+            eos_check_interval: int = 8,
+            generator: Optional[torch.Generator] = None,
     ):
-        x = self.ar_text_embedding(x)
-        x = x + self.bert_proj(bert_feature.transpose(1, 2))
-        x = self.ar_text_position(x)
-
+        """
+        static_kv_cache: 按 early_stop_num 预分配定长 kv 缓冲区并原地写入,
+        与默认的逐步 torch.cat 结果一致, 长序列时省去 O(n^2) 的拷贝
+        should_stop: 每步解码后调用, 返回 True 时立即结束 (请求取消), 调用方自行丢弃结果
+        fused_sampling: 用 sample_fused 采样, 重复惩罚用累计计数张量, top_k 小时不对整个词表排序.
+            分布与 sample 相同但消耗随机数的方式不同, 同一 generator 得到的 token 不同; 其他解码路径 (流式 / 批量 / 连续批处理)
+            都用 sample, 所以默认关闭; 服务端由 --fused_sampling 开启
+        eos_check_interval: 开启 fused_sampling 时 EOS 标记只在设备上累积, 每 N 步同步一次, 结束时把 EOS 之后多解码的 token 裁掉
+        generator: 采样用的随机数生成器, 为空时用全局随机状态; 传入固定种子的生成器时结果可复现
+        """
         # AR Decoder
         y = prompts
-
-        x_len = x.shape[1]
-        x_attn_mask = torch.zeros((x_len, x_len), dtype=torch.bool)
+        ref_free = y is None
+        if ref_free:
+            y = torch.zeros(x.shape[0], 0, dtype=torch.int, device=x.device)
+        y_len = prefix_len = y.shape[1]
         stop = False
-        # print(1111111,self.num_layers)
 
+        ###################  first step ##########################
+        xy_pos, xy_attn_mask, _ = self._prepare_prompt(x, bert_feature, y)
+        kv_capacity = self._kv_capacity(xy_pos.shape[1], early_stop_num)
+        kv_len = 0
         k_cache = None
         v_cache = None
-        ###################  first step ##########################
-        if y is not None:
-            y_emb = self.ar_audio_embedding(y)
-            y_len = y_emb.shape[1]
-            prefix_len = y.shape[1]
-            y_pos = self.ar_audio_position(y_emb)
-            xy_pos = torch.concat([x, y_pos], dim=1)
-            ref_free = False
-        else:
-            y_emb = None
-            y_len = 0
-            prefix_len = 0
-            y_pos = None
-            xy_pos = x
-            y = torch.zeros(x.shape[0], 0, dtype=torch.int, device=x.device)
-            prompts = y
-            ref_free = True
 
-        x_attn_mask_pad = F.pad(
-            x_attn_mask,
-            (0, y_len),  ###xx的纯0扩展到xx纯0+xy纯1，(x,x+y)
-            value=True,
-        )
-        y_attn_mask = F.pad(  ###yy的右上1扩展到左边xy的0,(y,x+y)
-            torch.triu(torch.ones(y_len, y_len, dtype=torch.bool), diagonal=1),
-            (x_len, 0),
-            value=False,
-        )
-        xy_attn_mask = torch.concat([x_attn_mask_pad, y_attn_mask], dim=0).to(
-            x.device
-        )
+        if fused_sampling:
+            # 重复惩罚的状态: 每个 token 已出现的次数, 参考音频的 token 也算在内
+            token_counts = torch.bincount(y[0].long(), minlength=self.ar_predict_layer.out_features).to(x.device)
+            count_one = torch.ones(1, dtype=token_counts.dtype, device=x.device)
+            eos_flags = torch.zeros(1500, dtype=torch.bool, device=x.device)
+            eos_checked = 0
 
-        for idx in tqdm(range(1500)):
-            if xy_attn_mask is not None:
-                xy_dec, k_cache, v_cache = self.t2s_transformer.process_prompt(xy_pos, xy_attn_mask)
-            else:
-                xy_dec, k_cache, v_cache = self.t2s_transformer.decode_next_token(xy_pos, k_cache, v_cache)
+        for idx in range(1500):
+            xy_dec, k_cache, v_cache, kv_len = self._decode_step(
+                xy_pos, xy_attn_mask, k_cache, v_cache, kv_len, kv_capacity, static_kv_cache)
 
             logits = self.ar_predict_layer(
                 xy_dec[:, -1]
@@ -558,9 +674,17 @@ class Text2SemanticDecoder(nn.Module):
             if idx == 0:
                 xy_attn_mask = None
                 logits = logits[:, :-1]
-            samples = sample(
-                logits[0], y, top_k=top_k, top_p=top_p, repetition_penalty=1.35, temperature=temperature
-            )[0].unsqueeze(0)
+            if fused_sampling:
+                samples = sample_fused(
+                    logits[0], token_counts, top_k=top_k, top_p=top_p, repetition_penalty=1.35, temperature=temperature,
+                    generator=generator,
+                ).unsqueeze(0)
+                token_counts.index_add_(0, samples[0].long(), count_one)
+            else:
+                samples = sample(
+                    logits[0], y, top_k=top_k, top_p=top_p, repetition_penalty=1.35, temperature=temperature,
+                    generator=generator,
+                )[0].unsqueeze(0)
 
             y = torch.concat([y, samples], dim=1)
 
@@ -568,8 +692,22 @@ class Text2SemanticDecoder(nn.Module):
                 print("use early stop num:", early_stop_num)
                 stop = True
 
-            if torch.argmax(logits, dim=-1)[0] == self.EOS or samples[0, 0] == self.EOS:
+            if fused_sampling:
+                # EOS 标记留在设备上, 每 eos_check_interval 步才同步一次
+                eos_flags[idx] = (torch.argmax(logits, dim=-1)[0] == self.EOS) | (samples[0, 0] == self.EOS)
+                if stop or (idx + 1) % eos_check_interval == 0:
+                    hits = eos_flags[eos_checked:idx + 1].nonzero()
+                    if len(hits) > 0:
+                        # 裁掉 EOS 之后多解码的几步
+                        idx = eos_checked + int(hits[0, 0])
+                        y = y[:, :prefix_len + idx + 1]
+                        stop = True
+                    eos_checked = idx + 1
+            elif torch.argmax(logits, dim=-1)[0] == self.EOS or samples[0, 0] == self.EOS:
                 stop = True
+            if should_stop is not None and should_stop():
+                print(f"T2S Decoding cancelled [{prefix_len} -> {y.shape[1]}]")
+                break
             if stop:
                 if y.shape[1] == 0:
                     y = torch.concat([y, torch.zeros_like(samples)], dim=1)
@@ -578,9 +716,168 @@ class Text2SemanticDecoder(nn.Module):
                 break
 
             ####################### update next step ###################################
-            y_emb = self.ar_audio_embedding(y[:, -1:])
-            xy_pos = y_emb * self.ar_audio_position.x_scale + self.ar_audio_position.alpha * self.ar_audio_position.pe[:, y_len + idx].to(dtype=y_emb.dtype,device=y_emb.device)
+            xy_pos = self._next_pos(y, y_len + idx)
 
         if ref_free:
             return y[:, :-1], 0
-        return y[:, :-1], idx - 1
\ No newline at end of file
+        return y[:, :-1], idx - 1
+
+    def infer_panel_stream(
+            self,
+            x,  #####全部文本token
+            x_lens,
+            prompts,  ####参考音频token
+            bert_feature,
+            top_k: int = -100,
+            top_p: int = 100,
+            early_stop_num: int = -1,
+            temperature: float = 1.0,
+            chunk_size: int = 24,
+            static_kv_cache: bool = False,
+            should_stop: Optional[Callable[[], bool]] = None,
+            generator: Optional[torch.Generator] = None,
+    ):
+        """
+        infer_panel 的流式版本: 每生成 chunk_size 个 token 就 yield 一次新 token (1, n),
+        解码结束时 yield 剩余部分. 所有 chunk 拼起来与 infer_panel 后 pred_semantic[:, -idx:] 一致.
+        """
+        y = prompts
+        y_len = prefix_len = y.shape[1]
+        xy_pos, xy_attn_mask, _ = self._prepare_prompt(x, bert_feature, y)
+        kv_capacity = self._kv_capacity(xy_pos.shape[1], early_stop_num)
+        kv_len = 0
+        k_cache = None
+        v_cache = None
+        # 第一个生成的 token 不输出, 与 infer_panel 调用方的切片保持一致
+        emitted = prefix_len + 1
+
+        for idx in range(1500):
+            xy_dec, k_cache, v_cache, kv_len = self._decode_step(
+                xy_pos, xy_attn_mask, k_cache, v_cache, kv_len, kv_capacity, static_kv_cache)
+
+            logits = self.ar_predict_layer(
+                xy_dec[:, -1]
+            )
+
+            if idx == 0:
+                xy_attn_mask = None
+                logits = logits[:, :-1]
+            samples = sample(
+                logits[0], y, top_k=top_k, top_p=top_p, repetition_penalty=1.35, temperature=temperature,
+                generator=generator,
+            )[0].unsqueeze(0)
+
+            y = torch.concat([y, samples], dim=1)
+
+            stop = idx == 1499
+            if early_stop_num != -1 and (y.shape[1] - prefix_len) > early_stop_num:
+                print("use early stop num:", early_stop_num)
+                stop = True
+            if torch.argmax(logits, dim=-1)[0] == self.EOS or samples[0, 0] == self.EOS:
+                stop = True
+            if should_stop is not None and should_stop():
+                print(f"T2S Decoding cancelled [{prefix_len} -> {y.shape[1]}]")
+                return
+            if stop:
+                print(f"T2S Decoding EOS [{prefix_len} -> {y.shape[1]}]")
+                if y.shape[1] - 1 > emitted:
+                    yield y[:, emitted:-1]
+                return
+
+            # 最新的 token 可能在下一步被判为结尾而丢弃, 所以只输出到倒数第二个
+            if y.shape[1] - 1 - emitted >= chunk_size:
+                yield y[:, emitted:-1]
+                emitted = y.shape[1] - 1
+
+            ####################### update next step ###################################
+            xy_pos = self._next_pos(y, y_len + idx)
+
+    def infer_panel_batch(
+            self,
+            x: List[torch.Tensor],  #####每句的全部文本token(1D), 长度可不同
+            prompts,  ####共享的参考音频token, (1, prompt_len)
+            bert_feature: List[torch.Tensor],  ####每句的bert特征, (1024, len)
+            top_k: int = -100,
+            top_p: int = 100,
+            early_stop_num: int = -1,
+            temperature: float = 1.0,
+            should_stop: Optional[Callable[[], bool]] = None,
+            generators: Optional[List[Optional[torch.Generator]]] = None,
+    ):
+        """
+        多句共享同一参考音频时的批量解码.
+        文本右侧补齐并用 padding mask 屏蔽, 每行独立判断 EOS, 结束的行立即移出 batch.
+        返回每句的 semantic token 列表 (1, n), 与 infer_panel 后 pred_semantic[:, -idx:] 的结果对应.
+        generators: 每句一个采样用的随机数生成器, 各句的随机序列与 batch 组成无关
+        """
+        batch_size = len(x)
+        device = prompts.device
+        x_lens = torch.LongTensor([item.shape[-1] for item in x]).to(device)
+        x_len = int(x_lens.max())
+        x_pad = torch.zeros((batch_size, x_len), dtype=torch.long, device=device)
+        bert_pad = torch.zeros(
+            (batch_size, bert_feature[0].shape[0], x_len), dtype=bert_feature[0].dtype, device=device
+        )
+        for i in range(batch_size):
+            x_pad[i, :x_lens[i]] = x[i]
+            bert_pad[i, :, :x_lens[i]] = bert_feature[i]
+
+        y = prompts.expand(batch_size, -1)
+        y_len = prefix_len = y.shape[1]
+        # 因果掩码 + 文本 padding 列
+        xy_pos, xy_attn_mask, padding_mask = self._prepare_prompt(x_pad, bert_pad, y, x_lens)
+
+        row_ids = list(range(batch_size))
+        results: List[Optional[torch.Tensor]] = [None] * batch_size
+        k_cache = None
+        v_cache = None
+
+        for idx in range(1500):
+            if idx == 0:
+                xy_dec, k_cache, v_cache = self.t2s_transformer.process_prompt(xy_pos, xy_attn_mask)
+            else:
+                decode_mask = padding_mask.view(len(row_ids), 1, 1, -1)
+                xy_dec, k_cache, v_cache = self.t2s_transformer.decode_next_token(xy_pos, k_cache, v_cache, decode_mask)
+
+            logits = self.ar_predict_layer(xy_dec[:, -1])
+            if idx == 0:
+                logits = logits[:, :-1]
+
+            samples = torch.concat([
+                sample(
+                    logits[i], y[i], top_k=top_k, top_p=top_p, repetition_penalty=1.35, temperature=temperature,
+                    generator=generators[row_ids[i]] if generators is not None else None,
+                )[0].unsqueeze(0)
+                for i in range(len(row_ids))
+            ], dim=0)
+
+            y = torch.concat([y, samples], dim=1)
+
+            finished = (torch.argmax(logits, dim=-1) == self.EOS) | (samples[:, 0] == self.EOS)
+            if early_stop_num != -1 and (y.shape[1] - prefix_len) > early_stop_num:
+                print("use early stop num:", early_stop_num)
+                finished[:] = True
+            if idx == 1499:
+                finished[:] = True
+            if should_stop is not None and should_stop():
+                print(f"T2S Decoding cancelled [{prefix_len} -> {y.shape[1]}]")
+                break
+
+            if finished.any():
+                for i in finished.nonzero(as_tuple=True)[0].tolist():
+                    results[row_ids[i]] = y[i:i + 1, :-1][:, -(idx - 1):]
+                    print(f"T2S Decoding EOS [row {row_ids[i]}: {prefix_len} -> {y.shape[1]}]")
+                keep = (~finished).nonzero(as_tuple=True)[0]
+                if keep.numel() == 0:
+                    break
+                row_ids = [row_ids[i] for i in keep.tolist()]
+                y = y[keep]
+                padding_mask = padding_mask[keep]
+                k_cache = [k[keep] for k in k_cache]
+                v_cache = [v[keep] for v in v_cache]
+
+            ####################### update next step ###################################
+            xy_pos = self._next_pos(y, y_len + idx)
+            padding_mask = F.pad(padding_mask, (0, 1), value=False)
+
+        return results
\ No newline at end of file
@@ -0,0 +1,154 @@
+# T2S 的 int8 动态量化 (CPU): T2SBlock / T2SMLP 的原始权重张量无法直接交给 quantize_dynamic,
+# 这里把它们包成 nn.Linear 再量化, 并提供与 T2STransformer 相同接口的 QuantizedT2STransformer
+from typing import List, Optional
+
+import torch
+from torch import nn
+from torch.nn import functional as F
+
+
+def dynamic_int8_linear(weight, bias):
+    linear = nn.Linear(weight.shape[1], weight.shape[0])
+    linear.weight = nn.Parameter(weight.detach().float().cpu(), requires_grad=False)
+    linear.bias = nn.Parameter(bias.detach().float().cpu(), requires_grad=False)
+    return torch.ao.quantization.quantize_dynamic(nn.Sequential(linear), {nn.Linear}, dtype=torch.qint8)[0]
+
+
+def tensor_nbytes(*tensors):
+    return sum(t.element_size() * t.nelement() for t in tensors if t is not None)
+
+
+def packed_nbytes(packed_params):
+    """动态量化 Linear 的打包权重 (int8) 和偏置, 既不是参数也不是 buffer, parameters() / buffers() 统计不到"""
+    return tensor_nbytes(*packed_params._weight_bias())
+
+
+class QuantizedT2SBlock:
+    """与 T2SBlock 计算一致, 四个线性层换成 int8 动态量化"""
+
+    def __init__(self, block):
+        self.num_heads = block.num_heads
+        self.hidden_dim = block.hidden_dim
+        self.qkv = dynamic_int8_linear(block.qkv_w, block.qkv_b)
+        self.out = dynamic_int8_linear(block.out_w, block.out_b)
+        self.mlp1 = dynamic_int8_linear(block.mlp.w1, block.mlp.b1)
+        self.mlp2 = dynamic_int8_linear(block.mlp.w2, block.mlp.b2)
+        self.norm_w1 = block.norm_w1
+        self.norm_b1 = block.norm_b1
+        self.norm_eps1 = block.norm_eps1
+        self.norm_w2 = block.norm_w2
+        self.norm_b2 = block.norm_b2
+        self.norm_eps2 = block.norm_eps2
+
+    def nbytes(self):
+        linears = (self.qkv, self.out, self.mlp1, self.mlp2)
+        return sum(packed_nbytes(linear._packed_params) for linear in linears) + tensor_nbytes(
+            self.norm_w1, self.norm_b1, self.norm_w2, self.norm_b2)
+
+    def _attend(self, x, q, k, v, attn_mask: Optional[torch.Tensor]):
+        batch_size = q.shape[0]
+        q_len = q.shape[1]
+        kv_len = k.shape[1]
+        q = q.view(batch_size, q_len, self.num_heads, -1).transpose(1, 2)
+        k = k.view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
+        v = v.view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
+        if attn_mask is not None:
+            attn = F.scaled_dot_product_attention(q, k, v, ~attn_mask)
+        else:
+            attn = F.scaled_dot_product_attention(q, k, v)
+        attn = self.out(attn.transpose(1, 2).reshape(batch_size, q_len, self.hidden_dim))
+        x = F.layer_norm(x + attn, [self.hidden_dim], self.norm_w1, self.norm_b1, self.norm_eps1)
+        return F.layer_norm(
+            x + self.mlp2(F.relu(self.mlp1(x))),
+            [self.hidden_dim],
+            self.norm_w2,
+            self.norm_b2,
+            self.norm_eps2,
+        )
+
+    def process_prompt(self, x, attn_mask: torch.Tensor):
+        q, k, v = self.qkv(x).chunk(3, dim=-1)
+        return self._attend(x, q, k, v, attn_mask), k, v
+
+    def decode_next_token(self, x, k_cache, v_cache, attn_mask: Optional[torch.Tensor] = None):
+        q, k, v = self.qkv(x).chunk(3, dim=-1)
+        k_cache = torch.cat([k_cache, k], dim=1)
+        v_cache = torch.cat([v_cache, v], dim=1)
+        return self._attend(x, q, k_cache, v_cache, attn_mask), k_cache, v_cache
+
+    def process_prompt_static(self, x, attn_mask: torch.Tensor, capacity: int):
+        x, k, v = self.process_prompt(x, attn_mask)
+        kv_len = k.shape[1]
+        k_cache = torch.empty((k.shape[0], capacity, k.shape[2]), dtype=k.dtype, device=k.device)
+        v_cache = torch.empty((v.shape[0], capacity, v.shape[2]), dtype=v.dtype, device=v.device)
+        k_cache[:, :kv_len] = k
+        v_cache[:, :kv_len] = v
+        return x, k_cache, v_cache
+
+    def decode_next_token_static(self, x, k_cache, v_cache, kv_len: int):
+        q, k, v = self.qkv(x).chunk(3, dim=-1)
+        k_cache[:, kv_len:kv_len + 1] = k
+        v_cache[:, kv_len:kv_len + 1] = v
+        return self._attend(x, q, k_cache[:, :kv_len + 1], v_cache[:, :kv_len + 1], None)
+
+
+class QuantizedT2STransformer:
+    """T2STransformer 的量化版本, 方法签名与之相同, 可直接替换 Text2SemanticDecoder.t2s_transformer"""
+
+    def __init__(self, transformer):
+        self.num_blocks = transformer.num_blocks
+        self.blocks = [QuantizedT2SBlock(block) for block in transformer.blocks]
+
+    def nbytes(self):
+        """不是 nn.Module, 所在模型的 parameters() 统计不到, 由调用方单独计入"""
+        return sum(block.nbytes() for block in self.blocks)
+
+    def process_prompt(self, x, attn_mask: torch.Tensor):
+        k_cache: List[torch.Tensor] = []
+        v_cache: List[torch.Tensor] = []
+        for block in self.blocks:
+            x, k_cache_, v_cache_ = block.process_prompt(x, attn_mask)
+            k_cache.append(k_cache_)
+            v_cache.append(v_cache_)
+        return x, k_cache, v_cache
+
+    def decode_next_token(self, x, k_cache: List[torch.Tensor], v_cache: List[torch.Tensor],
+                          attn_mask: Optional[torch.Tensor] = None):
+        for i, block in enumerate(self.blocks):
+            x, k_cache[i], v_cache[i] = block.decode_next_token(x, k_cache[i], v_cache[i], attn_mask)
+        return x, k_cache, v_cache
+
+    def process_prompt_static(self, x, attn_mask: torch.Tensor, capacity: int):
+        k_cache: List[torch.Tensor] = []
+        v_cache: List[torch.Tensor] = []
+        for block in self.blocks:
+            x, k_cache_, v_cache_ = block.process_prompt_static(x, attn_mask, capacity)
+            k_cache.append(k_cache_)
+            v_cache.append(v_cache_)
+        return x, k_cache, v_cache
+
+    def decode_next_token_static(self, x, k_cache: List[torch.Tensor], v_cache: List[torch.Tensor], kv_len: int):
+        for i, block in enumerate(self.blocks):
+            x = block.decode_next_token_static(x, k_cache[i], v_cache[i], kv_len)
+        return x
+
+
+@torch.no_grad()
+def quantize_t2s_model(model):
+    """
+    原地量化 Text2SemanticDecoder: t2s_transformer 换成 QuantizedT2STransformer, bert_proj / ar_predict_layer 动态量化.
+    self.h 只在训练和旧的 infer 中使用, 这里释放以真正省下 fp32 权重的内存, 量化后的模型只能用于推理.
+    """
+    model.float().cpu()
+    model.t2s_transformer = QuantizedT2STransformer(model.t2s_transformer)
+    model.bert_proj = dynamic_int8_linear(model.bert_proj.weight, model.bert_proj.bias)
+    predict = model.ar_predict_layer
+    model.ar_predict_layer = dynamic_int8_linear(predict.weight, torch.zeros(predict.out_features))
+    model.h = None
+    return model
+
+
+@torch.no_grad()
+def quantize_linear_layers(model):
+    """BERT / HuBERT 等 nn.Module: 原地把全部 nn.Linear 换成 int8 动态量化"""
+    return torch.ao.quantization.quantize_dynamic(model.float().cpu(), {nn.Linear}, dtype=torch.qint8, inplace=True)
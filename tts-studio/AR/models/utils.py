@@ -102,8 +102,9 @@ from typing import Optional, Tuple
 
 def multinomial_sample_one_no_sync(
     probs_sort,
+    generator: Optional[torch.Generator] = None,
 ):  # Does multinomial sampling without a cuda synchronization
-    q = torch.empty_like(probs_sort).exponential_(1)
+    q = torch.empty_like(probs_sort).exponential_(1, generator=generator)
     return torch.argmax(probs_sort / q, dim=-1, keepdim=True).to(dtype=torch.int)
 
 
@@ -153,14 +154,54 @@ def logits_to_probs(
 def sample(
     logits,
     previous_tokens: Optional[torch.Tensor] = None,
+    generator: Optional[torch.Generator] = None,
     **sampling_kwargs,
 ) -> Tuple[torch.Tensor, torch.Tensor]:
     probs = logits_to_probs(
         logits=logits, previous_tokens=previous_tokens, **sampling_kwargs
     )
-    idx_next = multinomial_sample_one_no_sync(probs)
+    idx_next = multinomial_sample_one_no_sync(probs, generator)
     return idx_next, probs
 
+
+def apply_repetition_penalty(logits, token_counts, repetition_penalty):
+    """与 logits_to_probs 里的 gather/scatter 等价: 出现过的 token 只惩罚一次, 用计数张量代替历史序列"""
+    seen = token_counts[..., :logits.size(-1)] > 0
+    penalized = torch.where(logits < 0, logits * repetition_penalty, logits / repetition_penalty)
+    return torch.where(seen, penalized, logits)
+
+
+def sample_fused(
+    logits,
+    token_counts: torch.Tensor,
+    top_k: Optional[int] = None,
+    top_p: Optional[float] = None,
+    temperature: float = 1.0,
+    repetition_penalty: float = 1.0,
+    generator: Optional[torch.Generator] = None,
+) -> torch.Tensor:
+    """
+    与 sample() 的分布一致, 但 top_k 小于词表时不对整个词表排序: 只取 top_k 个候选, 在候选上做 top_p 和采样.
+    top_p 的累积概率用整个词表的 logsumexp 归一化, 保留的候选与排序实现相同.
+    logits: (V,) 或 (B, V); token_counts: 每个 token 已出现的次数, 最后一维不小于 V. 返回 (..., 1) 的 token id
+    """
+    if repetition_penalty != 1.0:
+        logits = apply_repetition_penalty(logits, token_counts, repetition_penalty)
+    vocab_size = logits.size(-1)
+    if top_k is None or top_k <= 0 or top_k >= vocab_size:
+        probs = logits_to_probs(logits, None, temperature=temperature, top_k=top_k if top_k and top_k > 0 else None, top_p=top_p)
+        return multinomial_sample_one_no_sync(probs, generator)
+
+    values, indices = torch.topk(logits, top_k, dim=-1)
+    if top_p is not None and top_p < 1.0:
+        cum_probs = torch.cumsum(torch.exp(values - torch.logsumexp(logits, dim=-1, keepdim=True)), dim=-1)
+        indices_to_remove = cum_probs > top_p
+        indices_to_remove[..., 0] = False  # keep at least one option
+        values = values.masked_fill(indices_to_remove, -float("Inf"))
+    probs = torch.nn.functional.softmax(values / max(temperature, 1e-5), dim=-1)
+    choice = multinomial_sample_one_no_sync(probs, generator)
+    return torch.gather(indices, -1, choice.long()).to(dtype=torch.int)
+
 def dpo_loss(policy_chosen_logps: torch.FloatTensor,
              policy_rejected_logps: torch.FloatTensor,
              reference_chosen_logps: torch.FloatTensor,
@@ -0,0 +1,85 @@
+# 合成结果缓存: 回放一组反复出现的台词 (问候 / 专注模式提醒 / 报错提示), 带 seed 请求,
+# 对比首次合成 (未命中) 与重复请求 (命中) 的首字节耗时和总耗时, 并检查命中时返回的字节与首次一致
+# 先启动 tts_api.py -ac logs/audio_cache (需要能用默认参考音频合成), 然后:
+# python -m benchmark.bench_audio_cache [--url http://127.0.0.1:9880] [--rounds 5]
+import argparse
+import json
+import time
+import urllib.request
+
+PHRASES = [
+    "你好呀，今天过得怎么样？",
+    "专注时间到了，先休息五分钟吧。",
+    "已经专注二十五分钟了，起来活动一下。",
+    "抱歉，我刚才没听清，可以再说一遍吗？",
+    "网络好像出了点问题，请稍后再试。",
+]
+
+
+def fetch(url, payload):
+    data = json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    t = time.perf_counter()
+    first_byte = None
+    chunks = []
+    with urllib.request.urlopen(request) as response:
+        while True:
+            chunk = response.read(4096)
+            if not chunk:
+                break
+            if first_byte is None:
+                first_byte = time.perf_counter() - t
+            chunks.append(chunk)
+    return first_byte or 0.0, time.perf_counter() - t, b"".join(chunks)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="synthesized-audio cache: miss vs hit latency")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:9880")
+    parser.add_argument("--rounds", type=int, default=5, help="每句请求的次数, 第一次为未命中")
+    parser.add_argument("--seed", type=int, default=None, help="默认按当前时间取, 保证第一轮未命中")
+    parser.add_argument("--output", type=str, default=None, help="结果写入json文件")
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else int(time.time())
+    url = args.url.rstrip("/") + "/"
+    miss, hit = [], []
+    mismatched = 0
+    for text in PHRASES:
+        payload = {"text": text, "text_language": "zh", "seed": seed}
+        ttfb, total, reference = fetch(url, payload)
+        miss.append((ttfb, total))
+        for _ in range(args.rounds - 1):
+            ttfb, total, body = fetch(url, payload)
+            hit.append((ttfb, total))
+            mismatched += body != reference
+
+    with urllib.request.urlopen(args.url.rstrip("/") + "/cache_stats") as response:
+        stats = json.loads(response.read())["audio_cache"]
+    result = {
+        "seed": seed,
+        "miss_ttfb_ms": round(median(r[0] for r in miss) * 1000, 1),
+        "miss_total_ms": round(median(r[1] for r in miss) * 1000, 1),
+        "hit_ttfb_ms": round(median(r[0] for r in hit) * 1000, 1),
+        "hit_total_ms": round(median(r[1] for r in hit) * 1000, 1),
+        "mismatched": mismatched,
+        "server": stats,
+    }
+    print(f"miss: ttfb {result['miss_ttfb_ms']}ms total {result['miss_total_ms']}ms")
+    print(f"hit:  ttfb {result['hit_ttfb_ms']}ms total {result['hit_total_ms']}ms, {mismatched} mismatched bodies")
+    if stats is not None:
+        print(f"server: hit_rate {stats['hit_rate']:.2f}, {stats['bytes_served']} bytes served, {stats['entries']} entries")
+    else:
+        print("server: audio cache disabled (start tts_api.py with -ac)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# 多句 T2S 解码: 逐句 infer_panel vs infer_panel_batch 的 CPU 耗时
+# 用法: python -m benchmark.bench_batch_decode [--sentences 6] [--n_layer 24]
+import argparse
+
+import torch
+
+from benchmark.common import build_t2s_model, set_seed, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="T2S batched multi-sentence decode benchmark (CPU)")
+    parser.add_argument("--config", type=str, default="configs/s1longer-v2.yaml")
+    parser.add_argument("--n_layer", type=int, default=None)
+    parser.add_argument("--sentences", type=int, default=6)
+    parser.add_argument("--early_stop_num", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    model, _ = build_t2s_model(args.config, seed=args.seed, n_layer=args.n_layer)
+    generator = torch.Generator().manual_seed(args.seed)
+    prompt = torch.randint(0, model.EOS, (1, 100), generator=generator)
+    lengths = torch.randint(20, 60, (args.sentences,), generator=generator).tolist()
+    phones = [torch.randint(0, model.phoneme_vocab_size, (n,), generator=generator) for n in lengths]
+    berts = [torch.randn((1024, n), generator=generator) for n in lengths]
+
+    def sequential():
+        outputs = []
+        for x, bert in zip(phones, berts):
+            y, idx = model.infer_panel(
+                x.unsqueeze(0), torch.LongTensor([x.shape[0]]), prompt, bert.unsqueeze(0),
+                top_k=15, top_p=1.0, temperature=1.0, early_stop_num=args.early_stop_num,
+            )
+            outputs.append(y[:, -idx:])
+        return outputs
+
+    def batched():
+        return model.infer_panel_batch(
+            phones, prompt, berts,
+            top_k=15, top_p=1.0, temperature=1.0, early_stop_num=args.early_stop_num,
+        )
+
+    with torch.no_grad():
+        set_seed(args.seed)
+        seq_out, seq_time = timed(sequential)
+        set_seed(args.seed)
+        batch_out, batch_time = timed(batched)
+
+    seq_tokens = sum(item.shape[-1] for item in seq_out)
+    batch_tokens = sum(item.shape[-1] for item in batch_out)
+    print(f"sentences: {args.sentences}, phone lengths: {lengths}")
+    print(f"sequential: {seq_time:.2f}s ({seq_tokens} tokens)")
+    print(f"batched:    {batch_time:.2f}s ({batch_tokens} tokens)")
+    print(f"speedup:    {seq_time / batch_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
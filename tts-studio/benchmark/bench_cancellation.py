@@ -0,0 +1,109 @@
+# 打断密集场景的回放: 每句话解码到一半时取消 (模拟用户插话 / 客户端断开),
+# 对比不检查取消 (原先的做法, 解码跑完才丢弃结果) 与 should_stop 协作式取消的浪费算力和停止延迟
+# 用法: python -m benchmark.bench_cancellation [--n_layer 24] [--utterances 20] [--max_len 500]
+import argparse
+import random
+import threading
+import time
+
+import torch
+
+from benchmark.common import build_t2s_model, random_t2s_inputs, set_seed
+from inference.cancellation import CancelToken
+
+
+class StepCounter:
+    """作为 should_stop 传给 infer_panel, 统计取消之后还解码了多少步; honor 为 False 时只计数不停止"""
+
+    def __init__(self, token, honor):
+        self.token = token
+        self.honor = honor
+        self.steps_after_cancel = 0
+
+    def __call__(self):
+        if not self.token.is_cancelled():
+            return False
+        self.steps_after_cancel += 1
+        return self.honor
+
+
+def replay(model, inputs, interrupts, max_len, honor, seed):
+    """返回每句 (取消后浪费的解码秒数, 取消后解码的 token 数)"""
+    x, x_lens, prompts, bert = inputs
+    rows = []
+    for i, interrupt_s in enumerate(interrupts):
+        token = CancelToken()
+        counter = StepCounter(token, honor)
+        cancelled_at = []
+
+        def fire():
+            cancelled_at.append(time.perf_counter())
+            token.cancel("interrupted")
+
+        timer = threading.Timer(interrupt_s, fire)
+        set_seed(seed + i)
+        timer.start()
+        with torch.no_grad():
+            model.infer_panel(
+                x, x_lens, prompts, bert,
+                top_k=15, top_p=1.0, temperature=1.0,
+                early_stop_num=max_len, should_stop=counter,
+            )
+        finished = time.perf_counter()
+        timer.cancel()
+        if cancelled_at:
+            rows.append((finished - cancelled_at[0], counter.steps_after_cancel))
+        else:
+            # 解码在打断之前已经结束, 没有浪费
+            rows.append((0.0, 0))
+    return rows
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="wasted T2S compute under interruption-heavy replay (CPU)")
+    parser.add_argument("--config", type=str, default="configs/s1longer-v2.yaml")
+    parser.add_argument("--n_layer", type=int, default=None)
+    parser.add_argument("--utterances", type=int, default=20)
+    parser.add_argument("--max_len", type=int, default=500, help="每句最多解码的 token 数")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model, _ = build_t2s_model(args.config, seed=args.seed, n_layer=args.n_layer)
+    inputs = random_t2s_inputs(model, seed=args.seed)
+
+    # 先完整解码一句, 按其耗时在 10%~90% 之间随机选打断时刻
+    x, x_lens, prompts, bert = inputs
+    set_seed(args.seed)
+    t = time.perf_counter()
+    with torch.no_grad():
+        _, idx = model.infer_panel(x, x_lens, prompts, bert, top_k=15, top_p=1.0, temperature=1.0,
+                                   early_stop_num=args.max_len)
+    full_s = time.perf_counter() - t
+    rng = random.Random(args.seed)
+    interrupts = [full_s * rng.uniform(0.1, 0.9) for _ in range(args.utterances)]
+    print(f"full utterance: {idx} tokens in {full_s * 1000:.0f}ms, {args.utterances} interrupted utterances")
+
+    print(f"{'mode':<12}{'wasted s':>10}{'wasted tok':>12}{'stop p50 ms':>13}{'stop p95 ms':>13}")
+    results = {}
+    for name, honor in (("no cancel", False), ("should_stop", True)):
+        rows = replay(model, inputs, interrupts, args.max_len, honor, args.seed)
+        wasted_s = sum(row[0] for row in rows)
+        wasted_tokens = sum(row[1] for row in rows)
+        latencies = [row[0] * 1000 for row in rows]
+        results[name] = wasted_s
+        print(f"{name:<12}{wasted_s:>10.2f}{wasted_tokens:>12}"
+              f"{percentile(latencies, 0.5):>13.1f}{percentile(latencies, 0.95):>13.1f}")
+    if results["no cancel"] > 0:
+        print(f"wasted compute reduction: {1 - results['should_stop'] / results['no cancel']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
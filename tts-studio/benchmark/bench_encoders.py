@@ -0,0 +1,118 @@
+# 流式编码器对比: 每秒音频的 CPU 耗时 (含 ffmpeg 子进程) 和首字节延迟
+# legacy 为原先的做法: 每段音频单独写一个 ogg 文件 / 单独起一个 ffmpeg 进程
+# 用法: python -m benchmark.bench_encoders [--seconds 20] [--chunk 2.0] [--rate 32000]
+import argparse
+import io
+import resource
+import subprocess
+import time
+
+import numpy as np
+import soundfile as sf
+
+from inference.audio_encoder import open_encoder
+
+
+def cpu_seconds():
+    """本进程加已回收子进程的 user + sys 时间"""
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    child_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return self_usage.ru_utime + self_usage.ru_stime + child_usage.ru_utime + child_usage.ru_stime
+
+
+def speech_like(seconds, rate, seed):
+    """带包络的谐波加噪声, 比纯正弦更接近语音的编码负载"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    f0 = 150 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    audio = sum(np.sin(k * phase) / k for k in range(1, 8))
+    audio *= 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2
+    audio += 0.02 * rng.standard_normal(len(t))
+    return (audio / np.abs(audio).max() * 0.5 * 32767).astype(np.int16)
+
+
+class LegacyEncoder:
+    """原先的 pack_ogg / pack_aac: 每段独立封装"""
+
+    def __init__(self, media_type, rate):
+        self.media_type = media_type
+        self.rate = rate
+
+    def write(self, pcm):
+        if self.media_type == "ogg":
+            buffer = io.BytesIO()
+            with sf.SoundFile(buffer, mode="w", samplerate=self.rate, channels=1, format="ogg") as f:
+                f.write(pcm)
+            return buffer.getvalue()
+        process = subprocess.Popen(
+            ["ffmpeg", "-f", "s16le", "-ar", str(self.rate), "-ac", "1", "-i", "pipe:0",
+             "-c:a", "aac", "-b:a", "192k", "-vn", "-f", "adts", "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        out, _ = process.communicate(input=pcm.tobytes())
+        return out
+
+    def close(self):
+        return b""
+
+    def abort(self):
+        pass
+
+
+def run(make_encoder, audio, chunk_frames):
+    cpu = cpu_seconds()
+    t = time.perf_counter()
+    encoder = make_encoder()
+    first_byte = None
+    total = 0
+    try:
+        for start in range(0, len(audio), chunk_frames):
+            data = encoder.write(audio[start:start + chunk_frames])
+            if data and first_byte is None:
+                first_byte = time.perf_counter() - t
+            total += len(data)
+        data = encoder.close()
+        if data and first_byte is None:
+            first_byte = time.perf_counter() - t
+        total += len(data)
+    finally:
+        encoder.abort()
+    return time.perf_counter() - t, cpu_seconds() - cpu, first_byte, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="streaming encoder CPU cost and first-byte latency")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--chunk", type=float, default=2.0, help="每次写入的音频秒数, 相当于一句话")
+    parser.add_argument("--rate", type=int, default=32000)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    audio = speech_like(args.seconds, args.rate, args.seed)
+    chunk_frames = int(args.chunk * args.rate)
+    cases = [
+        ("raw", lambda: open_encoder("raw", args.rate)),
+        ("wav", lambda: open_encoder("wav", args.rate)),
+        ("ogg legacy", lambda: LegacyEncoder("ogg", args.rate)),
+        ("ogg in-process", lambda: open_encoder("ogg", args.rate)),
+        ("ogg ffmpeg", lambda: open_encoder("ogg", args.rate, "ffmpeg")),
+        ("opus ffmpeg", lambda: open_encoder("opus", args.rate)),
+        ("aac legacy", lambda: LegacyEncoder("aac", args.rate)),
+        ("aac ffmpeg", lambda: open_encoder("aac", args.rate)),
+    ]
+    print(f"{args.seconds:.0f}s audio at {args.rate}Hz, {args.chunk}s per write")
+    print(f"{'encoder':<16}{'wall ms':>10}{'cpu ms/s':>10}{'first byte ms':>15}{'kbps':>8}")
+    for name, make_encoder in cases:
+        try:
+            wall, cpu, first_byte, total = run(make_encoder, audio, chunk_frames)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"{name:<16} failed: {e}")
+            continue
+        first = f"{first_byte * 1000:.1f}" if first_byte is not None else "-"
+        print(f"{name:<16}{wall * 1000:>10.1f}{cpu * 1000 / args.seconds:>10.2f}{first:>15}"
+              f"{total * 8 / args.seconds / 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# 文本前端缓存对比: 每种语言 clean_text 冷启动 vs 内存命中 vs sqlite 命中
+# 用法: python -m benchmark.bench_frontend [--repeat 20] [--db logs/frontend_bench.db]
+import argparse
+import os
+import tempfile
+import time
+
+from text.cleaner import clean_text, set_frontend_cache
+from text.frontend_cache import FrontendCache
+
+SAMPLES = {
+    "zh": ["你好呀，今天过得怎么样？", "我们明天下午三点在图书馆门口见面吧。", "这个问题有点复杂，让我想一想。"],
+    "en": ["Hello there, how are you doing today?", "Let me think about that for a second.", "See you tomorrow at three."],
+    "ja": ["こんにちは、今日はいい天気ですね。", "ちょっと待ってください。", "また明日会いましょう。"],
+    "ko": ["안녕하세요, 오늘 기분이 어때요?", "잠깐만 기다려 주세요.", "내일 다시 만나요."],
+    "yue": ["你食咗饭未呀？", "我哋听日见啦。", "唔该晒你帮手。"],
+}
+
+
+def run(texts, language, version, repeat):
+    """返回每句平均毫秒"""
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            clean_text(text, language, version)
+    return (time.perf_counter() - t) * 1000 / (repeat * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="clean_text cold vs cached latency")
+    parser.add_argument("--languages", type=str, default="zh,en,ja,ko,yue")
+    parser.add_argument("--version", type=str, default="v2")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db", type=str, default="", help="sqlite 路径, 默认用临时文件")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "frontend_cache.db")
+    t = time.perf_counter()
+    version = FrontendCache(0).version
+    print(f"frontend version {version} (hashing dictionaries took {(time.perf_counter() - t) * 1000:.1f} ms)")
+    print(f"{'lang':>5} {'cold ms':>10} {'memory ms':>10} {'sqlite ms':>10} {'speedup':>8}")
+    for language in args.languages.split(","):
+        texts = SAMPLES[language]
+        # 先用别的句子加载模块和词典, 只比较逐句的前端耗时
+        set_frontend_cache(None)
+        clean_text("一二三" if language in ("zh", "yue") else "warm up", language, args.version)
+        cold = run(texts, language, args.version, args.repeat)
+
+        cache = FrontendCache(4096, db_path)
+        set_frontend_cache(cache)
+        run(texts, language, args.version, 1)
+        memory = run(texts, language, args.version, args.repeat)
+
+        # 新实例内存为空, 第一次读 sqlite
+        set_frontend_cache(FrontendCache(4096, db_path))
+        disk = run(texts, language, args.version, 1)
+        print(f"{language:>5} {cold:>10.3f} {memory:>10.3f} {disk:>10.3f} {cold / max(memory, 1e-6):>7.0f}x")
+    set_frontend_cache(None)
+
+
+if __name__ == "__main__":
+    main()
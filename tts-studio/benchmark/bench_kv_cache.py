@@ -0,0 +1,84 @@
+# T2S 解码 kv 缓存对比: 逐步 torch.cat vs 预分配定长缓冲区
+# 用法: python -m benchmark.bench_kv_cache [--n_layer 24] [--max_len 1500]
+import argparse
+import time
+
+import torch
+
+from benchmark.common import build_t2s_model, random_t2s_inputs, set_seed
+
+
+def check_tokens_identical(model, inputs, early_stop_num, seed):
+    x, x_lens, prompts, bert = inputs
+    results = []
+    for static in (False, True):
+        set_seed(seed)
+        with torch.no_grad():
+            y, idx = model.infer_panel(
+                x, x_lens, prompts, bert,
+                top_k=15, top_p=1.0, temperature=1.0,
+                early_stop_num=early_stop_num, static_kv_cache=static,
+            )
+        results.append((y, idx))
+    (y0, idx0), (y1, idx1) = results
+    return idx0 == idx1 and torch.equal(y0, y1), y0.shape[1]
+
+
+def per_token_latency(model, inputs, max_len, bucket, static):
+    """直接驱动 t2s_transformer, 返回 [(kv 长度, 每 token 毫秒)]"""
+    x, x_lens, prompts, bert = inputs
+    transformer = model.t2s_transformer
+    with torch.no_grad():
+        x_emb = model.ar_text_position(model.ar_text_embedding(x) + model.bert_proj(bert.transpose(1, 2)))
+        y_pos = model.ar_audio_position(model.ar_audio_embedding(prompts))
+        xy_pos = torch.concat([x_emb, y_pos], dim=1)
+        prompt_len = xy_pos.shape[1]
+        attn_mask = torch.zeros((prompt_len, prompt_len), dtype=torch.bool)
+        if static:
+            xy_dec, k_cache, v_cache = transformer.process_prompt_static(xy_pos, attn_mask, prompt_len + max_len)
+        else:
+            xy_dec, k_cache, v_cache = transformer.process_prompt(xy_pos, attn_mask)
+        token = xy_dec[:, -1:]
+        kv_len = prompt_len
+        rows = []
+        t = time.perf_counter()
+        for step in range(1, max_len + 1):
+            if static:
+                token = transformer.decode_next_token_static(token, k_cache, v_cache, kv_len)
+            else:
+                token, k_cache, v_cache = transformer.decode_next_token(token, k_cache, v_cache)
+            kv_len += 1
+            if step % bucket == 0:
+                now = time.perf_counter()
+                rows.append((kv_len, (now - t) * 1000 / bucket))
+                t = now
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="T2S static kv cache benchmark (CPU)")
+    parser.add_argument("--config", type=str, default="configs/s1longer-v2.yaml")
+    parser.add_argument("--n_layer", type=int, default=None)
+    parser.add_argument("--max_len", type=int, default=1500)
+    parser.add_argument("--bucket", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model, _ = build_t2s_model(args.config, seed=args.seed, n_layer=args.n_layer)
+    inputs = random_t2s_inputs(model, seed=args.seed)
+
+    identical, n_tokens = check_tokens_identical(model, inputs, early_stop_num=300, seed=args.seed)
+    print(f"tokens identical (fixed seed, {n_tokens} tokens): {identical}")
+
+    cat_rows = per_token_latency(model, inputs, args.max_len, args.bucket, static=False)
+    static_rows = per_token_latency(model, inputs, args.max_len, args.bucket, static=True)
+    print(f"{'kv_len':>8} {'cat ms/tok':>12} {'static ms/tok':>14} {'speedup':>8}")
+    for (kv_len, cat_ms), (_, static_ms) in zip(cat_rows, static_rows):
+        print(f"{kv_len:>8} {cat_ms:>12.3f} {static_ms:>14.3f} {cat_ms / static_ms:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# 长文本: 整段一次 T2S + 声码器 vs 按音素预算切块 (逐块 / 多块并行) 后 crossfade 拼接, 随机权重模型,
+# 看总耗时随文本长度的增长; 整段的 T2S 序列越长每步越慢 (超过 1500 步还会被截断), 切块后每字耗时基本不变
+# 用法: python -m benchmark.bench_long_text [--size small] [--chars 50 100 200 400] [--budget 80] [--parallel 2]
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+from benchmark.common import MODEL_SIZES, build_sovits_model, build_t2s_model, random_refer, set_seed
+from benchmark.suite import PHONES_PER_CHAR, TOKENS_PER_CHAR, suppress_eos
+from inference.long_text import CrossfadeJoiner
+
+
+def synthesize(model, vq_model, refer, ge, phones, n_tokens, n_prompt, seed):
+    """单块: T2S 固定生成 n_tokens 个 token, 再过声码器"""
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.LongTensor(phones).unsqueeze(0)
+    prompts = torch.randint(0, model.EOS, (1, n_prompt), generator=generator)
+    bert = torch.randn((1, 1024, len(phones)), generator=generator)
+    with torch.no_grad():
+        y, idx = model.infer_panel(x, torch.LongTensor([len(phones)]), prompts, bert, top_k=15,
+                                   early_stop_num=n_tokens, generator=generator)
+        codes = y[:, n_prompt:]
+        return vq_model.decode(codes.unsqueeze(0), x, refer, ge=ge, generator=generator).numpy()[0, 0]
+
+
+def run(model, vq_model, refer, ge, chunks, args, parallel):
+    """chunks: [(phones, n_tokens)]; 返回 (耗时, 音频采样点数)"""
+    joiner = CrossfadeJoiner(int(32000 * 0.03))
+    t = time.perf_counter()
+    jobs = [(phones, n_tokens, args.seed + i) for i, (phones, n_tokens) in enumerate(chunks)]
+    if parallel > 1:
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            audios = list(executor.map(lambda job: synthesize(model, vq_model, refer, ge, job[0], job[1], args.prompt_tokens, job[2]), jobs))
+    else:
+        audios = [synthesize(model, vq_model, refer, ge, phones, n_tokens, args.prompt_tokens, seed) for phones, n_tokens, seed in jobs]
+    audio = np.concatenate([joiner.push(a) for a in audios] + [joiner.flush()])
+    return time.perf_counter() - t, len(audio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="long text: whole-sequence vs token-budget chunks")
+    parser.add_argument("--size", type=str, default="small", choices=list(MODEL_SIZES))
+    parser.add_argument("--chars", type=int, nargs="+", default=[50, 100, 200, 400])
+    parser.add_argument("--budget", type=int, default=80, help="每块的音素数上限, 同 tts_api -tb")
+    parser.add_argument("--parallel", type=int, default=2, help="同时合成的块数, 同 tts_api -tp")
+    parser.add_argument("--prompt_tokens", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    t2s_overrides, sovits_overrides = MODEL_SIZES[args.size]
+    model, _ = build_t2s_model(seed=args.seed, **t2s_overrides)
+    suppress_eos(model)
+    vq_model, hps = build_sovits_model(seed=args.seed, **sovits_overrides)
+    refer = random_refer(hps, seed=args.seed)
+    with torch.no_grad():
+        ge = vq_model.get_ge(refer)
+    set_seed(args.seed)
+
+    chars_per_chunk = max(1, args.budget // PHONES_PER_CHAR)
+    print(f"{'chars':>6}{'whole s':>10}{'chunked s':>11}{'parallel s':>12}{'whole ms/char':>15}{'chunked ms/char':>17}")
+    for n_chars in args.chars:
+        generator = torch.Generator().manual_seed(args.seed)
+        phones = torch.randint(1, 300, (n_chars * PHONES_PER_CHAR,), generator=generator).tolist()
+        whole = [(phones, n_chars * TOKENS_PER_CHAR)]
+        chunked = []
+        for start in range(0, n_chars, chars_per_chunk):
+            n = min(chars_per_chunk, n_chars - start)
+            chunked.append((phones[start * PHONES_PER_CHAR:(start + n) * PHONES_PER_CHAR], n * TOKENS_PER_CHAR))
+        whole_s, _ = run(model, vq_model, refer, ge, whole, args, 1)
+        chunked_s, _ = run(model, vq_model, refer, ge, chunked, args, 1)
+        parallel_s, _ = run(model, vq_model, refer, ge, chunked, args, args.parallel)
+        print(f"{n_chars:>6}{whole_s:>10.2f}{chunked_s:>11.2f}{parallel_s:>12.2f}"
+              f"{whole_s / n_chars * 1000:>15.1f}{chunked_s / n_chars * 1000:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# 指标记录的开销: 每次阶段计时的耗时, 开启 (-mx) 与关闭对比; 一个请求约有 句数 x 4 次阶段计时
+# 用法: python -m benchmark.bench_metrics [--iters 200000]
+import argparse
+import time
+
+from inference.metrics import Metrics
+
+
+def per_call_ns(metrics, iters):
+    timer = metrics.request()
+    t = time.perf_counter()
+    for _ in range(iters):
+        with timer.stage("t2s"):
+            pass
+    return (time.perf_counter() - t) / iters * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="metrics stage timer overhead")
+    parser.add_argument("--iters", type=int, default=200000)
+    args = parser.parse_args()
+
+    for name, enabled in (("disabled", False), ("enabled", True)):
+        metrics = Metrics(enabled=enabled)
+        per_call_ns(metrics, 1000)
+        print(f"{name:<10}{per_call_ns(metrics, args.iters):>10.0f} ns / stage")
+    metrics = Metrics(enabled=True)
+    for _ in range(1000):
+        metrics.request().record("t2s", 0.1)
+    t = time.perf_counter()
+    text = metrics.render()
+    print(f"render: {(time.perf_counter() - t) * 1000:.2f} ms, {len(text)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# 多进程服务的吞吐扩展和内存: 依次以 -w 1 / 2 / 4 ... 启动 tts_api, 并发数取 worker 数的两倍压测,
+# 内存按 PSS 统计 (共享页按进程数均摊, 各进程相加即为实际占用), 与 N 个独立单进程服务的内存对比
+# 用法 (Linux, CPU): python -m benchmark.bench_prefork --api_args "-s xxx.pth -g xxx.ckpt -dr 123.wav -dt 一二三。 -dl zh" [--workers 1 2 4]
+import argparse
+import json
+import shlex
+import subprocess
+import sys
+
+from benchmark.load_test import DEFAULT_TEXT, run_level
+from benchmark.profile_startup import wait_ready
+
+
+def children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def pss_mb(pid):
+    """PSS: 私有页加上共享页按共享进程数均摊"""
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(api_args, workers, port, requests, text, timeout):
+    process = subprocess.Popen(
+        [sys.executable, "tts_api.py", "-a", "127.0.0.1", "-p", str(port), "-w", str(workers)] + api_args,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port, timeout)
+        payload = {"text": text, "text_language": "zh", "cut_punc": "，。"}
+        url = f"http://127.0.0.1:{port}/"
+        # 预热: 每个 worker 至少处理一次请求, 懒加载的部分不计入
+        run_level(url, payload, workers * 2, workers * 2)
+        row = run_level(url, payload, workers * 2, requests)
+        pids = [process.pid] + children(process.pid)
+        row["workers"] = workers
+        row["processes"] = len(pids)
+        row["pss_mb"] = round(sum(pss_mb(pid) for pid in pids), 1)
+        row["rss_sum_mb"] = round(sum(rss_mb(pid) for pid in pids), 1)
+        return row
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="multi-process serving: throughput scaling and shared-weight memory")
+    parser.add_argument("--api_args", type=str, default="", help="传给 tts_api.py 的参数, 需要能用默认参考音频合成")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--text", type=str, default=DEFAULT_TEXT)
+    parser.add_argument("--port", type=int, default=9891)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", type=str, default=None, help="结果写入json文件")
+    args = parser.parse_args()
+
+    api_args = shlex.split(args.api_args)
+    rows = [measure(api_args, n, args.port, args.requests, args.text, args.timeout) for n in sorted(set(args.workers))]
+    base = rows[0]
+    print(f"{'workers':>8}{'rps':>8}{'scaling':>9}{'pss MB':>10}{'N x single MB':>15}{'saved MB':>10}")
+    for row in rows:
+        scaling = row["throughput_rps"] / base["throughput_rps"] * base["workers"]
+        # N 个独立服务: 单进程服务的内存乘以 N
+        independent = base["pss_mb"] / base["workers"] * row["workers"]
+        row["independent_mb"] = round(independent, 1)
+        print(f"{row['workers']:>8}{row['throughput_rps']:>8.2f}{scaling:>8.2f}x{row['pss_mb']:>10.0f}"
+              f"{independent:>15.0f}{independent - row['pss_mb']:>10.0f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# T2S 采样对比: 原先的 sample() (整表排序 + gather/scatter 重复惩罚 + 每步同步检查 EOS)
+# vs sample_fused (top_k 候选上采样 + 计数张量 + 每 N 步检查一次 EOS)
+# 用法: python -m benchmark.bench_sampling [--n_layer 24] [--max_len 500] [--top_k 15] [--top_p 0.6]
+import argparse
+import time
+
+import torch
+
+from AR.models.utils import sample, sample_fused
+from benchmark.common import build_t2s_model, random_t2s_inputs, set_seed
+
+
+def sampler_us(vocab_size, history, top_k, top_p, temperature, iters, seed):
+    """单次采样的耗时 (微秒), 只计采样本身"""
+    generator = torch.Generator().manual_seed(seed)
+    logits = torch.randn((vocab_size,), generator=generator)
+    previous = torch.randint(0, vocab_size, (1, history), generator=generator)
+    counts = torch.bincount(previous[0], minlength=vocab_size)
+    rows = {}
+    for name, fn in (
+        ("sample", lambda: sample(logits.clone(), previous, top_k=top_k, top_p=top_p,
+                                  repetition_penalty=1.35, temperature=temperature)),
+        ("sample_fused", lambda: sample_fused(logits, counts, top_k=top_k, top_p=top_p,
+                                              repetition_penalty=1.35, temperature=temperature)),
+    ):
+        for _ in range(10):
+            fn()
+        t = time.perf_counter()
+        for _ in range(iters):
+            fn()
+        rows[name] = (time.perf_counter() - t) / iters * 1e6
+    return rows
+
+
+def tokens_per_second(model, inputs, args, fused):
+    x, x_lens, prompts, bert = inputs
+    tokens = 0
+    elapsed = 0.0
+    for i in range(args.repeats):
+        set_seed(args.seed + i)
+        t = time.perf_counter()
+        with torch.no_grad():
+            y, idx = model.infer_panel(
+                x, x_lens, prompts, bert,
+                top_k=args.top_k, top_p=args.top_p, temperature=args.temperature,
+                early_stop_num=args.max_len, static_kv_cache=args.static_kv_cache,
+                fused_sampling=fused, eos_check_interval=args.eos_check_interval,
+            )
+        elapsed += time.perf_counter() - t
+        tokens += y.shape[1] - prompts.shape[1]
+    return tokens / elapsed, tokens / args.repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="T2S fused sampling benchmark (CPU)")
+    parser.add_argument("--config", type=str, default="configs/s1longer-v2.yaml")
+    parser.add_argument("--n_layer", type=int, default=None)
+    parser.add_argument("--max_len", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top_k", type=int, default=15)
+    parser.add_argument("--top_p", type=float, default=0.6)
+    parser.add_argument("--temperature", type=float, default=0.6)
+    parser.add_argument("--eos_check_interval", type=int, default=8)
+    parser.add_argument("--static_kv_cache", action="store_true")
+    parser.add_argument("--iters", type=int, default=2000, help="采样微基准的调用次数")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model, _ = build_t2s_model(args.config, seed=args.seed, n_layer=args.n_layer)
+    inputs = random_t2s_inputs(model, seed=args.seed)
+    vocab_size = model.ar_predict_layer.out_features
+
+    print(f"sampler only (vocab {vocab_size}, top_k {args.top_k}, top_p {args.top_p}):")
+    for history in (100, 500, 1000):
+        rows = sampler_us(vocab_size, history, args.top_k, args.top_p, args.temperature, args.iters, args.seed)
+        print(f"  history {history:>5}: sample {rows['sample']:8.1f}us  sample_fused {rows['sample_fused']:8.1f}us"
+              f"  {rows['sample'] / rows['sample_fused']:5.2f}x")
+
+    before, before_tokens = tokens_per_second(model, inputs, args, fused=False)
+    after, after_tokens = tokens_per_second(model, inputs, args, fused=True)
+    print(f"infer_panel tokens/s: before {before:.1f} ({before_tokens:.0f} tok/utt), "
+          f"after {after:.1f} ({after_tokens:.0f} tok/utt), {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
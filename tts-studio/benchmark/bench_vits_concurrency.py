@@ -0,0 +1,115 @@
+# VITS 并发负载: 多个客户端同时请求 /vits-tts/, 另一个线程每 20ms 请求一次 /voices (不做推理的接口),
+# 它的耗时就是事件循环被阻塞的时长; 同时统计 VITS 的吞吐 (请求数/秒, 音频字节/秒) 和首字节耗时.
+# 服务端开了 -mx 时一并读取 /metrics 里的 tts_event_loop_lag_seconds.
+# 先启动 tts_api.py [-mx] [-vb 4], 然后:
+# python -m benchmark.bench_vits_concurrency [--url http://127.0.0.1:9880] [--clients 4] [--duration 30]
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+TEXT = "こんにちは。今日はいい天気ですね。散歩に行きましょうか。それとも家でゆっくりしますか。"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def vits_client(url, payload, deadline, results):
+    data = json.dumps(payload).encode("utf-8")
+    while time.perf_counter() < deadline:
+        request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+        t = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            first = response.read(1)
+            ttfb = time.perf_counter() - t
+            body = first + response.read()
+        results.append((ttfb, time.perf_counter() - t, len(body)))
+
+
+def probe(url, interval, stop, latencies):
+    while not stop.is_set():
+        t = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            response.read()
+        latencies.append(time.perf_counter() - t)
+        stop.wait(interval)
+
+
+def server_loop_lag(base):
+    """/metrics 里事件循环阻塞时长的 (总和, 次数), 未开启 -mx 时返回 None"""
+    try:
+        with urllib.request.urlopen(base + "/metrics") as response:
+            text = response.read().decode("utf-8")
+    except urllib.error.HTTPError:
+        return None
+    values = {}
+    for line in text.splitlines():
+        for suffix in ("_sum", "_count"):
+            if line.startswith("tts_event_loop_lag_seconds" + suffix):
+                values[suffix] = float(line.split()[-1])
+    return values.get("_sum", 0.0), values.get("_count", 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VITS under concurrent load: event-loop stall and throughput")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:9880")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--language_code", type=str, default="JA")
+    parser.add_argument("--speaker_id", type=int, default=0)
+    parser.add_argument("--probe_interval", type=float, default=0.02)
+    parser.add_argument("--output", type=str, default=None, help="结果写入json文件")
+    args = parser.parse_args()
+
+    base = args.url.rstrip("/")
+    payload = {"text": TEXT, "language_code": args.language_code, "speaker_id": args.speaker_id}
+    # 预热: 第一次请求会加载 VITS 模型
+    vits_client(base + "/vits-tts/", payload, time.perf_counter(), [])
+    lag_before = server_loop_lag(base)
+
+    stop = threading.Event()
+    latencies = []
+    prober = threading.Thread(target=probe, args=(base + "/voices", args.probe_interval, stop, latencies), daemon=True)
+    prober.start()
+    results = []
+    deadline = time.perf_counter() + args.duration
+    t = time.perf_counter()
+    clients = [threading.Thread(target=vits_client, args=(base + "/vits-tts/", payload, deadline, results))
+               for _ in range(args.clients)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - t
+    stop.set()
+    prober.join()
+    lag_after = server_loop_lag(base)
+
+    result = {
+        "clients": args.clients,
+        "requests": len(results),
+        "requests_per_s": round(len(results) / elapsed, 2),
+        "bytes_per_s": round(sum(r[2] for r in results) / elapsed),
+        "ttfb_ms_p50": round(percentile([r[0] for r in results], 0.5) * 1000, 1),
+        "total_ms_p50": round(percentile([r[1] for r in results], 0.5) * 1000, 1),
+        "probe_ms_p50": round(percentile(latencies, 0.5) * 1000, 1),
+        "probe_ms_p99": round(percentile(latencies, 0.99) * 1000, 1),
+        "probe_ms_max": round(max(latencies, default=0.0) * 1000, 1),
+    }
+    if lag_before is not None and lag_after is not None and lag_after[1] > lag_before[1]:
+        result["server_loop_lag_ms_mean"] = round((lag_after[0] - lag_before[0]) / (lag_after[1] - lag_before[1]) * 1000, 2)
+    print(f"{result['requests']} requests in {elapsed:.1f}s ({result['requests_per_s']}/s), ttfb p50 {result['ttfb_ms_p50']}ms")
+    print(f"event loop probe: p50 {result['probe_ms_p50']}ms p99 {result['probe_ms_p99']}ms max {result['probe_ms_max']}ms")
+    if "server_loop_lag_ms_mean" in result:
+        print(f"server loop lag: mean {result['server_loop_lag_ms_mean']}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
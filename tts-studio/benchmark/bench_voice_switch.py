@@ -0,0 +1,66 @@
+# 语音切换: 同一条语音分别以原始参考音频和语音包作为参考, 对比切换后第一句的首字节耗时.
+# 原始参考音频要经过 ffmpeg / HuBERT / BERT, 语音包只读一个 mmap 文件.
+# 先 python tts_api.py -cv 编译语音包, 再启动 tts_api.py -pc 0 (关闭参考音频特征缓存, 每次请求都重新准备参考), 然后:
+# python -m benchmark.bench_voice_switch [--url http://127.0.0.1:9880] [--rounds 5]
+import argparse
+import json
+import time
+import urllib.request
+
+TEXT = "好的。"
+
+
+def fetch_json(url):
+    with urllib.request.urlopen(url) as response:
+        return json.loads(response.read())
+
+
+def first_byte(url, payload):
+    data = json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    t = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read(1)
+        ttfb = time.perf_counter() - t
+        response.read()
+    return ttfb
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="voice switching: raw reference audio vs precompiled voice pack")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:9880")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--output", type=str, default=None, help="结果写入json文件")
+    args = parser.parse_args()
+
+    base = args.url.rstrip("/")
+    voices = [voice for voice in fetch_json(base + "/voices") if voice.get("pack")]
+    if not voices:
+        print("voices_config.json 里没有编译过的语音, 先运行 python tts_api.py -cv")
+        return
+    results = []
+    for voice in voices:
+        common = {"prompt_text": voice["text"], "prompt_language": voice["language"], "text": TEXT, "text_language": "zh"}
+        raw, pack = [], []
+        for _ in range(args.rounds):
+            raw.append(first_byte(base + "/", dict(common, refer_wav_path=voice["path"])))
+            pack.append(first_byte(base + "/", dict(common, refer_wav_path=voice["pack"])))
+        result = {
+            "name": voice.get("name"),
+            "raw_ttfb_ms": round(median(raw) * 1000, 1),
+            "pack_ttfb_ms": round(median(pack) * 1000, 1),
+        }
+        results.append(result)
+        print(f"{result['name']}: raw {result['raw_ttfb_ms']}ms, pack {result['pack_ttfb_ms']}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
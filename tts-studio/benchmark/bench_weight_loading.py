@@ -0,0 +1,134 @@
+# 权重加载对比: .pth/.ckpt (torch.load) vs .safetensors (mmap), 每次在新的子进程里测加载耗时和峰值 RSS
+# 用法: python -m benchmark.bench_weight_loading [-g GPT.ckpt] [-s SoVITS.pth] [--runs 3]
+# 不指定权重时用 configs 下的配置生成随机权重 (SoVITS 含 enc_q, 与训练导出的文件一致)
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import torch
+
+
+def peak_rss_mb():
+    # Linux 下 ru_maxrss 单位是 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_sovits(path):
+    from module.models import SynthesizerTrn
+    from inference.weights import load_checkpoint, load_weights
+    from utils import HParams
+
+    dict_s2 = load_checkpoint(path)
+    hps = HParams(**dict_s2["config"])
+    hps.model.semantic_frame_rate = "25hz"
+    hps.model.version = "v1" if dict_s2["weight"]["enc_p.text_embedding.weight"].shape[0] == 322 else "v2"
+    model = SynthesizerTrn(
+        hps.data.filter_length // 2 + 1,
+        hps.train.segment_size // hps.data.hop_length,
+        n_speakers=hps.data.n_speakers,
+        **vars(hps.model)
+    )
+    del model.enc_q
+    load_weights(model, dict_s2["weight"], strict=False)
+    return model.eval()
+
+
+def load_gpt(path):
+    from AR.models.t2s_lightning_module import Text2SemanticLightningModule
+    from inference.weights import load_checkpoint, load_weights
+
+    dict_s1 = load_checkpoint(path)
+    model = Text2SemanticLightningModule(dict_s1["config"], "****", is_train=False)
+    load_weights(model, dict_s1["weight"])
+    return model.eval()
+
+
+def child(kind, path):
+    # 先导入模型代码, 基线 RSS 里扣除 import 的开销
+    import AR.models.t2s_lightning_module  # noqa: F401
+    import module.models  # noqa: F401
+    import inference.weights  # noqa: F401
+
+    baseline = peak_rss_mb()
+    t = time.perf_counter()
+    (load_gpt if kind == "gpt" else load_sovits)(path)
+    elapsed = time.perf_counter() - t
+    print(json.dumps({"load_ms": elapsed * 1000, "peak_rss_mb": peak_rss_mb(), "baseline_rss_mb": baseline}))
+
+
+def measure(kind, path, runs):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmark.bench_weight_loading", "--child", kind, path],
+            check=True, capture_output=True, text=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    load_ms = sorted(r["load_ms"] for r in results)[len(results) // 2]
+    peak = max(r["peak_rss_mb"] for r in results)
+    baseline = min(r["baseline_rss_mb"] for r in results)
+    return load_ms, peak, peak - baseline
+
+
+def random_checkpoints(output_dir, seed):
+    """随机权重的 GPT / SoVITS 文件, 格式与训练导出的一致"""
+    from benchmark.common import build_t2s_model, load_sovits_config, set_seed
+    from module.models import SynthesizerTrn
+
+    t2s, config = build_t2s_model(seed=seed)
+    gpt_path = os.path.join(output_dir, "random-gpt.ckpt")
+    torch.save({"weight": {"model." + k: v for k, v in t2s.state_dict().items()}, "config": config}, gpt_path)
+
+    set_seed(seed)
+    hps = load_sovits_config()
+    vq_model = SynthesizerTrn(
+        hps["data"]["filter_length"] // 2 + 1,
+        hps["train"]["segment_size"] // hps["data"]["hop_length"],
+        n_speakers=hps["data"]["n_speakers"],
+        **dict(hps["model"], version="v2")
+    )
+    sovits_path = os.path.join(output_dir, "random-sovits.pth")
+    torch.save({"weight": vq_model.state_dict(), "config": hps, "info": "random"}, sovits_path)
+    return gpt_path, sovits_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="checkpoint load time and peak RSS: torch.load vs safetensors mmap")
+    parser.add_argument("-g", "--gpt_path", type=str, default="")
+    parser.add_argument("-s", "--sovits_path", type=str, default="")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output_dir", type=str, default="", help="转换后的 .safetensors 存放目录, 默认用临时目录")
+    parser.add_argument("--child", nargs=2, metavar=("KIND", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    from inference.weights import convert
+
+    output_dir = args.output_dir or tempfile.mkdtemp()
+    os.makedirs(output_dir, exist_ok=True)
+    gpt_path, sovits_path = args.gpt_path, args.sovits_path
+    if not gpt_path or not sovits_path:
+        random_gpt, random_sovits = random_checkpoints(output_dir, args.seed)
+        gpt_path = gpt_path or random_gpt
+        sovits_path = sovits_path or random_sovits
+
+    print(f"{'model':<8}{'format':<14}{'file MB':>10}{'load ms':>10}{'peak RSS MB':>14}{'+RSS MB':>10}")
+    for kind, path in (("gpt", gpt_path), ("sovits", sovits_path)):
+        name = os.path.splitext(os.path.basename(path))[0] + ".safetensors"
+        converted = convert(path, os.path.join(output_dir, name))
+        for fmt, p in ((os.path.splitext(path)[1], path), (".safetensors", converted)):
+            load_ms, peak, delta = measure(kind, p, args.runs)
+            print(f"{kind:<8}{fmt:<14}{os.path.getsize(p) / 2 ** 20:>10.1f}{load_ms:>10.1f}{peak:>14.1f}{delta:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# ONNX 引擎检查: 与 PyTorch 路径的数值一致性和 CPU 延迟
+# 用法: python -m benchmark.check_onnx_parity [--n_layer 24] [--steps 100] [--tokens 200]
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from AR.models.t2s_model_onnx import Text2SemanticDecoder as OnnxText2SemanticDecoder
+from benchmark.common import build_sovits_model, build_t2s_model, random_refer, random_t2s_inputs, set_seed
+from inference.onnx_engine import OnnxEngine
+from inference.onnx_export import META, export_sovits, export_t2s
+from module.models_onnx import SynthesizerTrn as OnnxSynthesizerTrn
+
+
+def max_diff(a, b):
+    a = a.detach().cpu().numpy() if isinstance(a, torch.Tensor) else a
+    b = b.detach().cpu().numpy() if isinstance(b, torch.Tensor) else b
+    return float(np.abs(a.astype(np.float32) - b.astype(np.float32)).max())
+
+
+def export_random_models(args, output_dir):
+    t2s, config = build_t2s_model(seed=args.seed, n_layer=args.n_layer)
+    onnx_t2s = OnnxText2SemanticDecoder(config=config)
+    onnx_t2s.load_state_dict(t2s.state_dict())
+    onnx_t2s.top_k = torch.LongTensor([15])
+    onnx_t2s.eval()
+    export_t2s(onnx_t2s, output_dir)
+
+    vq_model, hps = build_sovits_model(seed=args.seed)
+    model_cfg = dict(hps["model"], semantic_frame_rate="25hz", version="v2")
+    onnx_vq_model = OnnxSynthesizerTrn(
+        hps["data"]["filter_length"] // 2 + 1,
+        hps["train"]["segment_size"] // hps["data"]["hop_length"],
+        n_speakers=hps["data"]["n_speakers"],
+        **model_cfg
+    )
+    onnx_vq_model.load_state_dict(vq_model.state_dict(), strict=False)
+    onnx_vq_model.eval()
+    export_sovits(onnx_vq_model, output_dir)
+    return t2s, vq_model, hps
+
+
+def check_t2s(engine, t2s, inputs, steps):
+    x, x_lens, prompts, bert = inputs
+    with torch.no_grad():
+        x_emb = t2s.ar_text_position(t2s.ar_text_embedding(x) + t2s.bert_proj(bert.transpose(1, 2)))
+    onnx_x = engine.encoder.run(phoneme_ids=x.numpy(), bert=bert.numpy())[0]
+    print(f"encoder max|diff|: {max_diff(x_emb, onnx_x.numpy()):.2e}")
+
+    # ONNX 首步采样得到 y, 之后两边用同样的 y 逐步解码, 比较 logits
+    y, k, v, y_emb, x_example = engine.first_stage_decoder.run(x=onnx_x, prompts=prompts.numpy())
+    y_torch = torch.from_numpy(y.numpy())
+    with torch.no_grad():
+        y_pos = t2s.ar_audio_position(t2s.ar_audio_embedding(y_torch[:, :-1]))
+        xy_pos = torch.concat([x_emb, y_pos], dim=1)
+        x_len, y_len = x_emb.shape[1], y_pos.shape[1]
+        x_attn_mask = torch.nn.functional.pad(torch.zeros((x_len, x_len), dtype=torch.bool), (0, y_len), value=True)
+        y_attn_mask = torch.nn.functional.pad(
+            torch.triu(torch.ones(y_len, y_len, dtype=torch.bool), diagonal=1), (x_len, 0), value=False)
+        _, k_cache, v_cache = t2s.t2s_transformer.process_prompt(xy_pos, torch.concat([x_attn_mask, y_attn_mask], dim=0))
+
+    diffs = []
+    torch_time = onnx_time = 0.0
+    for step in range(steps):
+        with torch.no_grad():
+            t = time.perf_counter()
+            last = y_torch[:, -1:]
+            pos = t2s.ar_audio_position.pe[:, y_torch.shape[1] - 1].unsqueeze(1)
+            token = t2s.ar_audio_embedding(last) * t2s.ar_audio_position.x_scale + t2s.ar_audio_position.alpha * pos
+            xy_dec, k_cache, v_cache = t2s.t2s_transformer.decode_next_token(token, k_cache, v_cache)
+            logits = t2s.ar_predict_layer(xy_dec[:, -1])
+            torch_time += time.perf_counter() - t
+        t = time.perf_counter()
+        y, k, v, y_emb, onnx_logits, _ = engine.stage_decoder.run(iy=y, ik=k, iv=v, iy_emb=y_emb, ix_example=x_example)
+        onnx_time += time.perf_counter() - t
+        diffs.append(max_diff(logits, onnx_logits.numpy()))
+        y_torch = torch.from_numpy(y.numpy())
+    print(f"t2s logits max|diff| over {steps} steps: {max(diffs):.2e}")
+    print(f"t2s per token: torch {torch_time * 1000 / steps:.2f} ms, onnx {onnx_time * 1000 / steps:.2f} ms")
+
+
+def check_sovits(engine, vq_model, hps, tokens, seed, repeat=3):
+    generator = torch.Generator().manual_seed(seed)
+    codes = torch.randint(0, 1024, (1, 1, tokens), generator=generator)
+    phones = torch.randint(1, 300, (1, tokens // 3), generator=generator)
+    refer = random_refer(hps, seed=seed)
+    with torch.no_grad():
+        ge = vq_model.get_ge(refer)
+        t = time.perf_counter()
+        for _ in range(repeat):
+            audio = vq_model.decode(codes, phones, refer, noise_scale=0.0, ge=ge).numpy()[0, 0]
+        torch_time = (time.perf_counter() - t) / repeat
+    t = time.perf_counter()
+    for _ in range(repeat):
+        onnx_audio = engine.decode(codes.numpy(), phones.numpy(), ge.numpy(), noise_scale=0.0)
+    onnx_time = (time.perf_counter() - t) / repeat
+    n = min(len(audio), len(onnx_audio))
+    noise = audio[:n] - onnx_audio[:n]
+    snr = 10 * np.log10((audio[:n] ** 2).sum() / max((noise ** 2).sum(), 1e-12))
+    print(f"sovits: {len(audio)} vs {len(onnx_audio)} samples, max|diff| {np.abs(noise).max():.2e}, SNR {snr:.1f} dB")
+    print(f"sovits decode {tokens} tokens: torch {torch_time * 1000:.1f} ms, onnx {onnx_time * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX engine parity and CPU latency vs PyTorch")
+    parser.add_argument("--n_layer", type=int, default=24)
+    parser.add_argument("--phones", type=int, default=64)
+    parser.add_argument("--prompt", type=int, default=100)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--output_dir", type=str, default="", help="导出目录, 默认用临时目录")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    torch.set_grad_enabled(False)
+    output_dir = args.output_dir or tempfile.mkdtemp()
+    os.makedirs(output_dir, exist_ok=True)
+    t2s, vq_model, hps = export_random_models(args, output_dir)
+    # 随机权重没有对应的权重文件, meta 里只写解码需要的字段
+    with open(os.path.join(output_dir, META), "w", encoding="utf-8") as f:
+        json.dump({"EOS": t2s.EOS, "top_k": 15, "gpt": None, "sovits": None}, f)
+    engine = OnnxEngine(output_dir, args.threads)
+
+    set_seed(args.seed)
+    check_t2s(engine, t2s, random_t2s_inputs(t2s, args.phones, args.prompt, args.seed), args.steps)
+    check_sovits(engine, vq_model, hps, args.tokens, args.seed)
+
+
+if __name__ == "__main__":
+    main()
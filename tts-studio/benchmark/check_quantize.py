@@ -0,0 +1,139 @@
+# int8 动态量化检查: 固定随机种子下的 token 一致率 / logits 偏差, 以及 CPU 每 token 延迟和权重内存
+# 用法: python -m benchmark.check_quantize [--n_layer 24] [--runs 5] [--bert_path ...] [--hubert_path ...]
+import argparse
+import copy
+import time
+
+import torch
+
+from AR.models.t2s_quantized import QuantizedT2SBlock, quantize_linear_layers, quantize_t2s_model
+from benchmark.common import build_t2s_model, random_t2s_inputs, set_seed
+
+
+def weight_nbytes(model):
+    """权重占用的字节数, 共享的张量只算一次, 量化线性层按打包后的 int8 权重计算"""
+    tensors = {}
+
+    def add(tensor):
+        if tensor is not None:
+            tensors[tensor.data_ptr()] = tensor.element_size() * tensor.nelement()
+
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        add(tensor)
+    linears = [m for m in model.modules() if isinstance(m, torch.ao.nn.quantized.dynamic.Linear)]
+    for block in getattr(getattr(model, "t2s_transformer", None), "blocks", []):
+        if isinstance(block, QuantizedT2SBlock):
+            linears += [block.qkv, block.out, block.mlp1, block.mlp2]
+            for tensor in (block.norm_w1, block.norm_b1, block.norm_w2, block.norm_b2):
+                add(tensor)
+    for linear in linears:
+        for tensor in linear._weight_bias():
+            add(tensor)
+    return sum(tensors.values())
+
+
+def decode(model, inputs, seed, top_k):
+    x, x_lens, prompts, bert = inputs
+    set_seed(seed)
+    t = time.perf_counter()
+    y, idx = model.infer_panel(x, x_lens, prompts, bert, top_k=top_k, top_p=1.0, temperature=1.0, early_stop_num=-1)
+    elapsed = time.perf_counter() - t
+    tokens = y[:, prompts.shape[1]:]
+    return tokens[0], elapsed / max(tokens.shape[1], 1)
+
+
+def token_agreement(a, b):
+    n = min(len(a), len(b))
+    if n == 0:
+        return 1.0, 0
+    same = (a[:n] == b[:n])
+    diverge = int((~same).nonzero()[0]) if not bool(same.all()) else n
+    return float(same.float().mean()), diverge
+
+
+def prompt_logits(model, inputs):
+    x, x_lens, prompts, bert = inputs
+    x_emb = model.ar_text_position(model.ar_text_embedding(x) + model.bert_proj(bert.transpose(1, 2)))
+    xy_pos = torch.concat([x_emb, model.ar_audio_position(model.ar_audio_embedding(prompts))], dim=1)
+    mask = torch.zeros((xy_pos.shape[1], xy_pos.shape[1]), dtype=torch.bool)
+    xy_dec, _, _ = model.t2s_transformer.process_prompt(xy_pos, mask)
+    return model.ar_predict_layer(xy_dec[:, -1])
+
+
+def check_t2s(args):
+    model, _ = build_t2s_model(seed=args.seed, n_layer=args.n_layer)
+    fp32_bytes = weight_nbytes(model)
+    # 同一种子再建一份相同权重的模型来量化, jit 类对象不支持 deepcopy
+    qmodel = quantize_t2s_model(build_t2s_model(seed=args.seed, n_layer=args.n_layer)[0])
+    int8_bytes = weight_nbytes(qmodel)
+    print(f"t2s weights: fp32 {fp32_bytes / 2 ** 20:.1f} MB, int8 {int8_bytes / 2 ** 20:.1f} MB")
+
+    inputs = random_t2s_inputs(model, args.phones, args.prompt, args.seed)
+    logits, qlogits = prompt_logits(model, inputs), prompt_logits(qmodel, inputs)
+    cos = torch.nn.functional.cosine_similarity(logits, qlogits, dim=-1).item()
+    print(f"first-step logits: max|diff| {float((logits - qlogits).abs().max()):.3e}, cosine {cos:.5f}")
+
+    for top_k in (1, 15):
+        agreements, diverges, fp32_ms, int8_ms = [], [], [], []
+        for run in range(args.runs):
+            seed = args.seed + run
+            tokens, fp32_t = decode(model, inputs, seed, top_k)
+            qtokens, int8_t = decode(qmodel, inputs, seed, top_k)
+            agreement, diverge = token_agreement(tokens, qtokens)
+            agreements.append(agreement)
+            diverges.append(diverge)
+            fp32_ms.append(fp32_t * 1000)
+            int8_ms.append(int8_t * 1000)
+        print(f"top_k={top_k:>2}: token agreement {sum(agreements) / len(agreements):.3f}, "
+              f"first divergence {sorted(diverges)[len(diverges) // 2]} (median), "
+              f"per token fp32 {sum(fp32_ms) / len(fp32_ms):.2f} ms, int8 {sum(int8_ms) / len(int8_ms):.2f} ms")
+
+
+def check_encoder(name, model, inputs, repeat):
+    fp32_bytes = weight_nbytes(model)
+    with torch.no_grad():
+        t = time.perf_counter()
+        for _ in range(repeat):
+            out = model(**inputs)
+        fp32_t = (time.perf_counter() - t) / repeat
+        qmodel = quantize_linear_layers(copy.deepcopy(model))
+        t = time.perf_counter()
+        for _ in range(repeat):
+            qout = qmodel(**inputs)
+        int8_t = (time.perf_counter() - t) / repeat
+    a, b = out["hidden_states"][-3], qout["hidden_states"][-3]
+    cos = torch.nn.functional.cosine_similarity(a.flatten(), b.flatten(), dim=0).item()
+    print(f"{name}: weights fp32 {fp32_bytes / 2 ** 20:.1f} MB, int8 {weight_nbytes(qmodel) / 2 ** 20:.1f} MB, "
+          f"latency fp32 {fp32_t * 1000:.1f} ms, int8 {int8_t * 1000:.1f} ms, feature cosine {cos:.5f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="int8 dynamic quantization quality and CPU latency")
+    parser.add_argument("--n_layer", type=int, default=24)
+    parser.add_argument("--phones", type=int, default=64)
+    parser.add_argument("--prompt", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--bert_path", type=str, default="", help="可选, 同时检查 BERT")
+    parser.add_argument("--hubert_path", type=str, default="", help="可选, 同时检查 HuBERT")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    torch.set_grad_enabled(False)
+    check_t2s(args)
+    if args.bert_path:
+        from transformers import AutoModelForMaskedLM, AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(args.bert_path)
+        bert = AutoModelForMaskedLM.from_pretrained(args.bert_path).eval()
+        inputs = dict(tokenizer("我们明天下午三点在图书馆门口见面吧，不见不散。", return_tensors="pt"), output_hidden_states=True)
+        check_encoder("bert", bert, inputs, args.repeat)
+    if args.hubert_path:
+        from transformers import HubertModel
+        hubert = HubertModel.from_pretrained(args.hubert_path).eval()
+        generator = torch.Generator().manual_seed(args.seed)
+        inputs = {"input_values": torch.randn((1, 16000 * 5), generator=generator) * 0.1, "output_hidden_states": True}
+        check_encoder("hubert", hubert, inputs, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# 流式声码器客观检查: 逐窗口解码+crossfade 的输出 vs 整句一次 decode
+# 用法: python -m benchmark.check_stream_vocoder [--tokens 250] [--chunk 24]
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from benchmark.common import build_sovits_model, random_refer, set_seed
+from inference.stream_vocoder import StreamingVocoder
+
+
+def log_spectral_distance(a, b, n_fft=1024, hop=256):
+    n = min(len(a), len(b))
+    window = torch.hann_window(n_fft)
+    spec = lambda x: torch.stft(torch.from_numpy(x[:n]).float(), n_fft, hop, window=window, return_complex=True).abs()
+    sa, sb = spec(a), spec(b)
+    diff = 20 * (torch.log10(sa + 1e-5) - torch.log10(sb + 1e-5))
+    return float(torch.sqrt((diff ** 2).mean(0)).mean())
+
+
+def snr_db(reference, estimate):
+    n = min(len(reference), len(estimate))
+    noise = reference[:n] - estimate[:n]
+    return float(10 * np.log10((reference[:n] ** 2).sum() / max((noise ** 2).sum(), 1e-12)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="streaming vocoder vs full-sentence decode")
+    parser.add_argument("--tokens", type=int, default=250)
+    parser.add_argument("--phones", type=int, default=60)
+    parser.add_argument("--chunk", type=int, default=24)
+    parser.add_argument("--left_context", type=int, default=12)
+    parser.add_argument("--lookahead", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    model, hps = build_sovits_model(seed=args.seed)
+    generator = torch.Generator().manual_seed(args.seed)
+    codes = torch.randint(0, 1024, (1, args.tokens), generator=generator)
+    phones = torch.randint(1, 300, (1, args.phones), generator=generator)
+    refer = random_refer(hps, seed=args.seed)
+
+    with torch.no_grad():
+        ge = model.get_ge(refer)
+        set_seed(args.seed)
+        t = time.perf_counter()
+        full = model.decode(codes.unsqueeze(0), phones, refer, noise_scale=0.0, ge=ge).numpy()[0, 0]
+        full_time = time.perf_counter() - t
+
+        vocoder = StreamingVocoder(model, phones, refer, ge, noise_scale=0.0, chunk_tokens=args.chunk,
+                                   left_context=args.left_context, lookahead=args.lookahead,
+                                   sampling_rate=hps["data"]["sampling_rate"])
+        chunks = []
+        first_chunk_time = None
+        t = time.perf_counter()
+        # 模拟 T2S 每步产出一个 token
+        for i in range(args.tokens):
+            audio = vocoder.push(codes[:, i:i + 1])
+            if audio is not None:
+                if first_chunk_time is None:
+                    first_chunk_time = time.perf_counter() - t
+                chunks.append(audio)
+        chunks.append(vocoder.flush())
+        stream_time = time.perf_counter() - t
+    streamed = np.concatenate(chunks)
+
+    print(f"full decode: {len(full)} samples, {full_time * 1000:.1f} ms")
+    print(f"streamed:    {len(streamed)} samples in {len(chunks)} chunks, total {stream_time * 1000:.1f} ms, "
+          f"first chunk {first_chunk_time * 1000 if first_chunk_time else float('nan'):.1f} ms")
+    print(f"length diff: {len(streamed) - len(full)} samples")
+    print(f"SNR vs full: {snr_db(full, streamed):.2f} dB")
+    print(f"log-spectral distance: {log_spectral_distance(full, streamed):.3f} dB")
+
+
+if __name__ == "__main__":
+    main()
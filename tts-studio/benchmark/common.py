@@ -0,0 +1,99 @@
+# 基准测试公用工具: 用 configs 下的配置构建随机权重模型, 不依赖预训练权重
+# 在 tts-studio 目录下以 `python -m benchmark.xxx` 方式运行
+import json
+import random
+import time
+
+import numpy as np
+import torch
+import yaml
+
+from AR.models.t2s_model import Text2SemanticDecoder
+from module.mel_processing import spectrogram_torch
+from module.models import SynthesizerTrn
+
+
+# 模型规模预设: (T2S 覆盖参数, SoVITS 覆盖参数); full 为配置文件原尺寸.
+# SoVITS 的 hidden/inter_channels 与 MRTE 内部的 192 维绑定, gin_channels 与 ge 的 512 维绑定, 只能缩小其余部分
+MODEL_SIZES = {
+    "full": ({}, {}),
+    "small": ({"n_layer": 6}, {"upsample_initial_channel": 256}),
+    "tiny": ({"n_layer": 2, "hidden_dim": 128, "head": 2},
+             {"n_layers": 2, "filter_channels": 384, "upsample_initial_channel": 128}),
+}
+
+
+def set_seed(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def load_t2s_config(config_path="configs/s1longer-v2.yaml", n_layer=None, hidden_dim=None, head=None):
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    model_cfg = config["model"]
+    if n_layer is not None:
+        model_cfg["n_layer"] = n_layer
+    if hidden_dim is not None:
+        model_cfg["hidden_dim"] = hidden_dim
+        model_cfg["embedding_dim"] = hidden_dim
+    if head is not None:
+        model_cfg["head"] = head
+    return config
+
+
+def build_t2s_model(config_path="configs/s1longer-v2.yaml", seed=1234, **overrides):
+    """随机初始化的 Text2SemanticDecoder, overrides 可缩小层数/宽度"""
+    set_seed(seed)
+    config = load_t2s_config(config_path, **overrides)
+    model = Text2SemanticDecoder(config=config, top_k=3)
+    model.eval()
+    return model, config
+
+
+def random_t2s_inputs(model, n_phones=64, n_prompt=100, seed=1234):
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randint(0, model.phoneme_vocab_size, (1, n_phones), generator=generator)
+    x_lens = torch.LongTensor([n_phones])
+    prompts = torch.randint(0, model.EOS, (1, n_prompt), generator=generator)
+    bert = torch.randn((1, 1024, n_phones), generator=generator)
+    return x, x_lens, prompts, bert
+
+
+def load_sovits_config(config_path="configs/s2.json"):
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_sovits_model(config_path="configs/s2.json", version="v2", seed=1234, **overrides):
+    """随机初始化的 SynthesizerTrn (推理用, 不含 enc_q), overrides 覆盖 model 段参数"""
+    set_seed(seed)
+    hps = load_sovits_config(config_path)
+    model_params = dict(hps["model"])
+    model_params.update(overrides)
+    model_params["version"] = version
+    model = SynthesizerTrn(
+        hps["data"]["filter_length"] // 2 + 1,
+        hps["train"]["segment_size"] // hps["data"]["hop_length"],
+        n_speakers=hps["data"]["n_speakers"],
+        **model_params
+    )
+    del model.enc_q
+    model.eval()
+    return model, hps
+
+
+def random_refer(hps, seconds=3.0, seed=1234):
+    """随机噪声的参考频谱, 形状与 get_spepc 的输出一致"""
+    generator = torch.Generator().manual_seed(seed)
+    data = hps["data"]
+    audio = torch.randn((1, int(data["sampling_rate"] * seconds)), generator=generator) * 0.1
+    return spectrogram_torch(audio, data["filter_length"], data["sampling_rate"], data["hop_length"],
+                             data["win_length"], center=False)
+
+
+def timed(fn, *args, **kwargs):
+    t = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t
@@ -0,0 +1,58 @@
+# 对比两次 benchmark.suite 的结果, 变差超过阈值的项标出并以非零状态退出
+# 用法: python -m benchmark.compare logs/bench_old.json logs/bench_new.json [--threshold 0.1]
+import argparse
+import json
+import sys
+
+# 指标 -> 是否越大越好
+METRICS = {"ms": False, "seconds": False, "rtf": False, "tokens_per_s": True}
+# 两次结果的这些配置不同时对比没有意义
+META_KEYS = ("size", "t2s_config", "sovits_config", "version", "frontend", "seed", "threads", "machine")
+
+
+def compare(old, new, threshold):
+    """返回 [(group, name, metric, old, new, 变化比例, 是否退化)], 变化比例为正表示变好"""
+    rows = []
+    for group, old_rows in old["results"].items():
+        for name, old_row in old_rows.items():
+            new_row = new["results"].get(group, {}).get(name)
+            if new_row is None:
+                continue
+            for metric, higher_is_better in METRICS.items():
+                if metric not in old_row or metric not in new_row or not old_row[metric]:
+                    continue
+                change = (new_row[metric] - old_row[metric]) / old_row[metric]
+                if not higher_is_better:
+                    change = -change
+                rows.append((group, name, metric, old_row[metric], new_row[metric], change, change < -threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compare two benchmark.suite results")
+    parser.add_argument("old", type=str)
+    parser.add_argument("new", type=str)
+    parser.add_argument("--threshold", type=float, default=0.1, help="变差超过该比例视为退化")
+    args = parser.parse_args()
+
+    with open(args.old, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"old: {old['meta'].get('commit')} {old['meta'].get('time')}")
+    print(f"new: {new['meta'].get('commit')} {new['meta'].get('time')}")
+    for key in META_KEYS:
+        if old["meta"].get(key) != new["meta"].get(key):
+            print(f"warning: {key} differs ({old['meta'].get(key)} -> {new['meta'].get(key)})")
+
+    rows = compare(old, new, args.threshold)
+    print(f"{'benchmark':<16}{'metric':>14}{'old':>12}{'new':>12}{'change':>10}")
+    for group, name, metric, old_value, new_value, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{group + '/' + name:<16}{metric:>14}{old_value:>12}{new_value:>12}{change * 100:>+9.1f}%{flag}")
+    if any(row[-1] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# TTS 服务压测: 不同并发数下的吞吐和首字节耗时
+# 先启动 tts_api.py (可加 -cb 开启连续批处理), 然后:
+# python -m benchmark.load_test --url http://127.0.0.1:9880 --concurrency 1 2 4 8 --requests 16
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_TEXT = "今天天气不错，我们出去走走吧。顺便买点水果回来。"
+
+
+def synthesize(url, payload):
+    data = json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    t = time.perf_counter()
+    first_byte = None
+    total = 0
+    with urllib.request.urlopen(request) as response:
+        while True:
+            chunk = response.read(4096)
+            if not chunk:
+                break
+            if first_byte is None:
+                first_byte = time.perf_counter() - t
+            total += len(chunk)
+    return first_byte or 0.0, time.perf_counter() - t, total
+
+
+def run_level(url, payload, concurrency, n_requests):
+    t = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: synthesize(url, payload), range(n_requests)))
+    wall = time.perf_counter() - t
+    ttfb = sorted(r[0] for r in results)
+    latency = sorted(r[1] for r in results)
+    return {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(n_requests / wall, 3),
+        "ttfb_p50_s": round(ttfb[len(ttfb) // 2], 3),
+        "ttfb_p95_s": round(ttfb[int(len(ttfb) * 0.95)], 3),
+        "latency_p50_s": round(latency[len(latency) // 2], 3),
+        "bytes": sum(r[2] for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS server load test")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:9880")
+    parser.add_argument("--text", type=str, default=DEFAULT_TEXT)
+    parser.add_argument("--text_language", type=str, default="zh")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--output", type=str, default=None, help="结果写入json文件")
+    args = parser.parse_args()
+
+    payload = {"text": args.text, "text_language": args.text_language, "cut_punc": "，。"}
+    rows = []
+    for concurrency in args.concurrency:
+        row = run_level(args.url.rstrip("/") + "/", payload, concurrency, args.requests)
+        rows.append(row)
+        print(json.dumps(row, ensure_ascii=False))
+    try:
+        with urllib.request.urlopen(args.url.rstrip("/") + "/scheduler_stats") as response:
+            print("scheduler_stats:", response.read().decode("utf-8"))
+    except Exception:
+        pass
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# 启动耗时分析: 各个重量级依赖的导入耗时, import tts_api 本身的耗时和它实际导入了哪些重量级依赖,
+# 以及 tts_api 从启动到能响应请求的耗时
+# 急切加载 (-pw all -pwb, 等同于改为按需加载之前的启动方式) 对比默认的按需加载
+# 用法: python -m benchmark.profile_startup [--api_args "-s xxx.pth -g xxx.ckpt -d cpu"] [--port 9890]
+import argparse
+import json
+import shlex
+import subprocess
+import sys
+import time
+import urllib.request
+
+# 改为按需加载之前, 导入 tts_api 时会一并导入的模块
+EAGER_MODULES = [
+    "vendor.LangSegment",
+    "librosa",
+    "transformers",
+    "feature_extractor.cnhubert",
+    "text.chinese",
+    "text.chinese2",
+    "text.english",
+    "text.japanese",
+    "text.korean",
+    "text.cantonese",
+    "moegoe.models",
+    "module.mel_processing",
+    "tools.my_utils",
+]
+# 不应在 import tts_api 时出现的模块 (都应按需导入)
+HEAVY_MODULES = EAGER_MODULES + ["gradio", "pandas", "ffmpeg"]
+
+
+def import_ms(module):
+    """在新进程里导入 module, torch 预先导入不计入"""
+    code = (
+        "import time, torch\n"
+        "t = time.perf_counter()\n"
+        f"import {module}\n"
+        "print((time.perf_counter() - t) * 1000)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if out.returncode != 0:
+        return None
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def import_tts_api_ms():
+    """
+    在新进程里执行 tts_api.py 解析参数之前的全部导入: 带 -h 导入, argparse 解析参数时退出, 不会加载模型.
+    返回 (耗时ms, 导入过程中被加载的重量级模块)
+    """
+    code = (
+        "import sys, time, torch\n"
+        "sys.argv = ['tts_api.py', '-h']\n"
+        "t = time.perf_counter()\n"
+        "try:\n"
+        "    import tts_api\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print((time.perf_counter() - t) * 1000)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if out.returncode != 0:
+        return None, []
+    lines = out.stdout.strip().splitlines()
+    return float(lines[-2]), [m for m in lines[-1].split(",") if m]
+
+
+def wait_ready(port, timeout):
+    """轮询 /cache_stats 直到服务可以响应, 返回响应内容"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/cache_stats", timeout=1) as resp:
+                return json.loads(resp.read())
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"tts_api 在 {timeout}s 内未就绪")
+
+
+def startup_s(api_args, port, timeout):
+    t = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "tts_api.py", "-a", "127.0.0.1", "-p", str(port)] + api_args,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        stats = wait_ready(port, timeout)
+        return time.perf_counter() - t, stats.get("lazy", {})
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="import time of heavy dependencies and tts_api startup time")
+    parser.add_argument("--api_args", type=str, default="", help="传给 tts_api.py 的参数, 例如模型路径")
+    parser.add_argument("--port", type=int, default=9890)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--skip_server", action="store_true", help="只统计导入耗时")
+    args = parser.parse_args()
+
+    print(f"{'module':<28}{'import ms':>12}")
+    total = 0.0
+    for module in EAGER_MODULES:
+        ms = import_ms(module)
+        total += ms or 0.0
+        print(f"{module:<28}{'failed' if ms is None else f'{ms:.0f}':>12}")
+    print(f"{'sum':<28}{total:>12.0f}")
+    ms, loaded = import_tts_api_ms()
+    print(f"{'import tts_api':<28}{'failed' if ms is None else f'{ms:.0f}':>12}")
+    print(f"heavy modules imported by tts_api: {', '.join(loaded) or '-'}")
+
+    if args.skip_server:
+        return
+    api_args = shlex.split(args.api_args)
+    for name, extra in (("eager (-pw all -pwb)", ["-pw", "all", "-pwb"]), ("lazy (default)", [])):
+        elapsed, lazy = startup_s(api_args + extra, args.port, args.timeout)
+        loaded = [key for key, value in lazy.items() if value["ready"]]
+        print(f"{name:<24} ready in {elapsed:.1f}s, loaded at startup: {', '.join(loaded) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# 离线基准套件: 用 configs 构建随机权重的 T2S / SoVITS (原尺寸或缩小), 在 CPU 上测
+# 前端 clean_text 耗时, infer_panel tokens/s, decode RTF, 端到端合成 RTF, 各取多种文本长度, 结果写 json.
+# 固定种子 + 固定线程数 + 压住 EOS 让每次生成相同的 token 数, 同一台机器上的多次结果可以直接对比 (benchmark.compare)
+# 用法: python -m benchmark.suite [--size tiny|small|full] [--threads 4] [--output logs/bench.json]
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+import torch
+
+from benchmark.common import MODEL_SIZES, build_sovits_model, build_t2s_model, random_refer, set_seed
+
+TEXTS = {
+    "short": "你好呀，今天过得怎么样？",
+    "medium": "我们明天下午三点在图书馆门口见面吧，记得把上次借的那两本书带上，顺便一起去吃个晚饭。",
+    "long": "这个问题有点复杂，让我想一想。首先，我们需要弄清楚用户到底想要什么，而不是急着写代码；"
+            "其次，每一次改动都应该先测量再优化，否则很容易在不重要的地方浪费时间。"
+            "最后，别忘了把结果记录下来，这样下次遇到类似的情况，就可以直接参考之前的经验了。",
+}
+# 约每秒 25 个语义 token, 中文语速约每秒 4 字
+TOKENS_PER_CHAR = 6
+# 前端不可用时按每字两个音素 (声母 + 韵母) 生成随机音素
+PHONES_PER_CHAR = 2
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def suppress_eos(model):
+    """EOS 对应的输出行置零, logit 恒为 0, 随机权重下总落在 top_k 之外, 每次都生成到 early_stop_num"""
+    with torch.no_grad():
+        model.ar_predict_layer.weight[model.EOS].zero_()
+
+
+def measure(fn, repeats):
+    """先跑一次预热, 再跑 repeats 次, 返回 (最后一次的输出, 耗时中位数)"""
+    fn()
+    times = []
+    out = None
+    for _ in range(repeats):
+        t = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t)
+    return out, statistics.median(times)
+
+
+def load_frontend(version):
+    """返回 text -> 音素序列 的函数, 前端依赖缺失时返回 None"""
+    try:
+        from text import cleaned_text_to_sequence
+        from text.cleaner import clean_text, set_frontend_cache
+    except ImportError as e:
+        print(f"frontend unavailable ({e}), using random phones")
+        return None
+    set_frontend_cache(None)
+
+    def frontend(text):
+        phones, word2ph, norm_text = clean_text(text, "zh", version)
+        return cleaned_text_to_sequence(phones, version)
+
+    try:
+        frontend("一二三")
+    except Exception as e:
+        print(f"frontend unavailable ({e}), using random phones")
+        return None
+    return frontend
+
+
+def bench_frontend(frontend, repeats):
+    rows = {}
+    for name, text in TEXTS.items():
+        phones, seconds = measure(lambda: frontend(text), repeats)
+        rows[name] = {"chars": len(text), "phones": len(phones), "ms": round(seconds * 1000, 3)}
+    return rows
+
+
+def t2s_inputs(model, phones, n_prompt, seed):
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.LongTensor(phones).unsqueeze(0)
+    x_lens = torch.LongTensor([x.shape[1]])
+    prompts = torch.randint(0, model.EOS, (1, n_prompt), generator=generator)
+    # 没有预训练的 BERT, 用随机特征代替 (非中文时本来就是全零)
+    bert = torch.randn((1, 1024, x.shape[1]), generator=generator)
+    return x, x_lens, prompts, bert
+
+
+def run_t2s(model, inputs, max_tokens, args):
+    x, x_lens, prompts, bert = inputs
+    set_seed(args.seed)
+    with torch.no_grad():
+        y, idx = model.infer_panel(x, x_lens, prompts, bert, top_k=args.top_k, top_p=args.top_p,
+                                   temperature=args.temperature, early_stop_num=max_tokens)
+    return y[:, prompts.shape[1]:]
+
+
+def run_decode(vq_model, codes, phones, refer, ge):
+    set_seed(0)
+    with torch.no_grad():
+        return vq_model.decode(codes.unsqueeze(0), phones, refer, ge=ge)
+
+
+def bench_t2s(model, phone_sets, args):
+    rows = {}
+    for name, phones in phone_sets.items():
+        inputs = t2s_inputs(model, phones, args.prompt_tokens, args.seed)
+        max_tokens = len(TEXTS[name]) * TOKENS_PER_CHAR
+        codes, seconds = measure(lambda: run_t2s(model, inputs, max_tokens, args), args.repeats)
+        tokens = codes.shape[1]
+        rows[name] = {"phones": len(phones), "tokens": tokens, "seconds": round(seconds, 4),
+                      "tokens_per_s": round(tokens / seconds, 2)}
+    return rows
+
+
+def bench_decode(vq_model, hps, phone_sets, args):
+    sampling_rate = hps["data"]["sampling_rate"]
+    refer = random_refer(hps, seed=args.seed)
+    with torch.no_grad():
+        ge = vq_model.get_ge(refer)
+    generator = torch.Generator().manual_seed(args.seed)
+    rows = {}
+    for name, phones in phone_sets.items():
+        tokens = len(TEXTS[name]) * TOKENS_PER_CHAR
+        codes = torch.randint(0, 1024, (1, tokens), generator=generator)
+        phone_tensor = torch.LongTensor(phones).unsqueeze(0)
+        audio, seconds = measure(lambda: run_decode(vq_model, codes, phone_tensor, refer, ge), args.repeats)
+        audio_seconds = audio.shape[-1] / sampling_rate
+        rows[name] = {"tokens": tokens, "audio_seconds": round(audio_seconds, 3), "seconds": round(seconds, 4),
+                      "rtf": round(seconds / audio_seconds, 4)}
+    return rows
+
+
+def bench_end_to_end(model, vq_model, hps, frontend, phone_sets, args):
+    """文本 -> 前端 -> T2S -> 参考音频 ge -> decode, 参考频谱按请求现算 (与服务端未命中缓存时一致)"""
+    sampling_rate = hps["data"]["sampling_rate"]
+    refer = random_refer(hps, seed=args.seed)
+    rows = {}
+    for name, text in TEXTS.items():
+        max_tokens = len(text) * TOKENS_PER_CHAR
+
+        def synthesize():
+            phones = frontend(text) if frontend is not None else phone_sets[name]
+            inputs = t2s_inputs(model, phones, args.prompt_tokens, args.seed)
+            codes = run_t2s(model, inputs, max_tokens, args)
+            with torch.no_grad():
+                ge = vq_model.get_ge(refer)
+            return run_decode(vq_model, codes, inputs[0], refer, ge)
+
+        audio, seconds = measure(synthesize, args.repeats)
+        audio_seconds = audio.shape[-1] / sampling_rate
+        rows[name] = {"chars": len(text), "audio_seconds": round(audio_seconds, 3), "seconds": round(seconds, 4),
+                      "rtf": round(seconds / audio_seconds, 4)}
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="offline GPT-SoVITS benchmark suite with random weights (CPU)")
+    parser.add_argument("--size", type=str, default="tiny", choices=list(MODEL_SIZES))
+    parser.add_argument("--t2s_config", type=str, default="configs/s1longer-v2.yaml")
+    parser.add_argument("--sovits_config", type=str, default="configs/s2.json")
+    parser.add_argument("--version", type=str, default="v2")
+    parser.add_argument("--benchmarks", type=str, default="frontend,t2s,decode,e2e")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--prompt_tokens", type=int, default=100, help="参考音频的语义 token 数 (约 4 秒)")
+    parser.add_argument("--top_k", type=int, default=15)
+    parser.add_argument("--top_p", type=float, default=1.0)
+    parser.add_argument("--temperature", type=float, default=1.0)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", type=str, default=None, help="结果写入json文件")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    benchmarks = args.benchmarks.split(",")
+    t2s_overrides, sovits_overrides = MODEL_SIZES[args.size]
+
+    frontend = load_frontend(args.version) if {"frontend", "e2e"} & set(benchmarks) else None
+    generator = torch.Generator().manual_seed(args.seed)
+    phone_sets = {}
+    for name, text in TEXTS.items():
+        if frontend is not None:
+            phone_sets[name] = frontend(text)
+        else:
+            phone_sets[name] = torch.randint(1, 300, (len(text) * PHONES_PER_CHAR,), generator=generator).tolist()
+
+    results = {}
+    if "frontend" in benchmarks and frontend is not None:
+        results["frontend"] = bench_frontend(frontend, args.repeats)
+    model = vq_model = hps = None
+    if {"t2s", "e2e"} & set(benchmarks):
+        model, _ = build_t2s_model(args.t2s_config, seed=args.seed, **t2s_overrides)
+        suppress_eos(model)
+    if {"decode", "e2e"} & set(benchmarks):
+        vq_model, hps = build_sovits_model(args.sovits_config, args.version, seed=args.seed, **sovits_overrides)
+    if "t2s" in benchmarks:
+        results["t2s"] = bench_t2s(model, phone_sets, args)
+    if "decode" in benchmarks:
+        results["decode"] = bench_decode(vq_model, hps, phone_sets, args)
+    if "e2e" in benchmarks:
+        results["e2e"] = bench_end_to_end(model, vq_model, hps, frontend, phone_sets, args)
+
+    report = {
+        "meta": {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "size": args.size,
+            "t2s_config": args.t2s_config,
+            "sovits_config": args.sovits_config,
+            "version": args.version,
+            "frontend": frontend is not None,
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "threads": torch.get_num_threads(),
+            "torch": torch.__version__,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    for group, rows in results.items():
+        print(f"[{group}]")
+        for name, row in rows.items():
+            print(f"  {name:<8}" + "  ".join(f"{key} {value}" for key, value in row.items()))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class AudioCache:
+    """
+    合成结果 (编码后的音频字节) 的磁盘 LRU 缓存, 文件名为请求内容的哈希.
+    启动时按文件修改时间恢复 LRU 顺序, 命中时刷新修改时间; 总大小超过 max_bytes 时删除最久未用的文件.
+    多进程模式下各 worker 共用目录, 各自维护索引: 别的 worker 写入的文件在查找时补进索引,
+    被别的 worker 删除的文件按未命中处理, 总大小按本进程所见估算.
+    """
+
+    SUFFIX = ".audio"
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index = OrderedDict()  # key -> 字节数
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".tmp"):
+                # 上次写到一半退出留下的临时文件
+                self._remove(path)
+            elif name.endswith(self.SUFFIX):
+                st = os.stat(path)
+                entries.append((st.st_mtime_ns, name[:-len(self.SUFFIX)], st.st_size))
+        for _, key, nbytes in sorted(entries):
+            self._index[key] = nbytes
+            self.total_bytes += nbytes
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def make_key(**fields):
+        raw = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get(self, key):
+        """命中时返回音频字节, 否则返回 None"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                nbytes = self._index.pop(key, None)
+                if nbytes is not None:
+                    self.total_bytes -= nbytes
+                self.misses += 1
+            return None
+        with self._lock:
+            if key not in self._index:
+                self._index[key] = len(data)
+                self.total_bytes += len(data)
+            self._index.move_to_end(key)
+            self.hits += 1
+            self.bytes_served += len(data)
+        return data
+
+    def put(self, key, data):
+        if len(data) == 0 or len(data) > self.max_bytes:
+            return
+        # 先写临时文件再改名, 其他进程不会读到写了一半的文件
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            self._remove(tmp_path)
+            raise
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old
+            self._index[key] = len(data)
+            self.total_bytes += len(data)
+            self.writes += 1
+            self._evict()
+
+    def _evict(self):
+        while self._index and self.total_bytes > self.max_bytes:
+            key, nbytes = self._index.popitem(last=False)
+            self.total_bytes -= nbytes
+            self.evictions += 1
+            self._remove(self._path(key))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes_served": self.bytes_served,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
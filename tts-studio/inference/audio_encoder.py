@@ -0,0 +1,216 @@
+# 有状态的流式音频编码器: 每个响应打开一个编码会话, 逐段写入 int16 PCM, 每次写入返回已经可以发送的字节.
+# 整个响应是一个完整的容器 (一个 ogg 流 / 连续的 ADTS 帧), 而不是每段一个独立文件.
+import io
+import os
+import queue
+import subprocess
+import threading
+
+import numpy as np
+import soundfile as sf
+
+# 每次交给 libsndfile 的最大帧数, 过大时 sf_writef_short 可能栈溢出
+# https://github.com/RVC-Boss/GPT-SoVITS/issues/1199
+WRITE_BLOCK_FRAMES = 8192
+
+MEDIA_TYPES = {
+    "wav": "audio/wav",
+    "ogg": "audio/ogg",
+    "opus": "audio/ogg",
+    "aac": "audio/aac",
+    "raw": "audio/pcm",
+}
+
+
+class StreamEncoder:
+    """write(pcm) 返回可以立即发送的字节 (可能为空), close() 返回剩余字节; abort() 丢弃未输出的数据"""
+
+    def write(self, pcm):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def abort(self):
+        pass
+
+
+class RawEncoder(StreamEncoder):
+    """单声道 16 位小端 PCM, 不做封装"""
+
+    def write(self, pcm):
+        return pcm.astype(np.int16, copy=False).tobytes()
+
+    def close(self):
+        return b""
+
+
+class WavEncoder(StreamEncoder):
+    """wav 头里要写总长度, 无法流式: 缓存全部 PCM, close 时一次输出"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.chunks = []
+
+    def write(self, pcm):
+        self.chunks.append(pcm.astype(np.int16, copy=False))
+        return b""
+
+    def close(self):
+        if self.chunks is None:
+            return b""
+        data = np.concatenate(self.chunks) if self.chunks else np.zeros(0, dtype=np.int16)
+        self.chunks = None
+        wav_bytes = io.BytesIO()
+        sf.write(wav_bytes, data, self.rate, format="wav")
+        return wav_bytes.getvalue()
+
+
+class _Sink(io.RawIOBase):
+    """libsndfile 的输出目标, 写出的字节可以随时取走; 已取走的部分不能再回写"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offset = 0
+        self.pos = 0
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def write(self, data):
+        start = self.pos - self.offset
+        if start < 0:
+            raise io.UnsupportedOperation("不能回写已经发送的数据")
+        self.buffer[start:start + len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        end = self.offset + len(self.buffer)
+        self.pos = {os.SEEK_SET: offset, os.SEEK_CUR: self.pos + offset, os.SEEK_END: end + offset}[whence]
+        return self.pos
+
+    def read(self, size=-1):
+        return b""
+
+    def take(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        self.offset += len(data)
+        self.pos = self.offset
+        return data
+
+
+class SoundFileEncoder(StreamEncoder):
+    """进程内编码 (libsndfile), 用于 Ogg/Vorbis; libsndfile 凑满一页就写出, 文件头在打开时立即可发送"""
+
+    def __init__(self, rate, format="ogg", subtype="VORBIS"):
+        self.sink = _Sink()
+        self.file = sf.SoundFile(self.sink, mode="w", samplerate=rate, channels=1, format=format, subtype=subtype)
+
+    def write(self, pcm):
+        for start in range(0, len(pcm), WRITE_BLOCK_FRAMES):
+            self.file.write(pcm[start:start + WRITE_BLOCK_FRAMES])
+        return self.sink.take()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+        return self.sink.take()
+
+    def abort(self):
+        self.close()
+
+
+class PipeEncoder(StreamEncoder):
+    """
+    每个响应一个常驻的 ffmpeg 进程, stdin 持续写入 PCM, 后台线程读取 stdout 放进队列.
+    write 不等待 ffmpeg, 只取走队列里已有的输出; 这段 PCM 还没编码完的部分随下一次 write 或 close 发出.
+    """
+
+    def __init__(self, rate, codec_args):
+        self.process = subprocess.Popen(
+            ["ffmpeg", "-loglevel", "error", "-f", "s16le", "-ar", str(rate), "-ac", "1", "-i", "pipe:0",
+             "-vn", "-flush_packets", "1"] + codec_args + ["pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self.output = queue.Queue()
+        self.reader = threading.Thread(target=self._read, name="ffmpeg-reader", daemon=True)
+        self.reader.start()
+
+    def _read(self):
+        fd = self.process.stdout.fileno()
+        while True:
+            data = os.read(fd, 65536)
+            if not data:
+                break
+            self.output.put(data)
+        self.output.put(None)
+
+    def _drain(self):
+        """取走后台线程已经读到的输出, 不阻塞"""
+        chunks = []
+        try:
+            data = self.output.get_nowait()
+            while data is not None:
+                chunks.append(data)
+                data = self.output.get_nowait()
+            # ffmpeg 已退出, 把结束标记放回去留给 close
+            self.output.put(None)
+        except queue.Empty:
+            pass
+        return b"".join(chunks)
+
+    def write(self, pcm):
+        self.process.stdin.write(pcm.astype(np.int16, copy=False).tobytes())
+        self.process.stdin.flush()
+        return self._drain()
+
+    def close(self):
+        if self.process.stdin.closed:
+            return b""
+        self.process.stdin.close()
+        self.reader.join()
+        self.process.wait()
+        chunks = []
+        while True:
+            data = self.output.get()
+            if data is None:
+                break
+            chunks.append(data)
+        return b"".join(chunks)
+
+    def abort(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+
+FFMPEG_CODECS = {
+    "aac": ["-c:a", "aac", "-b:a", "192k", "-f", "adts"],
+    # opus 只支持 48k 等采样率, ffmpeg 会自动重采样; 每页 20ms 以降低首包延迟
+    "opus": ["-c:a", "libopus", "-b:a", "64k", "-f", "ogg", "-page_duration", "20000"],
+    "ogg": ["-c:a", "libvorbis", "-f", "ogg"],
+}
+
+
+def open_encoder(media_type, rate, backend="auto"):
+    """
+    media_type: wav / ogg / opus / aac / raw.
+    backend: "auto" 时 ogg 在进程内编码, opus / aac 走 ffmpeg; "ffmpeg" 时 ogg 也走 ffmpeg.
+    """
+    if media_type == "raw":
+        return RawEncoder()
+    if media_type == "wav":
+        return WavEncoder(rate)
+    if media_type == "ogg" and backend != "ffmpeg":
+        return SoundFileEncoder(rate)
+    if media_type in FFMPEG_CODECS:
+        return PipeEncoder(rate, FFMPEG_CODECS[media_type])
+    raise ValueError(f"不支持的音频格式: {media_type}")
@@ -0,0 +1,67 @@
+import threading
+import uuid
+
+
+class Cancelled(Exception):
+    """请求已被取消 (客户端断开或调用 /cancel)"""
+
+
+class CancelToken:
+    """协作式取消: 合成循环在每句之间 check(), T2S 解码每一步调用 is_cancelled 判断是否提前结束"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason="cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def is_cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+
+class RequestRegistry:
+    """进行中请求的 request_id -> CancelToken, 供 /cancel/{request_id} 查找"""
+
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.cancelled = 0
+
+    def register(self, request_id=None):
+        request_id = request_id or uuid.uuid4().hex
+        token = CancelToken()
+        with self._lock:
+            previous = self._tokens.get(request_id)
+            self._tokens[request_id] = token
+            self.started += 1
+        if previous is not None:
+            # 同一个 id 的新请求顶替旧请求
+            previous.cancel("replaced")
+        return request_id, token
+
+    def unregister(self, request_id, token):
+        with self._lock:
+            if self._tokens.get(request_id) is token:
+                del self._tokens[request_id]
+            if token.is_cancelled():
+                self.cancelled += 1
+
+    def cancel(self, request_id, reason="cancelled"):
+        with self._lock:
+            token = self._tokens.get(request_id)
+        if token is None:
+            return False
+        token.cancel(reason)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {"active": len(self._tokens), "started": self.started, "cancelled": self.cancelled}
@@ -0,0 +1,89 @@
+import threading
+import time
+
+
+class Lazy:
+    """
+    首次 get() 时才调用 init() 初始化, 之后返回同一个对象; 多线程同时首次访问只初始化一次.
+    初始化失败不缓存, 下次访问重试.
+    """
+
+    def __init__(self, name, init):
+        self.name = name
+        self.init = init
+        self._value = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self.init_ms = None
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def get(self):
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                t = time.perf_counter()
+                self._value = self.init()
+                self.init_ms = (time.perf_counter() - t) * 1000
+                self._ready = True
+        return self._value
+
+    def reset(self, init=None):
+        """丢弃已初始化的对象, 下次 get() 重新初始化"""
+        with self._lock:
+            if init is not None:
+                self.init = init
+            self._value = None
+            self._ready = False
+            self.init_ms = None
+
+
+class LazyRegistry:
+    """按名字登记的 Lazy 组件, 支持后台预热和统计初始化耗时"""
+
+    def __init__(self):
+        self._items = {}
+        self._thread = None
+
+    def register(self, name, init):
+        item = Lazy(name, init)
+        self._items[name] = item
+        return item
+
+    def __getitem__(self, name):
+        return self._items[name]
+
+    def names(self):
+        return list(self._items)
+
+    def prewarm(self, names, background=True, on_error=None):
+        """
+        依次初始化 names 中的组件. background 时在守护线程里进行, 请求到来时仍按需初始化,
+        与预热线程撞上的组件会等待同一次初始化完成.
+        """
+        names = [name for name in names if name in self._items]
+
+        def run():
+            for name in names:
+                try:
+                    self._items[name].get()
+                except Exception as e:
+                    if on_error is None:
+                        raise
+                    on_error(name, e)
+
+        if not background:
+            run()
+            return None
+        self._thread = threading.Thread(target=run, name="prewarm", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stats(self):
+        return {
+            name: {"ready": item.ready, "init_ms": round(item.init_ms, 1) if item.init_ms is not None else None}
+            for name, item in self._items.items()
+        }
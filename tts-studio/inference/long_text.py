@@ -0,0 +1,145 @@
+# 长文本切块与拼接: 按前端给出的音素数把文本装进不超过预算的块, 各块独立合成, 块间用短 crossfade 拼接.
+# 单句 T2S 的注意力开销随序列长度平方增长, 块长有上限后整段耗时随文本长度线性增长.
+import math
+import re
+
+import numpy as np
+
+from inference.text_segmenter import CLOSERS, STRONG_ENDERS, WEAK_ENDERS
+
+# 拉丁字母连成的一段 (英文单词 / 词组), 其余为中日韩等文字
+_LATIN_RUN = re.compile(r"([A-Za-z][A-Za-z' \-]*[A-Za-z]|[A-Za-z])")
+
+
+def has_content(text):
+    return any(ch.isalnum() for ch in text)
+
+
+def split_clauses(text):
+    """在句末和逗号类标点处切成小句, 标点及其后的引号/括号留在前一句; 英文句点后面是空白才算句末"""
+    clauses = []
+    start = 0
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch in STRONG_ENDERS or ch in WEAK_ENDERS or (ch == "." and (i + 1 == len(text) or text[i + 1].isspace())):
+            cut = i + 1
+            while cut < len(text) and text[cut] in CLOSERS:
+                cut += 1
+            clauses.append(text[start:cut])
+            start = i = cut
+        else:
+            i += 1
+    if start < len(text):
+        clauses.append(text[start:])
+    return clauses
+
+
+def split_scripts(text):
+    """在拉丁字母与其他文字的交界处切开"""
+    return [run for run in _LATIN_RUN.split(text) if run]
+
+
+def split_even(text, parts):
+    """没有标点和语种边界可用时均分: 有空格按词, 否则按字"""
+    words = text.split(" ") if " " in text.strip() else list(text)
+    sep = " " if " " in text.strip() else ""
+    size = max(1, math.ceil(len(words) / parts))
+    chunks = [sep.join(words[i:i + size]) for i in range(0, len(words), size)]
+    return [chunk + sep for chunk in chunks[:-1]] + chunks[-1:]
+
+
+def split_by_budget(text, count_phones, budget):
+    """
+    把 text 切成音素数不超过 budget 的块. 优先在标点处切, 单个小句超预算时在语种边界处切, 仍超出时均分.
+    各块长度尽量接近 总音素数 / 最少块数, 避免最后剩一个很短的块.
+    count_phones(text) 返回文本经前端后的音素数, 只对切出的片段调用 (小句 / 语种段 / 均分段).
+    返回 [(块文本, 组成该块的片段)], 纯标点的块丢弃; 调用方可以把计数时算出的片段结果按块拼起来复用
+    """
+    pieces = []
+    for clause in split_clauses(text):
+        n = count_phones(clause) if has_content(clause) else 0
+        if n <= budget:
+            pieces.append((clause, n))
+            continue
+        for run in split_scripts(clause):
+            m = count_phones(run) if has_content(run) else 0
+            if m <= budget:
+                pieces.append((run, m))
+                continue
+            for part in split_even(run, math.ceil(m / budget)):
+                pieces.append((part, count_phones(part) if has_content(part) else 0))
+
+    total = sum(n for _, n in pieces)
+    target = total / max(1, math.ceil(total / budget))
+    chunks = []
+    current = []
+    used = 0
+    for piece, n in pieces:
+        # 超预算或已到目标长度时换块; 过了目标长度一半且正好在句末时也换块, 句子尽量不被拆开
+        text = "".join(current).rstrip()
+        at_sentence_end = text[-1:] in STRONG_ENDERS or text.endswith(".")
+        if has_content(text) and (used + n > budget or used >= target or (at_sentence_end and used >= target / 2)):
+            chunks.append(current)
+            current = []
+            used = 0
+        current.append(piece)
+        used += n
+    chunks.append(current)
+    return [("".join(chunk).strip(), chunk) for chunk in chunks if has_content("".join(chunk))]
+
+
+class PaddingJoiner:
+    """原先的拼接方式: 每句后面补一段静音"""
+
+    def __init__(self, zero_wav):
+        self.zero_wav = zero_wav
+
+    def push(self, audio, line_end=True):
+        return np.concatenate([audio, self.zero_wav], 0)
+
+    def flush(self):
+        return self.zero_wav[:0]
+
+
+class CrossfadeJoiner:
+    """相邻两块首尾重叠 fade 个采样点做线性 crossfade; push 返回可以输出的部分, 末尾 fade 个点留到下一块"""
+
+    def __init__(self, fade):
+        self.fade = fade
+        self.tail = None
+
+    def push(self, audio):
+        out = []
+        if self.tail is not None:
+            n = min(len(self.tail), len(audio) // 2)
+            ramp = np.linspace(0.0, 1.0, n, dtype=audio.dtype)
+            out.append(self.tail[:len(self.tail) - n])
+            out.append(self.tail[len(self.tail) - n:] * (1 - ramp) + audio[:n] * ramp)
+            audio = audio[n:]
+        keep = min(self.fade, len(audio) // 2)
+        out.append(audio[:len(audio) - keep])
+        self.tail = audio[len(audio) - keep:]
+        return np.concatenate(out)
+
+    def flush(self):
+        tail = self.tail
+        self.tail = None
+        return tail if tail is not None else np.zeros(0, dtype=np.float32)
+
+
+class ChunkJoiner:
+    """按预算切出的块: 同一行内的块之间 crossfade, 一行的最后一块之后补静音, 与不切块时行间的停顿一致"""
+
+    def __init__(self, fade, zero_wav):
+        self.crossfade = CrossfadeJoiner(fade)
+        self.zero_wav = zero_wav
+
+    def push(self, audio, line_end=True):
+        out = self.crossfade.push(audio)
+        if not line_end:
+            return out
+        return np.concatenate([out, self.crossfade.flush().astype(out.dtype), self.zero_wav.astype(out.dtype)])
+
+    def flush(self):
+        return self.crossfade.flush()
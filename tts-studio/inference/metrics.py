@@ -0,0 +1,220 @@
+# 进程内的延迟 / 吞吐指标, 以 Prometheus 文本格式导出.
+# 关闭时 Metrics.request() 返回 NULL_TIMER, 各阶段计时都是空操作, 请求路径上不做任何记录.
+import bisect
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# 秒, 覆盖从缓存命中的前端 (毫秒级) 到长文本整段合成 (数十秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labelvalues, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labelvalues -> [各桶计数..., +Inf 桶计数, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labelvalues, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, labelvalues, ("le", _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, labelvalues)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Callback:
+    """导出时才调用 fn 取值, 用于已有的统计 (缓存命中数 / 队列深度); fn 返回 [(labelvalues, value)]"""
+
+    def __init__(self, name, help, kind, labelnames, fn):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labelvalues, value in self.fn():
+            if value is None:
+                continue
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class RequestTimer:
+    """一个请求的各阶段耗时, 同时计入全局的阶段直方图; 阶段可以在多个线程里记录 (流水线 / 连续批处理)"""
+
+    def __init__(self, stage_seconds):
+        self.stage_seconds = stage_seconds
+        self.start = time.perf_counter()
+        self.stages = {}  # name -> 累计秒数, 保持首次出现的顺序
+        self.tokens = 0
+        self.audio_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t)
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.stage_seconds.observe(seconds, name)
+
+    def add_tokens(self, n):
+        with self._lock:
+            self.tokens += n
+
+    def add_audio(self, seconds):
+        with self._lock:
+            self.audio_seconds += seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        """Server-Timing 响应头, 单位毫秒"""
+        with self._lock:
+            items = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        items.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(items)
+
+
+class _NullTimer:
+    _context = nullcontext()
+    tokens = 0
+    audio_seconds = 0.0
+    stages = {}
+
+    def stage(self, name):
+        return self._context
+
+    def record(self, name, seconds):
+        pass
+
+    def add_tokens(self, n):
+        pass
+
+    def add_audio(self, seconds):
+        pass
+
+    def elapsed(self):
+        return 0.0
+
+    def server_timing(self):
+        return ""
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """指标注册表; enabled 为 False 时 request() / time() 不做任何记录, render() 只输出空内容"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = []
+        self.stage_seconds = self.histogram("tts_stage_seconds", "各阶段耗时", ["stage"])
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def callback(self, name, help, fn, labelnames=(), kind="gauge"):
+        metric = Callback(name, help, kind, labelnames, fn)
+        self._metrics.append(metric)
+        return metric
+
+    def request(self):
+        return RequestTimer(self.stage_seconds) if self.enabled else NULL_TIMER
+
+    def time(self, stage):
+        """不属于某个请求的阶段计时 (如 BERT 批量前向), 只计入直方图"""
+        if not self.enabled:
+            return NULL_TIMER.stage(stage)
+        return self._time(stage)
+
+    @contextmanager
+    def _time(self, stage):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds.observe(time.perf_counter() - t, stage)
+
+    def render(self):
+        if not self.enabled:
+            return ""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
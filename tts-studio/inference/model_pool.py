@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class ModelPool:
+    """
+    常驻模型池: 按 key 缓存 loader(key) 的结果, 在内存预算内按 LRU 淘汰.
+    新模型在后台线程加载, 加载完成前当前模型照常服务; 请求用 acquire / release 固定开始时的模型,
+    被固定的模型和当前激活的模型不会被淘汰.
+    """
+
+    def __init__(self, loader, max_bytes=0, sizeof=lambda value: value.nbytes):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._pins = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self.active_key = None
+        self._wanted_key = None
+        self.loads = 0
+        self.load_ms = 0.0
+        self.evictions = 0
+        self.switches = 0
+
+    def _submit(self, fn, *args):
+        if self._executor is None:
+            # 首次加载时才创建线程, 便于多进程模式下 fork 之后再创建
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-pool")
+        return self._executor.submit(fn, *args)
+
+    def _load(self, key):
+        t = time.perf_counter()
+        try:
+            value = self.loader(key)
+        except BaseException:
+            with self._lock:
+                self._loading.pop(key, None)
+                if self._wanted_key == key:
+                    self._wanted_key = self.active_key
+            raise
+        nbytes = self.sizeof(value)
+        with self._lock:
+            self._entries[key] = (value, nbytes)
+            self._loading.pop(key, None)
+            self.loads += 1
+            self.load_ms += (time.perf_counter() - t) * 1000
+            if self._wanted_key == key:
+                self._set_active(key)
+            self._evict()
+        return value
+
+    def load(self, key):
+        """后台加载, 已加载则直接返回完成的 future"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                future = Future()
+                future.set_result(entry[0])
+                return future
+            future = self._loading.get(key)
+            if future is None:
+                future = self._submit(self._load, key)
+                self._loading[key] = future
+            return future
+
+    def activate(self, key):
+        """切换当前模型: 已常驻时立即生效, 否则在后台加载完成后生效"""
+        with self._lock:
+            self._wanted_key = key
+            if key in self._entries:
+                self._set_active(key)
+        return self.load(key)
+
+    @property
+    def wanted_key(self):
+        """最近一次 activate 的 key, 加载完成前与 active_key 不同"""
+        with self._lock:
+            return self._wanted_key
+
+    def after_fork(self):
+        """fork 出的子进程里调用: 父进程的加载线程不会带到子进程, 丢掉旧线程池和等不到结果的 future"""
+        self._executor = None
+        self._loading.clear()
+
+    def _set_active(self, key):
+        if self.active_key != key:
+            self.active_key = key
+            self.switches += 1
+        self._entries.move_to_end(key)
+
+    def acquire(self):
+        """固定当前激活的模型, 返回 (key, value), 用完必须 release"""
+        with self._lock:
+            if self.active_key is None:
+                raise RuntimeError("模型尚未加载完成")
+            key = self.active_key
+            self._pins[key] = self._pins.get(key, 0) + 1
+            self._entries.move_to_end(key)
+            return key, self._entries[key][0]
+
+    def release(self, key):
+        with self._lock:
+            self._pins[key] -= 1
+            if self._pins[key] == 0:
+                del self._pins[key]
+                self._evict()
+
+    def _evict(self):
+        total = sum(nbytes for _, nbytes in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if key == self.active_key or key in self._pins:
+                continue
+            _, nbytes = self._entries.pop(key)
+            total -= nbytes
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": list(self.active_key) if self.active_key else None,
+                "loading": [list(key) for key in self._loading],
+                "resident": [
+                    {"key": list(key), "bytes": nbytes, "pins": self._pins.get(key, 0)}
+                    for key, (_, nbytes) in self._entries.items()
+                ],
+                "bytes": sum(nbytes for _, nbytes in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "loads": self.loads,
+                "avg_load_ms": round(self.load_ms / self.loads, 1) if self.loads else 0.0,
+                "switches": self.switches,
+                "evictions": self.evictions,
+            }
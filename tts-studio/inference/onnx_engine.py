@@ -0,0 +1,104 @@
+import json
+import os
+
+import numpy as np
+import onnxruntime
+
+from inference.onnx_export import (
+    META,
+    SOVITS_DECODER,
+    T2S_ENCODER,
+    T2S_FIRST_STAGE_DECODER,
+    T2S_STAGE_DECODER,
+    weights_identity,
+)
+
+onnxruntime.set_default_logger_severity(3)
+
+
+class OnnxSession:
+    """
+    CPU 上的 onnxruntime 会话, 用 IO binding 运行.
+    输入可以是 numpy 数组或上一次输出的 OrtValue, 逐步解码时 kv 缓存不经过 numpy 来回拷贝.
+    """
+
+    def __init__(self, path, num_threads=0):
+        sess_options = onnxruntime.SessionOptions()
+        sess_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        sess_options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        if num_threads > 0:
+            sess_options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(path, sess_options=sess_options, providers=["CPUExecutionProvider"])
+        self.output_names = [output.name for output in self.session.get_outputs()]
+
+    def run(self, **inputs):
+        binding = self.session.io_binding()
+        for name, value in inputs.items():
+            if isinstance(value, np.ndarray):
+                binding.bind_cpu_input(name, np.ascontiguousarray(value))
+            else:
+                binding.bind_ortvalue_input(name, value)
+        for name in self.output_names:
+            binding.bind_output(name, "cpu")
+        self.session.run_with_iobinding(binding)
+        return binding.get_outputs()
+
+
+class OnnxEngine:
+    """
+    onnx_export 导出目录的推理封装: T2S 编码器 + 首步解码 + 逐步解码, 以及带 ge 输入的 SoVITS 解码器.
+    T2S 的采样 (top_k, repetition_penalty=1.35) 在导出时固定在图里.
+    """
+
+    def __init__(self, onnx_dir, num_threads=0):
+        self.onnx_dir = onnx_dir
+        with open(os.path.join(onnx_dir, META), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.EOS = self.meta["EOS"]
+        self.encoder = OnnxSession(os.path.join(onnx_dir, T2S_ENCODER), num_threads)
+        self.first_stage_decoder = OnnxSession(os.path.join(onnx_dir, T2S_FIRST_STAGE_DECODER), num_threads)
+        self.stage_decoder = OnnxSession(os.path.join(onnx_dir, T2S_STAGE_DECODER), num_threads)
+        self.sovits_decoder = OnnxSession(os.path.join(onnx_dir, SOVITS_DECODER), num_threads)
+
+    def matches(self, gpt_path, sovits_path):
+        """导出时的权重与当前加载的权重是否一致"""
+        try:
+            return (
+                self.meta["gpt"] == weights_identity(gpt_path)
+                and self.meta["sovits"] == weights_identity(sovits_path)
+            )
+        except OSError:
+            return False
+
+    def infer_panel(self, phoneme_ids, prompts, bert, early_stop_num=-1, should_stop=None):
+        """
+        phoneme_ids: (1, N) int64, prompts: (1, P) int64, bert: (1, 1024, N) float32.
+        返回与 Text2SemanticDecoder.infer_panel 调用方切片结果一致的 (1, n) semantic token.
+        should_stop 返回 True 时提前结束, 结果由调用方丢弃.
+        """
+        x = self.encoder.run(phoneme_ids=phoneme_ids.astype(np.int64), bert=bert.astype(np.float32))[0]
+        y, k, v, y_emb, x_example = self.first_stage_decoder.run(x=x, prompts=prompts.astype(np.int64))
+        prefix_len = prompts.shape[1]
+        for idx in range(1, 1500):
+            y, k, v, y_emb, logits, samples = self.stage_decoder.run(iy=y, ik=k, iv=v, iy_emb=y_emb, ix_example=x_example)
+            if early_stop_num != -1 and (y.shape()[1] - prefix_len) > early_stop_num:
+                print("use early stop num:", early_stop_num)
+                break
+            if np.argmax(logits.numpy(), axis=-1)[0] == self.EOS or samples.numpy()[0, 0] == self.EOS:
+                break
+            if should_stop is not None and should_stop():
+                break
+        print(f"T2S Decoding EOS [{prefix_len} -> {y.shape()[1]}]")
+        y = y.numpy()
+        # 与 infer_panel 返回 (y[:, :-1], idx - 1) 后 pred_semantic[:, -idx:] 的切片一致
+        return y[:, :-1][:, -(idx - 1):]
+
+    def decode(self, codes, text, ge, noise_scale=0.5):
+        """codes: (1, 1, T) int64, text: (1, N) int64, ge: (1, gin, 1) -> 一维音频"""
+        audio = self.sovits_decoder.run(
+            codes=codes.astype(np.int64),
+            text=text.astype(np.int64),
+            ge=ge.astype(np.float32),
+            noise_scale=np.array(noise_scale, dtype=np.float32),
+        )[0]
+        return audio.numpy()[0, 0]
@@ -0,0 +1,160 @@
+# 导出 GPT-SoVITS 的 ONNX 推理图, 供 tts_api.py --engine onnx 使用
+# 用法: python -m inference.onnx_export -g GPT.ckpt -s SoVITS.pth -o onnx/my_voice [--top_k 15]
+import argparse
+import json
+import os
+
+import torch
+from torch import nn
+
+from AR.models.t2s_model_onnx import Text2SemanticDecoder
+from inference.weights import load_checkpoint, weights_identity
+from module.models_onnx import SynthesizerTrn
+from utils import HParams
+
+T2S_ENCODER = "t2s_encoder.onnx"
+T2S_FIRST_STAGE_DECODER = "t2s_fsdec.onnx"
+T2S_STAGE_DECODER = "t2s_sdec.onnx"
+SOVITS_DECODER = "sovits_decoder.onnx"
+META = "meta.json"
+
+
+class SoVITSDecoder(nn.Module):
+    """codes, text, ge, noise_scale -> audio, ge 由服务端按参考音频缓存"""
+
+    def __init__(self, vq_model):
+        super().__init__()
+        self.vq_model = vq_model
+
+    def forward(self, codes, text, ge, noise_scale):
+        return self.vq_model.decode_with_ge(codes, text, ge, noise_scale)
+
+
+def load_t2s(gpt_path, top_k=None):
+    dict_s1 = load_checkpoint(gpt_path)
+    config = dict_s1["config"]
+    model = Text2SemanticDecoder(config=config)
+    # 权重文件里是 Lightning 模块的 state_dict, 键带 "model." 前缀
+    model.load_state_dict({k[len("model."):]: v for k, v in dict_s1["weight"].items() if k.startswith("model.")})
+    model.top_k = torch.LongTensor([top_k or config["inference"]["top_k"]])
+    model.early_stop_num = torch.LongTensor([50 * config["data"]["max_sec"]])
+    model.eval()
+    return model, config
+
+
+def load_sovits(sovits_path):
+    dict_s2 = load_checkpoint(sovits_path)
+    hps = HParams(**dict_s2["config"])
+    hps.model.semantic_frame_rate = "25hz"
+    if dict_s2["weight"]["enc_p.text_embedding.weight"].shape[0] == 322:
+        hps.model.version = "v1"
+    else:
+        hps.model.version = "v2"
+    model = SynthesizerTrn(
+        hps.data.filter_length // 2 + 1,
+        hps.train.segment_size // hps.data.hop_length,
+        n_speakers=hps.data.n_speakers,
+        **vars(hps.model)
+    )
+    model.load_state_dict(dict_s2["weight"], strict=False)
+    model.eval()
+    return model, hps
+
+
+@torch.no_grad()
+def export_t2s(model, output_dir, opset_version=16):
+    model.init_onnx()
+    x = torch.randint(0, model.phoneme_vocab_size, (1, 32))
+    bert = torch.randn((1, 1024, 32))
+    prompts = torch.randint(0, model.EOS, (1, 50))
+
+    torch.onnx.export(
+        model.onnx_encoder, (x, bert), os.path.join(output_dir, T2S_ENCODER),
+        input_names=["phoneme_ids", "bert"], output_names=["x"],
+        dynamic_axes={"phoneme_ids": {1: "phoneme_length"}, "bert": {2: "phoneme_length"}, "x": {1: "phoneme_length"}},
+        opset_version=opset_version,
+    )
+    x = model.onnx_encoder(x, bert)
+    torch.onnx.export(
+        model.first_stage_decoder, (x, prompts), os.path.join(output_dir, T2S_FIRST_STAGE_DECODER),
+        input_names=["x", "prompts"], output_names=["y", "k", "v", "y_emb", "x_example"],
+        dynamic_axes={
+            "x": {1: "x_length"},
+            "prompts": {1: "prompts_length"},
+            "y": {1: "y_length"},
+            "k": {1: "kv_length"},
+            "v": {1: "kv_length"},
+            "y_emb": {1: "y_length"},
+            "x_example": {1: "x_length"},
+        },
+        opset_version=opset_version,
+    )
+    y, k, v, y_emb, x_example = model.first_stage_decoder(x, prompts)
+    torch.onnx.export(
+        model.stage_decoder, (y, k, v, y_emb, x_example), os.path.join(output_dir, T2S_STAGE_DECODER),
+        input_names=["iy", "ik", "iv", "iy_emb", "ix_example"],
+        output_names=["y", "k", "v", "y_emb", "logits", "samples"],
+        dynamic_axes={
+            "iy": {1: "iy_length"},
+            "ik": {1: "ik_length"},
+            "iv": {1: "iv_length"},
+            "iy_emb": {1: "iy_emb_length"},
+            "ix_example": {1: "ix_example_length"},
+            "y": {1: "y_length"},
+            "k": {1: "kv_length"},
+            "v": {1: "kv_length"},
+            "y_emb": {1: "y_length"},
+        },
+        opset_version=opset_version,
+    )
+
+
+@torch.no_grad()
+def export_sovits(model, output_dir, opset_version=16):
+    decoder = SoVITSDecoder(model).eval()
+    codes = torch.randint(0, 1024, (1, 1, 40))
+    text = torch.randint(1, 300, (1, 20))
+    ge = torch.randn((1, model.gin_channels, 1))
+    noise_scale = torch.tensor(0.5)
+    torch.onnx.export(
+        decoder, (codes, text, ge, noise_scale), os.path.join(output_dir, SOVITS_DECODER),
+        input_names=["codes", "text", "ge", "noise_scale"], output_names=["audio"],
+        dynamic_axes={"codes": {2: "codes_length"}, "text": {1: "text_length"}, "audio": {2: "audio_length"}},
+        opset_version=opset_version,
+    )
+
+
+def export(gpt_path, sovits_path, output_dir, top_k=None, opset_version=16):
+    os.makedirs(output_dir, exist_ok=True)
+    t2s, config = load_t2s(gpt_path, top_k)
+    export_t2s(t2s, output_dir, opset_version)
+    vq_model, hps = load_sovits(sovits_path)
+    export_sovits(vq_model, output_dir, opset_version)
+    meta = {
+        "gpt": weights_identity(gpt_path),
+        "sovits": weights_identity(sovits_path),
+        "version": hps.model.version,
+        "sampling_rate": hps.data.sampling_rate,
+        "top_k": int(t2s.top_k[0]),
+        "EOS": t2s.EOS,
+        "max_sec": config["data"]["max_sec"],
+    }
+    with open(os.path.join(output_dir, META), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="export GPT-SoVITS to ONNX")
+    parser.add_argument("-g", "--gpt_path", type=str, required=True)
+    parser.add_argument("-s", "--sovits_path", type=str, required=True)
+    parser.add_argument("-o", "--output_dir", type=str, required=True)
+    parser.add_argument("--top_k", type=int, default=None, help="T2S 采样 top_k, 导出后固定在图里, 默认取 GPT 配置")
+    parser.add_argument("--opset", type=int, default=16)
+    args = parser.parse_args()
+    meta = export(args.gpt_path, args.sovits_path, args.output_dir, args.top_k, args.opset)
+    print(f"exported to {args.output_dir}: {meta}")
+
+
+if __name__ == "__main__":
+    main()
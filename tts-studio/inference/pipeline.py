@@ -0,0 +1,109 @@
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class _StageError:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0  # 处理耗时
+        self.idle = 0.0  # 等待上游输入
+        self.blocked = 0.0  # 下游队列已满时的等待
+
+    def as_dict(self):
+        return {
+            "items": self.items,
+            "busy_ms": round(self.busy * 1000, 1),
+            "idle_ms": round(self.idle * 1000, 1),
+            "blocked_ms": round(self.blocked * 1000, 1),
+        }
+
+
+class StagedPipeline:
+    """
+    多阶段线程流水线: 每个阶段一个工作线程, 阶段之间是有界队列.
+    第 N+1 个输入的前面阶段可以和第 N 个输入的后面阶段并行, 每个阶段单线程 FIFO, 输出顺序与输入一致.
+    """
+
+    def __init__(self, stages, maxsize=2):
+        self.stages = stages
+        self.maxsize = maxsize
+        self.stats = [StageStats(name) for name, _ in stages]
+        self._stop = threading.Event()
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _worker(self, fn, stats, in_q, out_q):
+        while True:
+            t = time.perf_counter()
+            item = self._get(in_q)
+            stats.idle += time.perf_counter() - t
+            if item is _DONE or isinstance(item, _StageError):
+                self._put(out_q, item)
+                return
+            t = time.perf_counter()
+            try:
+                result = fn(item)
+            except Exception as e:
+                self._put(out_q, _StageError(e))
+                return
+            stats.busy += time.perf_counter() - t
+            stats.items += 1
+            t = time.perf_counter()
+            if not self._put(out_q, result):
+                return
+            stats.blocked += time.perf_counter() - t
+
+    def _feed(self, items, q):
+        for item in items:
+            if not self._put(q, item):
+                return
+        self._put(q, _DONE)
+
+    def run(self, items):
+        """按输入顺序产出最后一个阶段的结果; 提前关闭生成器会停止所有工作线程"""
+        queues = [queue.Queue(maxsize=self.maxsize) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0]), daemon=True)]
+        for i, (name, fn) in enumerate(self.stages):
+            threads.append(threading.Thread(
+                target=self._worker, args=(fn, self.stats[i], queues[i], queues[i + 1]),
+                name=f"pipeline-{name}", daemon=True,
+            ))
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = self._get(queues[-1])
+                if item is _DONE:
+                    return
+                if isinstance(item, _StageError):
+                    raise item.exc
+                yield item
+        finally:
+            self._stop.set()
+
+    def report(self):
+        return {stats.name: stats.as_dict() for stats in self.stats}
@@ -0,0 +1,107 @@
+# 多进程服务: 主进程加载模型后 fork 出 N 个 worker, 所有 worker 共用主进程绑定的监听 socket, 由内核分配连接.
+# 模型权重只在主进程加载一次, fork 后各 worker 以写时复制方式映射同一份物理页; 推理只读权重, 这些页不会被复制.
+# 仅支持有 fork 的平台 (Linux / macOS) 和 CPU 推理, CUDA 上下文不能跨 fork 使用.
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+logger = logging.getLogger("prefork")
+
+STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)
+
+
+def supported():
+    return hasattr(os, "fork")
+
+
+def bind_socket(host, port, backlog=2048):
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def freeze_shared_objects():
+    """fork 之前调用: 已有对象移出 GC 跟踪, 避免 worker 里的 GC 改写对象头把共享页逐页复制出来"""
+    gc.collect()
+    gc.freeze()
+
+
+class PreforkServer:
+    """
+    主进程只负责 fork 和回收 worker: SIGINT / SIGTERM 时通知所有 worker 优雅退出, SIGHUP 时退出后由调用方重启,
+    worker 异常退出时重新 fork 一个. on_worker_start(index) 在 worker 里、开始接受连接之前调用.
+    """
+
+    def __init__(self, app, host, port, workers, on_worker_start=None, log_level="info"):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.on_worker_start = on_worker_start
+        self.log_level = log_level
+        self.sock = None
+        self.children = {}  # pid -> worker index
+        self.stopping = False
+        self.restart = False
+
+    def _spawn(self, index):
+        pid = os.fork()
+        if pid != 0:
+            self.children[pid] = index
+            return
+        # worker: 主进程的信号处理交还默认, uvicorn 会安装自己的优雅退出处理
+        for signum in STOP_SIGNALS:
+            signal.signal(signum, signal.SIG_DFL)
+        self.children = {}
+        code = 0
+        try:
+            if self.on_worker_start is not None:
+                self.on_worker_start(index)
+            config = uvicorn.Config(self.app, log_level=self.log_level)
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception(f"worker {index} 异常退出")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+        self.restart = signum == signal.SIGHUP
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        """阻塞直到所有 worker 退出, 返回是否需要重启"""
+        self.sock = bind_socket(self.host, self.port)
+        freeze_shared_objects()
+        for signum in STOP_SIGNALS:
+            signal.signal(signum, self._stop)
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info(f"{self.workers} 个 worker 监听 {self.host}:{self.port}, 主进程 {os.getpid()}")
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            index = self.children.pop(pid, None)
+            if index is None or self.stopping:
+                continue
+            logger.warning(f"worker {index} (pid {pid}) 退出, 状态 {status}, 重新启动")
+            time.sleep(1)
+            self._spawn(index)
+        self.sock.close()
+        return self.restart
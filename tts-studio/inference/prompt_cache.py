@@ -0,0 +1,106 @@
+import os
+import threading
+from collections import OrderedDict
+
+import torch
+
+
+def tensor_nbytes(obj):
+    """递归统计对象中 tensor 占用的字节数, 用于缓存的内存预算"""
+    if isinstance(obj, torch.Tensor):
+        return obj.element_size() * obj.nelement()
+    if isinstance(obj, (list, tuple)):
+        return sum(tensor_nbytes(item) for item in obj)
+    if isinstance(obj, dict):
+        return sum(tensor_nbytes(item) for item in obj.values())
+    if hasattr(obj, "__dict__"):
+        return tensor_nbytes(vars(obj))
+    return 0
+
+
+def file_identity(path):
+    """文件身份: 绝对路径 + mtime + 大小, 文件被覆盖后自动失效"""
+    if path is None or path == "":
+        return None
+    path = os.path.abspath(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (path, 0, 0)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+class LRUCache:
+    """
+    带内存预算的线程安全 LRU 缓存.
+    put 时可传入本次计算耗时 cost_ms, 命中时累计到 saved_ms, 方便观察省下的时间.
+    """
+
+    def __init__(self, max_bytes, max_items=None, sizeof=tensor_nbytes):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.sizeof = sizeof
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_ms = 0.0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            self.saved_ms += entry[2]
+            return entry[0]
+
+    def put(self, key, value, cost_ms=0.0):
+        if not self.enabled:
+            return
+        nbytes = self.sizeof(value)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._data[key] = (value, nbytes, cost_ms)
+            self.total_bytes += nbytes
+            while self._data and (
+                self.total_bytes > self.max_bytes
+                or (self.max_items is not None and len(self._data) > self.max_items)
+            ):
+                _, (_, evicted_bytes, _) = self._data.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "saved_ms": round(self.saved_ms, 3),
+            }
@@ -0,0 +1,47 @@
+import json
+import multiprocessing
+
+
+class SharedState:
+    """
+    多个 worker 进程共享的一小块 json 状态 (默认参考音频 / 当前模型), 须在 fork 之前创建.
+    get() 返回快照, 请求开始时取一次, 之后其他进程修改不影响进行中的请求.
+    """
+
+    def __init__(self, initial, size=64 * 1024):
+        self._buffer = multiprocessing.Array("c", size)
+        self._generation = multiprocessing.Value("Q", 0, lock=False)
+        # 本进程解析过的最新版本, fork 后各进程各自一份
+        self._cached = (None, None)
+        self._write(dict(initial))
+
+    def _write(self, data):
+        raw = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        if len(raw) >= len(self._buffer):
+            raise ValueError(f"共享状态超过 {len(self._buffer)} 字节")
+        self._buffer.value = raw
+        self._generation.value += 1
+
+    def get(self):
+        with self._buffer.get_lock():
+            generation = self._generation.value
+            if self._cached[0] == generation:
+                return dict(self._cached[1])
+            data = json.loads(self._buffer.value.decode("utf-8"))
+        self._cached = (generation, data)
+        return dict(data)
+
+    def update(self, **changes):
+        with self._buffer.get_lock():
+            data = json.loads(self._buffer.value.decode("utf-8"))
+            data.update(changes)
+            self._write(data)
+        return data
+
+    def append(self, key, value, limit):
+        """往列表字段追加一项, 只保留最近 limit 项"""
+        with self._buffer.get_lock():
+            data = json.loads(self._buffer.value.decode("utf-8"))
+            data[key] = (data.get(key) or [])[-(limit - 1):] + [value]
+            self._write(data)
+        return data
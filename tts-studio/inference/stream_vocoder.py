@@ -0,0 +1,78 @@
+import numpy as np
+import torch
+
+
+class StreamingVocoder:
+    """
+    在 semantic token 还在生成时就逐段解码音频.
+    每次在 [已输出 - left_context, 当前末尾] 的窗口上运行 SynthesizerTrn.decode,
+    只提交到末尾前 lookahead 个 token 为止的音频, 相邻两段之间用 crossfade 拼接.
+    """
+
+    def __init__(self, vq_model, phones, refer, ge, speed=1, noise_scale=0.5,
+                 chunk_tokens=24, left_context=12, lookahead=6, crossfade=0.02, sampling_rate=32000, generator=None):
+        self.vq_model = vq_model
+        self.phones = phones
+        self.refer = refer
+        self.ge = ge
+        self.speed = speed
+        self.noise_scale = noise_scale
+        self.generator = generator
+        self.chunk_tokens = chunk_tokens
+        self.left_context = left_context
+        self.lookahead = lookahead
+        self.fade = int(sampling_rate * crossfade)
+        self.codes = None
+        self.done = 0
+        self.tail = None
+
+    def _decode(self, start, end):
+        codes = self.codes[:, start:end].unsqueeze(0)
+        audio = self.vq_model.decode(codes, self.phones, self.refer, noise_scale=self.noise_scale,
+                                     speed=self.speed, ge=self.ge, generator=self.generator)
+        audio = audio.detach().cpu().float().numpy()[0, 0]
+        # speed != 1 时 enc_p 会插值, 按实际输出长度换算每个 token 的采样点数
+        return audio, len(audio) / (end - start)
+
+    def _emit(self, segment, hold):
+        """与上一段留下的 tail 做 crossfade, 再把末尾 hold 个采样点 (超出提交点的部分) 留作新的 tail"""
+        if self.tail is not None:
+            # tail 与本段开头是同一段音频, crossfade 变短时 tail 多出的部分直接丢掉, 本段里已有
+            fade = min(len(self.tail), len(segment) - hold)
+            if fade > 0:
+                ramp = np.linspace(0.0, 1.0, fade, dtype=segment.dtype)
+                head = self.tail[:fade] * (1.0 - ramp) + segment[:fade] * ramp
+                segment = np.concatenate([head, segment[fade:]])
+        if hold == 0:
+            self.tail = None
+            return segment
+        self.tail = segment[-hold:]
+        return segment[:-hold]
+
+    def push(self, tokens):
+        """追加新 token, 够一段时返回可播放的音频, 否则返回 None"""
+        self.codes = tokens if self.codes is None else torch.concat([self.codes, tokens], dim=1)
+        total = self.codes.shape[1]
+        commit = total - self.lookahead
+        if commit - self.done < self.chunk_tokens:
+            return None
+        start = max(0, self.done - self.left_context)
+        audio, spt = self._decode(start, total)
+        begin = int(round((self.done - start) * spt))
+        end = int(round((commit - start) * spt))
+        # 多取最多 fade 个采样点, 与下一段的开头做 crossfade; 音频末尾或本段太短时相应缩短, 留下的只是实际多取的部分
+        hold = max(0, min(self.fade, len(audio) - end, (end - begin) // 2))
+        self.done = commit
+        return self._emit(audio[begin:end + hold], hold)
+
+    def flush(self):
+        """解码结束, 输出剩余的全部音频"""
+        if self.codes is None or self.codes.shape[1] <= self.done:
+            tail, self.tail = self.tail, None
+            return tail if tail is not None else np.zeros(0, dtype=np.float32)
+        total = self.codes.shape[1]
+        start = max(0, self.done - self.left_context)
+        audio, spt = self._decode(start, total)
+        begin = int(round((self.done - start) * spt))
+        self.done = total
+        return self._emit(audio[begin:], 0)
@@ -0,0 +1,269 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import torch
+import torch.nn.functional as F
+
+from AR.models.utils import sample
+from inference.cancellation import Cancelled
+
+
+class T2SJob:
+    """
+    一条待解码的 semantic 序列, 结果通过 future 返回 (1, n) 的 semantic token; should_stop 为真时以 Cancelled 结束.
+    generator 不为空时该行按自己的随机数生成器采样, 结果与同一 batch 里的其他序列无关
+    """
+
+    def __init__(self, model, x, prompts, bert, top_k, top_p, temperature, early_stop_num, should_stop=None, generator=None):
+        self.model = model
+        self.x = x
+        self.prompts = prompts
+        self.bert = bert
+        self.top_k = top_k
+        self.top_p = top_p
+        self.temperature = temperature
+        self.early_stop_num = early_stop_num
+        self.should_stop = should_stop
+        self.generator = generator
+        self.future = Future()
+        self.submit_time = time.perf_counter()
+
+
+class _Row:
+    def __init__(self, job, y, y_len):
+        self.job = job
+        self.y = y
+        self.y_len = y_len
+        self.prefix_len = y_len
+        self.step = 0
+
+
+class T2SScheduler:
+    """
+    跨请求的 T2S 连续批处理调度器.
+    所有请求的句子进入同一队列, 每条序列先单独做 prompt 预填充, 之后并入共享 batch 逐 token 解码;
+    某行遇到 EOS 立即移出并返回结果, 空出的位置在下一步前接纳新序列.
+    不同长度的 kv 缓存左侧补齐, 用 padding mask 屏蔽. 同一时刻 batch 内只有同一个 T2S 模型.
+    """
+
+    def __init__(self, max_batch_size=8, repetition_penalty=1.35):
+        self.max_batch_size = max_batch_size
+        self.repetition_penalty = repetition_penalty
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+
+        self.model = None
+        self.rows = []
+        self.k_cache = None
+        self.v_cache = None
+        self.padding_mask = None
+
+        self.steps = 0
+        self.occupied_slots = 0
+        self.tokens_generated = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.max_queue_depth = 0
+        self.queue_wait_ms = deque(maxlen=1000)
+        # 可选的回调, 每条序列开始解码时以排队秒数调用, 用于导出指标
+        self.on_queue_wait = None
+
+    def submit(self, job):
+        with self._cond:
+            if self._thread is None:
+                # 首次提交时才启动线程, 便于多进程模式下 fork 之后再创建
+                self._thread = threading.Thread(target=self._loop, name="t2s-scheduler", daemon=True)
+                self._thread.start()
+            self._pending.append(job)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+            self._cond.notify()
+        return job.future
+
+    def stats(self):
+        with self._cond:
+            queue_depth = len(self._pending)
+        waits = sorted(self.queue_wait_ms)
+        return {
+            "queue_depth": queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "active_rows": len(self.rows),
+            "max_batch_size": self.max_batch_size,
+            "steps": self.steps,
+            "batch_occupancy": self.occupied_slots / (self.steps * self.max_batch_size) if self.steps else 0.0,
+            "avg_batch_size": self.occupied_slots / self.steps if self.steps else 0.0,
+            "tokens_generated": self.tokens_generated,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "queue_wait_ms_p50": waits[len(waits) // 2] if waits else 0.0,
+            "queue_wait_ms_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+        }
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self.rows:
+                    self._cond.wait()
+                admit = []
+                while (
+                    self._pending
+                    and len(self.rows) + len(admit) < self.max_batch_size
+                    and (self.model is None or self._pending[0].model is self.model)
+                ):
+                    job = self._pending.popleft()
+                    if self.model is None:
+                        self.model = job.model
+                    admit.append(job)
+            try:
+                with torch.no_grad():
+                    for job in admit:
+                        self._admit(job)
+                    if self.rows:
+                        self._step()
+            except Exception as e:
+                for row in self.rows:
+                    if not row.job.future.done():
+                        row.job.future.set_exception(e)
+                for job in admit:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                self._reset()
+            if not self.rows:
+                self._reset()
+
+    def _reset(self):
+        self.model = None
+        self.rows = []
+        self.k_cache = None
+        self.v_cache = None
+        self.padding_mask = None
+
+    def _sample(self, row, logits):
+        job = row.job
+        return sample(
+            logits, row.y, top_k=job.top_k, top_p=job.top_p,
+            repetition_penalty=self.repetition_penalty, temperature=job.temperature, generator=job.generator,
+        )[0].unsqueeze(0)
+
+    def _admit(self, job):
+        wait = time.perf_counter() - job.submit_time
+        self.queue_wait_ms.append(wait * 1000)
+        if self.on_queue_wait is not None:
+            self.on_queue_wait(wait)
+        if self._cancelled(job):
+            return
+        model = job.model
+        y = job.prompts
+        y_len = y.shape[1]
+        xy_pos, xy_attn_mask, _ = model._prepare_prompt(job.x, job.bert, y)
+        xy_dec, k_cache, v_cache = model.t2s_transformer.process_prompt(xy_pos, xy_attn_mask)
+
+        # 首步不允许 EOS, 与 infer_panel 一致
+        logits = model.ar_predict_layer(xy_dec[:, -1])[:, :-1]
+        row = _Row(job, y, y_len)
+        samples = self._sample(row, logits[0])
+        row.y = torch.concat([row.y, samples], dim=1)
+        self.tokens_generated += 1
+        if self._finished(row, logits[0], samples):
+            self._complete(row)
+            return
+        self._merge(row, k_cache, v_cache)
+
+    def _merge(self, row, k_new, v_new):
+        new_len = k_new[0].shape[1]
+        new_mask = torch.zeros((1, new_len), dtype=torch.bool, device=k_new[0].device)
+        if not self.rows:
+            self.k_cache = list(k_new)
+            self.v_cache = list(v_new)
+            self.padding_mask = new_mask
+            self.rows = [row]
+            return
+        cur_len = self.padding_mask.shape[1]
+        if new_len < cur_len:
+            pad = cur_len - new_len
+            k_new = [F.pad(k, (0, 0, pad, 0)) for k in k_new]
+            v_new = [F.pad(v, (0, 0, pad, 0)) for v in v_new]
+            new_mask = F.pad(new_mask, (pad, 0), value=True)
+        elif new_len > cur_len:
+            pad = new_len - cur_len
+            self.k_cache = [F.pad(k, (0, 0, pad, 0)) for k in self.k_cache]
+            self.v_cache = [F.pad(v, (0, 0, pad, 0)) for v in self.v_cache]
+            self.padding_mask = F.pad(self.padding_mask, (pad, 0), value=True)
+        self.k_cache = [torch.concat([k, kn], dim=0) for k, kn in zip(self.k_cache, k_new)]
+        self.v_cache = [torch.concat([v, vn], dim=0) for v, vn in zip(self.v_cache, v_new)]
+        self.padding_mask = torch.concat([self.padding_mask, new_mask], dim=0)
+        self.rows.append(row)
+
+    def _step(self):
+        model = self.model
+        batch_size = len(self.rows)
+        self.steps += 1
+        self.occupied_slots += batch_size
+
+        last_tokens = torch.concat([row.y[:, -1:] for row in self.rows], dim=0)
+        positions = torch.LongTensor([row.y_len + row.step for row in self.rows])
+        y_emb = model.ar_audio_embedding(last_tokens)
+        pe = model.ar_audio_position.pe[0, positions].unsqueeze(1).to(dtype=y_emb.dtype, device=y_emb.device)
+        xy_pos = y_emb * model.ar_audio_position.x_scale + model.ar_audio_position.alpha * pe
+
+        self.padding_mask = F.pad(self.padding_mask, (0, 1), value=False)
+        xy_dec, self.k_cache, self.v_cache = model.t2s_transformer.decode_next_token(
+            xy_pos, self.k_cache, self.v_cache, self.padding_mask.view(batch_size, 1, 1, -1)
+        )
+        logits = model.ar_predict_layer(xy_dec[:, -1])
+
+        keep = []
+        for i, row in enumerate(self.rows):
+            if self._cancelled(row.job):
+                continue
+            row.step += 1
+            samples = self._sample(row, logits[i])
+            row.y = torch.concat([row.y, samples], dim=1)
+            self.tokens_generated += 1
+            if self._finished(row, logits[i], samples):
+                self._complete(row)
+            else:
+                keep.append(i)
+
+        if len(keep) == batch_size:
+            return
+        if not keep:
+            self._reset()
+            return
+        index = torch.LongTensor(keep).to(self.padding_mask.device)
+        self.rows = [self.rows[i] for i in keep]
+        self.k_cache = [k[index] for k in self.k_cache]
+        self.v_cache = [v[index] for v in self.v_cache]
+        self.padding_mask = self.padding_mask[index]
+        # 去掉所有行都已屏蔽的左侧列
+        valid = (~self.padding_mask).any(dim=0).nonzero(as_tuple=True)[0]
+        start = int(valid[0]) if valid.numel() > 0 else 0
+        if start > 0:
+            self.k_cache = [k[:, start:] for k in self.k_cache]
+            self.v_cache = [v[:, start:] for v in self.v_cache]
+            self.padding_mask = self.padding_mask[:, start:]
+
+    def _cancelled(self, job):
+        if job.should_stop is None or not job.should_stop():
+            return False
+        self.cancelled += 1
+        job.future.set_exception(Cancelled())
+        return True
+
+    def _finished(self, row, logits, samples):
+        job = row.job
+        if job.early_stop_num != -1 and (row.y.shape[1] - row.prefix_len) > job.early_stop_num:
+            print("use early stop num:", job.early_stop_num)
+            return True
+        if torch.argmax(logits, dim=-1) == job.model.EOS or samples[0, 0] == job.model.EOS:
+            return True
+        return row.step >= 1499
+
+    def _complete(self, row):
+        # 与 infer_panel 返回 (y[:, :-1], idx - 1) 后 pred_semantic[:, -idx:] 的切片一致
+        idx = row.step
+        print(f"T2S Decoding EOS [{row.prefix_len} -> {row.y.shape[1]}]")
+        self.completed += 1
+        row.job.future.set_result(row.y[:, :-1][:, -(idx - 1):])
@@ -0,0 +1,67 @@
+# LLM 流式输出的增量切句: 文本分段推入, 能确定边界的句子立即切出交给合成
+STRONG_ENDERS = set("。！？!?；;…\n")
+WEAK_ENDERS = set("，,、：:")
+# 句末标点后紧跟的引号/括号归入前一句
+CLOSERS = set("”’\"')）】」』》")
+
+
+class IncrementalSegmenter:
+    """
+    句末标点处立即切分; 逗号等弱分隔符只在片段已有 min_chars 个字符时切分, 避免过碎;
+    超过 max_chars 仍无标点时强制切分. 英文句点后面是空白才算句末, 位于末尾时等下一段文本再判断.
+    """
+
+    def __init__(self, min_chars=8, max_chars=80):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def push(self, delta):
+        """追加一段文本, 返回新切出的句子"""
+        self.buffer += delta
+        text = self.buffer
+        sentences = []
+        start = 0
+        i = 0
+        while i < len(text):
+            ch = text[i]
+            length = i + 1 - start
+            cut = None
+            if ch in STRONG_ENDERS:
+                cut = i + 1
+            elif ch == ".":
+                if i + 1 == len(text):
+                    break
+                if text[i + 1].isspace():
+                    cut = i + 1
+            elif ch in WEAK_ENDERS and length >= self.min_chars:
+                cut = i + 1
+            elif length >= self.max_chars:
+                cut = i + 1
+            if cut is None:
+                i += 1
+                continue
+            while cut < len(text) and text[cut] in CLOSERS:
+                cut += 1
+            self._emit(sentences, text[start:cut])
+            start = i = cut
+        self.buffer = text[start:]
+        return sentences
+
+    def flush(self):
+        """文本结束, 剩余部分作为最后一句"""
+        sentences = []
+        self._emit(sentences, self.buffer)
+        self.buffer = ""
+        return sentences
+
+    def reset(self):
+        """丢弃缓冲中尚未切出的文本"""
+        self.buffer = ""
+
+    @staticmethod
+    def _emit(sentences, sentence):
+        sentence = sentence.strip()
+        # 纯标点不合成, 避免参考音频泄露
+        if any(ch.isalnum() for ch in sentence):
+            sentences.append(sentence)
@@ -0,0 +1,102 @@
+# 预编译的语音包: 参考音频派生出的全部推理条件 (HuBERT 语义 token, 参考文本的音素和 BERT 特征, 参考频谱, ref_enc 风格向量)
+# 存成一个 safetensors 文件, 读取时 mmap, 切换语音时不再需要 HuBERT / BERT / ffmpeg.
+# 文件头记录生成时的模型身份, 与当前模型不一致的部分在加载时用包里保存的波形 / 参考文本重新计算, 同样不需要 ffmpeg
+import json
+import os
+
+import torch
+from safetensors import safe_open
+from safetensors.torch import save_file
+
+FORMAT = "gpt-sovits-voice"
+SUFFIX = ".voice.safetensors"
+
+# 语义 token 和风格向量由 SoVITS + HuBERT 算出, 音素和 BERT 特征由前端 + BERT 算出, 参考频谱只取决于频谱参数
+ACOUSTIC_STAMPS = ("sovits", "hubert")
+TEXT_STAMPS = ("bert", "frontend", "version")
+SPEC_STAMPS = ("spec",)
+
+
+def is_voice_pack(path):
+    return isinstance(path, str) and path.endswith(SUFFIX)
+
+
+def voice_pack_path(wav_path):
+    """参考音频对应的语音包路径: 与音频同目录同名"""
+    return os.path.splitext(wav_path)[0] + SUFFIX
+
+
+def save_voice_pack(path, prompt_semantic, phones, bert, refers, ge, wav16k, meta, sources=()):
+    """
+    张量统一转成 cpu float32 / int64 保存; meta 为 json 可序列化的 dict, 含 prompt_text / prompt_language / stamps.
+    sources: 各参考音频原采样率的波形 [(波形, 采样率)], 频谱参数变了时据此重算频谱
+    """
+    tensors = {
+        "prompt_semantic": prompt_semantic.detach().cpu().long().contiguous(),
+        "phones": torch.LongTensor(phones),
+        "bert": bert.detach().cpu().float().contiguous(),
+        "ge": ge.detach().cpu().float().contiguous(),
+        "wav16k": wav16k.detach().cpu().float().contiguous(),
+    }
+    for i, refer in enumerate(refers):
+        tensors[f"refer.{i}"] = refer.detach().cpu().float().contiguous()
+    for i, (waveform, rate) in enumerate(sources):
+        tensors[f"source.{i}"] = torch.as_tensor(waveform).float().contiguous()
+    meta = dict(meta, source_rates=[rate for _, rate in sources])
+    # 先写临时文件再改名, 正在读取旧包的进程不受影响
+    tmp_path = path + ".tmp"
+    save_file(tensors, tmp_path, metadata={"format": FORMAT, "meta": json.dumps(meta, ensure_ascii=False)})
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_meta(path):
+    """只读文件头, 不读张量"""
+    with safe_open(path, framework="pt", device="cpu") as f:
+        metadata = f.metadata() or {}
+    if metadata.get("format") != FORMAT:
+        raise ValueError(f"{path} 不是语音包")
+    return json.loads(metadata["meta"])
+
+
+class VoicePack:
+    def __init__(self, path):
+        self.path = path
+        with safe_open(path, framework="pt", device="cpu") as f:
+            metadata = f.metadata() or {}
+            if metadata.get("format") != FORMAT:
+                raise ValueError(f"{path} 不是语音包")
+            # 原始波形只在频谱参数变了时才用到, 用到时再读
+            self.tensors = {key: f.get_tensor(key) for key in f.keys() if not key.startswith("source.")}
+        self.meta = json.loads(metadata["meta"])
+
+    @property
+    def prompt_text(self):
+        return self.meta["prompt_text"]
+
+    @property
+    def prompt_language(self):
+        return self.meta["prompt_language"]
+
+    @property
+    def phones(self):
+        return self.tensors["phones"].tolist()
+
+    @property
+    def refers(self):
+        return [self.tensors[f"refer.{i}"] for i in range(len(self.meta["paths"]))]
+
+    @property
+    def has_sources(self):
+        return len(self.meta.get("source_rates", [])) == len(self.meta["paths"])
+
+    def sources(self):
+        """[(原采样率的波形, 采样率)], 旧版语音包没有时返回空列表"""
+        if not self.has_sources:
+            return []
+        with safe_open(self.path, framework="pt", device="cpu") as f:
+            return [(f.get_tensor(f"source.{i}"), rate) for i, rate in enumerate(self.meta["source_rates"])]
+
+    def matches(self, stamps, names):
+        """names 里的各项模型身份与生成时是否一致"""
+        return all(self.meta["stamps"].get(name) == stamps[name] for name in names)
@@ -0,0 +1,166 @@
+# GPT / SoVITS 权重的 safetensors 格式: 权重按张量存放可直接 mmap, config 放在文件头的 metadata 里
+# 转换: python -m inference.weights SoVITS.pth [SoVITS.safetensors]
+import argparse
+import hashlib
+import json
+import os
+import struct
+from collections.abc import Mapping
+
+import torch
+from safetensors import safe_open
+from safetensors.torch import save_file
+
+FORMAT = "gpt-sovits"
+
+# 推理用不到的训练期张量, 转换时丢弃, 读取时跳过
+TRAINING_ONLY_PREFIXES = ("enc_q.", "net_d.")
+
+
+def is_safetensors(path):
+    return os.path.splitext(path)[1] == ".safetensors"
+
+
+# weights_identity 的内容摘要: 文件开头 1MB (含 safetensors 文件头) + 均匀分布的 16 个 64KB 采样块 + 文件末尾
+_DIGEST_HEAD = 1 << 20
+_DIGEST_BLOCK = 64 << 10
+_DIGEST_SAMPLES = 16
+# (绝对路径, mtime, 大小) -> 身份, 同一文件不重复读取
+_identity_cache = {}
+
+
+def _content_digest(path, size):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        head = _DIGEST_HEAD
+        if is_safetensors(path) and size >= 8:
+            # 文件头 (张量名 / 形状 / 偏移 / metadata) 总是完整计入
+            head = max(head, 8 + struct.unpack("<Q", f.read(8))[0])
+            f.seek(0)
+        h.update(f.read(head))
+        for i in range(1, _DIGEST_SAMPLES + 1):
+            f.seek(max(0, size * i // _DIGEST_SAMPLES - _DIGEST_BLOCK))
+            h.update(f.read(_DIGEST_BLOCK))
+    return h.hexdigest()[:16]
+
+
+def weights_identity(path):
+    """
+    权重文件的身份: 文件名 + 大小 + 内容摘要. 同结构的不同权重大小相同, 重训后同名覆盖的模型文件名也相同, 靠摘要区分;
+    不含路径和 mtime, 导出目录 / 语音包拷贝到别的机器上仍然有效
+    """
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    identity = _identity_cache.get(key)
+    if identity is None:
+        identity = _identity_cache[key] = [os.path.basename(path), st.st_size, _content_digest(path, st.st_size)]
+    return identity
+
+
+def _is_training_only(key):
+    return key.startswith(TRAINING_ONLY_PREFIXES)
+
+
+class LazyWeights(Mapping):
+    """safetensors 文件里的权重: 按键取值时才从 mmap 读出这一个张量, 不保留引用; 训练期张量不可见"""
+
+    def __init__(self, path, skip_training_only=True):
+        self.path = path
+        self._file = safe_open(path, framework="pt", device="cpu")
+        self._keys = [key for key in self._file.keys() if not (skip_training_only and _is_training_only(key))]
+        self._key_set = set(self._keys)
+
+    def metadata(self):
+        return self._file.metadata() or {}
+
+    def __contains__(self, key):
+        return key in self._key_set
+
+    def __getitem__(self, key):
+        if key not in self._key_set:
+            raise KeyError(key)
+        return self._file.get_tensor(key)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def load_checkpoint(path, skip_training_only=True):
+    """
+    返回与 torch.load 原格式一致的 {"config": ..., "weight": state_dict, "info": ...}.
+    safetensors 文件的 weight 是 LazyWeights, 这时还没有读任何张量; 配合 load_weights 逐个拷进模型, 训练期张量根本不会被读入内存
+    """
+    if not is_safetensors(path):
+        checkpoint = torch.load(path, map_location="cpu", weights_only=False)
+        if skip_training_only:
+            checkpoint["weight"] = {k: v for k, v in checkpoint["weight"].items() if not _is_training_only(k)}
+        return checkpoint
+    weight = LazyWeights(path, skip_training_only)
+    metadata = weight.metadata()
+    if metadata.get("format") != FORMAT:
+        raise ValueError(f"{path} 不是 GPT-SoVITS 权重文件")
+    return {
+        "config": json.loads(metadata["config"]),
+        "weight": weight,
+        "info": metadata.get("info", ""),
+    }
+
+
+@torch.no_grad()
+def load_weights(module, weight, strict=True):
+    """
+    代替 module.load_state_dict: 按模型的参数 / buffer 逐个从 weight 取张量, 原地拷进去后立即释放.
+    weight 为 LazyWeights 时任一时刻只有一个张量从 mmap 读入, 峰值内存约为模型本身加最大的一个张量,
+    而不是整份 state_dict 再加一个模型. 模型已经 half() / to(device) 时拷贝顺带转换类型和设备.
+    返回 (缺少的键, 多出的键); strict 时有任何一项就报错
+    """
+    targets = module.state_dict(keep_vars=True)
+    missing = [key for key in targets if key not in weight]
+    unexpected = [key for key in weight if key not in targets]
+    if strict and (missing or unexpected):
+        raise RuntimeError(f"权重与模型不匹配: 缺少 {missing[:5]}, 多出 {unexpected[:5]}")
+    for key, target in targets.items():
+        if key in weight:
+            value = weight[key]
+            if value.shape != target.shape:
+                raise RuntimeError(f"{key} 形状不一致: 权重 {tuple(value.shape)}, 模型 {tuple(target.shape)}")
+            target.copy_(value)
+    return missing, unexpected
+
+
+def convert(input_path, output_path=None):
+    """把 .pth / .ckpt 转成 .safetensors, 丢弃训练期张量, 共享存储的张量各自拷贝一份"""
+    if output_path is None:
+        output_path = os.path.splitext(input_path)[0] + ".safetensors"
+    checkpoint = torch.load(input_path, map_location="cpu", weights_only=False)
+    weight = {
+        key: value.contiguous().clone()
+        for key, value in checkpoint["weight"].items()
+        if isinstance(value, torch.Tensor) and not _is_training_only(key)
+    }
+    metadata = {
+        "format": FORMAT,
+        "config": json.dumps(checkpoint["config"], ensure_ascii=False),
+        "info": str(checkpoint.get("info", "")),
+        "source": os.path.basename(input_path),
+    }
+    save_file(weight, output_path, metadata=metadata)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="convert GPT/SoVITS checkpoints to safetensors")
+    parser.add_argument("input", type=str)
+    parser.add_argument("output", type=str, nargs="?", default=None)
+    args = parser.parse_args()
+    before = os.path.getsize(args.input)
+    output = convert(args.input, args.output)
+    after = os.path.getsize(output)
+    print(f"{args.input} ({before / 2 ** 20:.1f} MB) -> {output} ({after / 2 ** 20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
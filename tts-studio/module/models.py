@@ -984,8 +984,12 @@ class SynthesizerTrn(nn.Module):
         return o, y_mask, (z, z_p, m_p, logs_p)
 
     @torch.no_grad()
-    def decode(self, codes, text, refer, noise_scale=0.5,speed=1):
-        def get_ge(refer):
+    def get_ge(self, refer):
+        """
+        参考频谱 -> ref_enc 全局风格向量 ge, refer 为 list 时取平均.
+        同一参考音频的 ge 不变, 可预先算好传给 decode(ge=...)
+        """
+        def _get_ge(refer):
             ge = None
             if refer is not None:
                 refer_lengths = torch.LongTensor([refer.size(2)]).to(refer.device)
@@ -1000,11 +1004,19 @@ class SynthesizerTrn(nn.Module):
         if(type(refer)==list):
             ges=[]
             for _refer in refer:
-                ge=get_ge(_refer)
+                ge=_get_ge(_refer)
                 ges.append(ge)
             ge=torch.stack(ges,0).mean(0)
         else:
-            ge=get_ge(refer)
+            ge=_get_ge(refer)
+        return ge
+
+    @torch.no_grad()
+    def decode(self, codes, text, refer, noise_scale=0.5,speed=1,ge=None,generator=None):
+        # 传入预先计算的 ge 时跳过 ref_enc, 只走 quantizer -> enc_p -> flow -> dec
+        # generator 不为空时 flow 输入噪声由它产生, 固定种子时输出可复现
+        if ge is None:
+            ge = self.get_ge(refer)
 
         y_lengths = torch.LongTensor([codes.size(2) * 2]).to(codes.device)
         text_lengths = torch.LongTensor([text.size(-1)]).to(text.device)
@@ -1017,7 +1029,8 @@ class SynthesizerTrn(nn.Module):
         x, m_p, logs_p, y_mask = self.enc_p(
             quantized, y_lengths, text, text_lengths, ge,speed
         )
-        z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
+        noise = torch.randn(m_p.shape, generator=generator, device=m_p.device, dtype=m_p.dtype)
+        z_p = m_p + noise * torch.exp(logs_p) * noise_scale
 
         z = self.flow(z_p, y_mask, g=ge, reverse=True)
 
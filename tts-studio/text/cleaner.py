@@ -1,4 +1,5 @@
 from text import cleaned_text_to_sequence
+import importlib
 import os
 # if os.environ.get("version","v1")=="v1":
 #     from text import chinese
@@ -17,9 +18,38 @@ special = [
     # ('@', 'zh', "SP4")#不搞鬼畜了，和第二版保持一致吧
 ]
 
+# 可选的 clean_text 结果缓存, 由服务端通过 set_frontend_cache 开启
+frontend_cache = None
+
+
+def set_frontend_cache(cache):
+    global frontend_cache
+    frontend_cache = cache
+
+
+_language_modules = {}
+
+
+def get_language_module(name):
+    module = _language_modules.get(name)
+    if module is None:
+        module = importlib.import_module("text." + name)
+        _language_modules[name] = module
+    return module
+
 
 def clean_text(text, language, version=None):
     if version is None:version=os.environ.get('version', 'v2')
+    if frontend_cache is None:
+        return _clean_text(text, language, version)
+    result = frontend_cache.get(text, language, version)
+    if result is None:
+        result = _clean_text(text, language, version)
+        frontend_cache.put(text, language, version, result)
+    return result
+
+
+def _clean_text(text, language, version):
     if version == "v1":
         symbols = symbols_v1.symbols
         language_module_map = {"zh": "chinese", "ja": "japanese", "en": "english"}
@@ -33,7 +63,7 @@ def clean_text(text, language, version=None):
     for special_s, special_l, target_symbol in special:
         if special_s in text and language == special_l:
             return clean_special(text, language, special_s, target_symbol, version)
-    language_module = __import__("text."+language_module_map[language],fromlist=[language_module_map[language]])
+    language_module = get_language_module(language_module_map[language])
     if hasattr(language_module,"text_normalize"):
         norm_text = language_module.text_normalize(text)
     else:
@@ -69,7 +99,7 @@ def clean_special(text, language, special_s, target_symbol, version=None):
     特殊静音段sp符号处理
     """
     text = text.replace(special_s, ",")
-    language_module = __import__("text."+language_module_map[language],fromlist=[language_module_map[language]])
+    language_module = get_language_module(language_module_map[language])
     norm_text = language_module.text_normalize(text)
     phones = language_module.g2p(norm_text)
     new_ph = []
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+current_file_path = os.path.dirname(__file__)
+
+# 参与版本号计算的文件: 词典 / 用户词典 / 多音字表以及前端代码本身
+_VERSIONED_EXTS = {".py", ".rep", ".txt", ".csv", ".pickle"}
+
+
+def frontend_version(root=current_file_path):
+    """对 text 目录下的词典和代码做内容哈希, 任何一个改动都会得到新的版本号"""
+    h = hashlib.sha1()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1] not in _VERSIONED_EXTS:
+                continue
+            path = os.path.join(dirpath, name)
+            h.update(os.path.relpath(path, root).encode("utf-8"))
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+    return h.hexdigest()[:16]
+
+
+class FrontendCache:
+    """
+    clean_text 结果缓存: (text, language, version) -> (phones, word2ph, norm_text).
+    内存里是有上限的 LRU, 可选 sqlite 落盘, 重启后仍然有效; 键里带前端版本号, 词典变化后旧结果自动失效.
+    """
+
+    def __init__(self, max_items=4096, db_path=None):
+        self.max_items = max_items
+        self.db_path = db_path
+        self.version = frontend_version()
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS frontend (key TEXT PRIMARY KEY, version TEXT, value TEXT)"
+            )
+            # 丢掉旧版本词典生成的结果
+            self._db.execute("DELETE FROM frontend WHERE version != ?", (self.version,))
+            self._db.commit()
+
+    def after_fork(self):
+        """sqlite 连接不能跨 fork 使用, 子进程里重新打开"""
+        if self.db_path:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def _key(self, text, language, version):
+        return json.dumps([self.version, text, language, version], ensure_ascii=False)
+
+    def get(self, text, language, version):
+        key = self._key(text, language, version)
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return _copy(value)
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM frontend WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = tuple(json.loads(row[0]))
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                    return _copy(value)
+            self.misses += 1
+            return None
+
+    def put(self, text, language, version, value):
+        key = self._key(text, language, version)
+        value = _copy(value)
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO frontend (key, version, value) VALUES (?, ?, ?)",
+                    (key, self.version, json.dumps(value, ensure_ascii=False)),
+                )
+                self._db.commit()
+
+    def _remember(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self._data),
+                "max_items": self.max_items,
+                "db_path": self.db_path,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+def _copy(value):
+    # 调用方可能原地修改列表, 缓存里只保存副本
+    phones, word2ph, norm_text = value
+    return list(phones), None if word2ph is None else list(word2ph), norm_text
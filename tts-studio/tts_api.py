@@ -19,11 +19,49 @@
 `-fp` - `覆盖 config.py 使用全精度`
 `-hp` - `覆盖 config.py 使用半精度`
 `-sm` - `流式返回模式, 默认不启用, "close","c", "normal","n", "keepalive","k"`
-·-mt` - `返回的音频编码格式, 流式默认ogg, 非流式默认wav, "wav", "ogg", "aac"`
+·-mt` - `返回的音频编码格式, 流式默认ogg, 非流式默认wav, "wav", "ogg", "opus", "aac", "raw"(单声道16位小端PCM, 采样率同模型)`
+`-eb` - `编码后端, "auto" 时 ogg(vorbis) 在进程内编码, opus / aac 每个响应一个 ffmpeg 管道; "ffmpeg" 时 ogg 也走 ffmpeg`
 ·-cp` - `文本切分符号设定, 默认为空, 以",.，。"字符串的方式传入`
 
 `-hb` - `cnhubert路径`
 `-b` - `bert路径`
+`-pc` - `参考音频特征缓存上限(MB), 默认256, 0为关闭`
+`-bc` - `分段BERT特征缓存上限(MB), 默认64, 0为关闭`
+`-fc` - `文本前端(clean_text)结果缓存条数, 默认4096, 0为关闭`
+`-fcd` - `文本前端缓存的 sqlite 文件路径, 默认为空不落盘`
+`-ac` - `合成结果缓存目录, 默认为空关闭. 只缓存带 seed 的请求, 键为 (切分后的文本, 语种, 参考音频, 模型文件, 采样参数, seed, 编码格式, 解码方式),
+        命中时不经过任何模型, 直接返回存下的编码后音频; 多进程模式下各 worker 共用目录`
+`-acm` - `合成结果缓存上限(MB), 默认512, 超出时删除最久未用的条目`
+`-vb` - `VITS (/vits-tts/) 一次 infer 合成的句数, 默认4. 文本按句切分, 第一句单独合成以尽快返回首段音频, 之后各句补齐长度成批合成;
+        VITS 推理在专用线程里执行, 不阻塞事件循环, 并发请求的批次在该线程排队`
+`-cv` - `把 voices_config.json 中的每个语音编译成语音包 (见下文"语音包") 后退出, 不启动服务`
+`-e` - `T2S与SoVITS解码的推理引擎, "torch","onnx", 默认torch`
+`-od` - `ONNX模型目录, 由 python -m inference.onnx_export 导出, 导出的权重与当前GPT/SoVITS不一致时自动使用torch`
+`-ot` - `onnxruntime 线程数, 默认0由onnxruntime决定`
+`-s` / `-g` 也可以指定 `python -m inference.weights 模型.pth` 转换得到的 .safetensors 文件, 逐个张量从 mmap 读出后直接拷进模型参数并释放 (不反序列化 pickle, 跳过训练期张量), 加载更快, 内存峰值约为模型本身加一个张量
+`-mp` - `常驻模型池内存上限(MB), 超出时按LRU淘汰未在使用的模型, 默认0只保留当前模型`
+`-pw` - `启动后预热的组件, 逗号分隔, 可选 bert,hubert,langsegment,zh,en,ja,ko,yue,vits, "all" 为全部; 未预热的组件在第一次用到时才加载, 默认为空`
+`-pwb` - `预热完成后才开始接受请求, 默认在后台预热`
+`-mx` - `记录延迟和吞吐指标 (参考音频 / 前端 / BERT / T2S / 声码器 / 编码各阶段耗时直方图, token 数, 音频时长, 实时率, 排队耗时, 缓存命中率),
+        以 Prometheus 文本格式从 /metrics 导出; 默认关闭, 关闭时不做任何计时`
+`-stm` - `非流式响应带 Server-Timing 头 (各阶段毫秒数), 隐含开启指标记录; 流式响应发送时阶段尚未结束, 不带此头`
+`-w` - `worker 进程数, 默认1. 大于1时主进程加载模型 (以及 BERT / HuBERT / 预热组件) 后 fork 出 worker, 共用同一个监听端口,
+       模型权重在各 worker 间只读共享, 内存只占一份; 默认参考音频切换对所有 worker 生效. 多进程模式下 /set_model 返回 400:
+       各 worker 各自加载新模型会让内存变成 N 份, 换模型请用新的 -s / -g 重启服务; 仅 CPU 推理, 需要 fork (Linux / macOS)`
+`-wt` - `多进程模式下每个 worker 的 torch 线程数, 默认0为 CPU 核数 / worker 数`
+`-q` - `"int8" 时对 T2S / BERT / HuBERT 的线性层做 int8 动态量化, 仅 CPU 推理有效, 默认"none"`
+`-skv` - `T2S解码使用预分配的定长kv缓存, 避免逐token拼接`
+`-fs` - `逐句T2S解码用融合的 top-k 采样 (计数张量做重复惩罚) 并每8步才同步一次 EOS 判断; 同一 seed 得到的 token 与默认采样不同,
+        只作用于逐句解码, -bs / -cb / -stc 仍用默认采样`
+`-bs` - `多句T2S批量解码的句数, 默认1(逐句); 流式模式下较大的值会推迟首段音频`
+`-stc` - `token级流式, 每N个semantic token解码一段音频(带重叠窗口和crossfade), 默认0关闭, 仅在 -sm normal 下生效`
+`-pl` - `句子级流水线(前端/T2S/声码器/编码各一个线程)的阶段间队列长度, 默认0关闭, 开启时忽略 -bs`
+`-tb` - `长文本切块的音素预算, 默认0关闭. 开启时每行文本 (cut_punc 切分后) 按前端给出的音素数装进不超过预算的块,
+        优先在标点处切, 其次在中英文交界处, 同一行内的块间用 30ms crossfade 拼接, 行与行之间仍补 0.3s 静音 (-stc 的 token 级流式块间也补静音);
+        块长有上限, 长文本的耗时随长度线性增长, 也不会被 early stop 截断. 中文每字约2个音素, 建议 60~100`
+`-tp` - `切块后同时合成 (T2S + 声码器) 的块数, 默认1逐块; 开启 -cb / -pl 时由连续批处理 / 流水线并行, 忽略此项`
+`-cb` - `开启跨请求的T2S连续批处理, 所有请求的句子共享解码batch`
+`-mbs` - `连续批处理的最大并发序列数, 默认8`
 
 ## 调用:
 
@@ -94,6 +132,50 @@ RESP:
 成功: 直接返回 wav 音频流， http code 200
 失败: 返回包含错误信息的 json, http code 400
 
+请求可以带 "seed" (整数): 各句的采样和声码器噪声固定, 相同参数、相同服务端设置下的请求得到相同的音频 (ONNX 引擎除外);
+批量解码 (-bs) / 连续批处理 (-cb) / 定长kv缓存 (-skv) 的数值误差可能让同一 seed 采到不同的 token, 融合采样 (-fs) 消耗随机数的方式不同,
+这些设置不同时结果不保证一致.
+开启 -ac 时结果写入合成结果缓存, 之后的相同请求直接返回缓存. 不带 seed 的请求每次重新合成, 也不写入缓存.
+
+请求可以带 "request_id" (或 X-Request-ID 请求头), 不带时服务端生成, 通过响应头 X-Request-ID 返回.
+客户端断开连接时推理自动停止.
+
+### 取消推理
+
+endpoint: `/cancel/{request_id}`
+
+GET / POST:
+    `http://127.0.0.1:9880/cancel/abc123`
+
+RESP: json `{"code": 0, "cancelled": true}`, 请求已结束或不存在时 cancelled 为 false.
+正在解码的句子在一步内停止, 剩余句子不再合成, 已发送的音频不受影响.
+
+
+### WebSocket 流式推理
+
+endpoint: `/v1/ws/tts`
+
+客户端在同一个连接上持续推送 LLM 输出的文本增量, 服务端增量切句 (句末标点立即切分, 逗号在片段够长时切分),
+按顺序合成并流式返回, 收文本与合成并行. 客户端消息均为 json:
+
+```json
+{"type": "start", "text_language": "zh", "media_type": "ogg"}
+{"type": "text", "text": "你好，今天"}
+{"type": "flush"}
+{"type": "cancel"}
+{"type": "end"}
+```
+
+start: 可选, 修改本连接的合成参数, 字段同推理端 (refer_wav_path / prompt_text / prompt_language / text_language /
+top_k / top_p / temperature / speed / seed) 以及 media_type ("ogg", "opus", "aac", "raw", "wav", 默认同 -mt), 未指定的用默认参考音频
+text: 文本增量; flush: 把缓冲中剩余的文本作为一句合成; end: flush 后等全部音频发送完毕, 服务端关闭连接
+cancel: 打断 (例如用户插话), 停止当前句子, 丢弃排队的句子和未切出的文本, 回复 `{"type": "cancelled", "seq": 下一句编号}`, 连接继续可用
+
+服务端消息:
+json `{"type": "sentence_start", "seq": 0, "text": "你好，今天天气真不错，"}`
+二进制帧: 前 4 字节为大端序句子编号 seq, 其后为该句的音频数据, 每句是一个独立完整的音频流
+json `{"type": "sentence_end", "seq": 0}`; 出错时 `{"type": "error", "seq": 0, "message": "..."}`; 全部完成后 `{"type": "done"}`
+
 
 ### 更换默认参考音频
 
@@ -116,6 +198,21 @@ RESP:
 成功: json, http code 200
 失败: json, 400
 
+refer_wav_path 也可以是语音包, 此时 prompt_text / prompt_language 可省略, 取语音包里记录的参考文本和语种
+
+
+### 语音包
+
+把参考音频派生出的全部推理条件 (HuBERT 语义 token, 参考文本的音素和 BERT 特征, 参考频谱, 风格向量) 预先算好,
+存成一个 mmap 读取的 `<参考音频名>.voice.safetensors`, 与参考音频放在同一目录. 切换到语音包不经过 ffmpeg / HuBERT / BERT,
+文件头记录了生成时的 SoVITS / HuBERT / BERT / 文本前端版本, 与当前模型不一致的部分在加载时重新计算 (并打印警告).
+
+编译: `python tts_api.py -cv` 编译 voices_config.json 中的全部语音, 或 GET `/compile_voice/{id}` 编译单个语音;
+语音包路径记入该条目的 "pack" 字段. 条目可以加 "aux_paths": ["b.wav", "c.wav"], 这些辅助参考音频与主参考音频一起
+计算风格向量 (取平均), 语义 token 和参考文本仍取自主参考音频.
+
+`/select_voice/{id}` 在语音包存在时加载语音包, 否则使用原始参考音频; 推理端的 refer_wav_path 也可以直接指定语音包.
+
 
 ### 命令控制
 
@@ -136,6 +233,50 @@ POST:
 
 RESP: 无
 
+
+### 切换模型
+
+endpoint: `/set_model`
+
+POST:
+```
+{
+    "gpt_model_path": "GPT_SoVITS/pretrained_models/s1bert25hz-2kh-longer-epoch=68e-step=50232.ckpt",
+    "sovits_model_path": "GPT_SoVITS/pretrained_models/s2G488k.pth",
+    "wait": false
+}
+```
+
+RESP: json, 模型已常驻时立即切换, status 为 "ready"; 否则后台加载, status 为 "loading", 加载完成前仍用当前模型.
+"wait": true 时等待加载完成再返回. 进行中的请求始终使用开始时的模型.
+多进程模式 (-w 大于1) 下不支持切换, 返回 400.
+
+### 缓存统计
+
+endpoint: `/cache_stats`
+
+GET:
+    `http://127.0.0.1:9880/cache_stats`
+
+RESP: json, 包含参考音频特征缓存 / BERT 特征缓存 / 文本前端缓存 / 合成结果缓存 / 模型池的 hits / misses / hit_rate / saved_ms 等
+(合成结果缓存另有 bytes_served, 命中时发送的字节数),
+以及按需加载组件 (lazy) 是否已加载和加载耗时
+
+endpoint: `/scheduler_stats`
+
+RESP: json, 连续批处理的队列深度 / batch 占用率 / 排队耗时, 首段音频耗时 p50/p95, 以及进行中/已取消的请求数
+
+### 指标
+
+endpoint: `/metrics`, 需要 -mx
+
+RESP: Prometheus 文本格式. tts_stage_seconds{stage=refer|frontend|bert|t2s|vocoder|encode|queue_wait},
+tts_request_seconds, tts_ttfa_seconds, tts_t2s_tokens_per_second, tts_real_time_factor (直方图),
+tts_requests_total{status} (status=cached 为合成结果缓存命中), tts_semantic_tokens_total, tts_audio_seconds_total,
+tts_cache_hits / misses / hit_rate{cache}, tts_audio_cache_bytes_served 等.
+tts_event_loop_lag_seconds 为事件循环每 50ms 一次的探测比预定晚醒的时长, 同步代码占住事件循环时升高.
+多进程模式下每个 worker 各自统计, 一次抓取只返回处理该连接的 worker 的数据
+
 """
 
 
@@ -148,39 +289,84 @@ sys.path.append(now_dir)
 sys.path.append("%s/GPT_SoVITS" % (now_dir))
 
 import signal
-from vendor.LangSegment import LangSegment
+import asyncio
 from time import time as ttime
 from fastapi.middleware.cors import CORSMiddleware
 import torch
-import librosa
-import soundfile as sf
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi import FastAPI, Request, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse, JSONResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 import uvicorn
-from transformers import AutoModelForMaskedLM, AutoTokenizer
 import numpy as np
-from feature_extractor import cnhubert
-from io import BytesIO
 from module.models import SynthesizerTrn
 from AR.models.t2s_lightning_module import Text2SemanticLightningModule
+from AR.models.t2s_quantized import QuantizedT2STransformer, packed_nbytes, quantize_t2s_model, quantize_linear_layers
 from text import cleaned_text_to_sequence
-from text.cleaner import clean_text
-from module.mel_processing import spectrogram_torch
-from tools.my_utils import load_audio
+from text.cleaner import clean_text, get_language_module, set_frontend_cache
+from text.frontend_cache import FrontendCache, frontend_version
+from inference.prompt_cache import LRUCache, file_identity
+from inference.audio_cache import AudioCache
+from inference.t2s_scheduler import T2SJob, T2SScheduler
+from inference.stream_vocoder import StreamingVocoder
+from inference.pipeline import StagedPipeline
+from inference.model_pool import ModelPool
+from inference.weights import load_checkpoint, load_weights, weights_identity
+from inference.voice_pack import ACOUSTIC_STAMPS, SPEC_STAMPS, TEXT_STAMPS, VoicePack, is_voice_pack, read_meta, save_voice_pack, voice_pack_path
+from inference.lazy import LazyRegistry
+from inference.audio_encoder import MEDIA_TYPES, open_encoder
+from inference.text_segmenter import IncrementalSegmenter
+from inference.long_text import ChunkJoiner, PaddingJoiner, split_by_budget
+from inference.cancellation import Cancelled, CancelToken, RequestRegistry
+from inference.shared_state import SharedState
+from inference.metrics import Metrics, NULL_TIMER
+from inference import prefork
 import config as global_config
 import logging
-import subprocess
 import json
+import itertools
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 
 class DefaultRefer:
-    def __init__(self, path, text, language):
-        self.path = args.default_refer_path
-        self.text = args.default_refer_text
-        self.language = args.default_refer_language
+    """默认参考音频, 存放在多进程共享状态里, /change_refer 对所有 worker 生效"""
+    def __init__(self, state):
+        self.state = state
+
+    def snapshot(self):
+        """(path, text, language), 请求开始时取一次, 之后的修改不影响本次请求"""
+        data = self.state.get()
+        return data["refer_path"], data["refer_text"], data["refer_language"]
+
+    def set(self, path, text, language):
+        self.state.update(refer_path=path, refer_text=text, refer_language=language)
+
+    @property
+    def path(self):
+        return self.snapshot()[0]
+
+    @property
+    def text(self):
+        return self.snapshot()[1]
+
+    @property
+    def language(self):
+        return self.snapshot()[2]
 
     def is_ready(self) -> bool:
-        return is_full(self.path, self.text, self.language)
+        return is_full(*self.snapshot())
+
+
+class PromptState:
+    """参考音频派生出的推理条件, 同一参考音频+文本+模型下可复用"""
+    def __init__(self, prompt_semantic, phones1, bert1, norm_text1, refer, ge):
+        self.prompt_semantic = prompt_semantic
+        self.phones1 = phones1
+        self.bert1 = bert1
+        self.norm_text1 = norm_text1
+        self.refer = refer
+        self.ge = ge
 
 
 def is_empty(*items):  # 任意一项不为空返回False
@@ -197,9 +383,9 @@ def is_full(*items):  # 任意一项为空返回False
     return True
 
 
-def change_sovits_weights(sovits_path):
-    global vq_model, hps
-    dict_s2 = torch.load(sovits_path, map_location="cpu", weights_only=False)
+def load_sovits_weights(sovits_path):
+    # 推理只用 extract_latent / decode, 后验编码器 enc_q 只在训练的 forward 里用到: 读取时一律跳过训练期张量, 也不创建 enc_q
+    dict_s2 = load_checkpoint(sovits_path, skip_training_only=True)
     hps = dict_s2["config"]
     hps = DictToAttrRecursive(hps)
     hps.model.semantic_frame_rate = "25hz"
@@ -215,47 +401,106 @@ def change_sovits_weights(sovits_path):
         n_speakers=hps.data.n_speakers,
         **model_params_dict
     )
-    if ("pretrained" not in sovits_path):
-        del vq_model.enc_q
+    del vq_model.enc_q
     if is_half == True:
         vq_model = vq_model.half().to(device)
     else:
         vq_model = vq_model.to(device)
     vq_model.eval()
-    vq_model.load_state_dict(dict_s2["weight"], strict=False)
+    load_weights(vq_model, dict_s2["weight"], strict=False)
+    return vq_model, hps
 
 
-def change_gpt_weights(gpt_path):
-    global hz, max_sec, t2s_model, config
-    hz = 50
-    dict_s1 = torch.load(gpt_path, map_location="cpu")
+def load_gpt_weights(gpt_path):
+    dict_s1 = load_checkpoint(gpt_path)
     config = dict_s1["config"]
-    max_sec = config["data"]["max_sec"]
     t2s_model = Text2SemanticLightningModule(config, "****", is_train=False)
-    t2s_model.load_state_dict(dict_s1["weight"])
+    # 先转换类型和设备再读权重, 张量直接拷进最终的参数里
     if is_half == True:
         t2s_model = t2s_model.half()
     t2s_model = t2s_model.to(device)
+    load_weights(t2s_model, dict_s1["weight"])
     t2s_model.eval()
+    if quantize_int8:
+        quantize_t2s_model(t2s_model.model)
     total = sum([param.nelement() for param in t2s_model.parameters()])
     logger.info("Number of parameter: %.2fM" % (total / 1e6))
+    return t2s_model, config
 
 
-def get_bert_feature(text, word2ph):
-    with torch.no_grad():
-        inputs = tokenizer(text, return_tensors="pt")
+def module_nbytes(module):
+    """
+    参数 + buffer, 再加上 -q int8 量化后的部分: 动态量化 Linear 的打包权重不是参数也不是 buffer,
+    量化版 T2S transformer 不是 nn.Module, 都要单独计入, 否则模型池的内存上限会少算
+    """
+    total = sum(t.element_size() * t.nelement() for t in itertools.chain(module.parameters(), module.buffers()))
+    for sub in module.modules():
+        # 动态量化 Linear 的 _packed_params 是 LinearPackedParams 子模块 (它自己的 _packed_params 是 C++ 对象, 不会重复计入)
+        packed = getattr(sub, "_packed_params", None)
+        if isinstance(packed, torch.nn.Module):
+            total += packed_nbytes(packed)
+        transformer = getattr(sub, "t2s_transformer", None)
+        if isinstance(transformer, QuantizedT2STransformer):
+            total += transformer.nbytes()
+    return total
+
+
+class ModelPair:
+    """一组常驻的 GPT + SoVITS 模型, 每个请求从开始到结束固定使用同一组"""
+
+    def __init__(self, gpt_path, sovits_path):
+        self.gpt_path = gpt_path
+        self.sovits_path = sovits_path
+        self.vq_model, self.hps = load_sovits_weights(sovits_path)
+        self.t2s_model, self.config = load_gpt_weights(gpt_path)
+        self.hz = 50
+        self.max_sec = self.config["data"]["max_sec"]
+        self.version = self.vq_model.version
+        # 当前权重与 ONNX 导出时一致才走 ONNX 引擎
+        self.onnx = onnx_engine if onnx_engine is not None and onnx_engine.matches(gpt_path, sovits_path) else None
+        if onnx_engine is not None and self.onnx is None:
+            logger.warning("ONNX模型与当前GPT/SoVITS权重不一致, 使用torch推理")
+        self.nbytes = module_nbytes(self.vq_model) + module_nbytes(self.t2s_model)
+
+
+def get_bert_features(segments):
+    """
+    segments: [(norm_text, word2ph)], 返回每段 (1024, 音素数) 的 cpu 特征.
+    命中缓存的段跳过 BERT, 其余段 padding 后一次前向.
+    """
+    features = [None] * len(segments)
+    misses = []
+    for i, (text, word2ph) in enumerate(segments):
+        assert len(word2ph) == len(text)
+        if bert_cache.enabled:
+            features[i] = bert_cache.get((text, tuple(word2ph)))
+        if features[i] is None:
+            misses.append(i)
+    if not misses:
+        return features
+
+    tokenizer, bert_model = lazy["bert"].get()
+    t = ttime()
+    with metrics.time("bert"), torch.no_grad():
+        inputs = tokenizer([segments[i][0] for i in misses], return_tensors="pt", padding=True)
+        token_lens = inputs["attention_mask"].sum(dim=1).tolist()
         for i in inputs:
             inputs[i] = inputs[i].to(device)  #####输入是long不用管精度问题，精度随bert_model
         res = bert_model(**inputs, output_hidden_states=True)
-        res = torch.cat(res["hidden_states"][-3:-2], -1)[0].cpu()[1:-1]
-    assert len(word2ph) == len(text)
-    phone_level_feature = []
-    for i in range(len(word2ph)):
-        repeat_feature = res[i].repeat(word2ph[i], 1)
-        phone_level_feature.append(repeat_feature)
-    phone_level_feature = torch.cat(phone_level_feature, dim=0)
-    # if(is_half==True):phone_level_feature=phone_level_feature.half()
-    return phone_level_feature.T
+        res = torch.cat(res["hidden_states"][-3:-2], -1).cpu()
+    cost_ms = (ttime() - t) * 1000 / len(misses)
+    for row, i in enumerate(misses):
+        text, word2ph = segments[i]
+        # 去掉 [CLS] / [SEP] 和 padding, 每个字的特征按 word2ph 重复到音素级
+        char_feature = res[row, 1:token_lens[row] - 1][:len(word2ph)]
+        phone_level_feature = char_feature.repeat_interleave(torch.tensor(word2ph), dim=0)
+        features[i] = phone_level_feature.T
+        bert_cache.put((text, tuple(word2ph)), features[i], cost_ms)
+    return features
+
+
+def get_bert_feature(text, word2ph):
+    return get_bert_features([(text, word2ph)])[0]
 
 
 def clean_text_inf(text, language, version):
@@ -264,20 +509,9 @@ def clean_text_inf(text, language, version):
     return phones, word2ph, norm_text
 
 
-def get_bert_inf(phones, word2ph, norm_text, language):
-    language=language.replace("all_","")
-    if language == "zh":
-        bert = get_bert_feature(norm_text, word2ph).to(device)#.to(dtype)
-    else:
-        bert = torch.zeros(
-            (1024, len(phones)),
-            dtype=torch.float16 if is_half == True else torch.float32,
-        ).to(device)
-
-    return bert
-
-from text import chinese
-def get_phones_and_bert(text,language,version):
+def get_text_segments(text,language,version):
+    """切分语种并做 G2P, 返回 [(phones, word2ph, norm_text, 是否需要BERT)]"""
+    LangSegment = lazy["langsegment"].get()
     if language in {"en", "all_zh", "all_ja", "all_ko", "all_yue"}:
         language = language.replace("all_","")
         if language == "en":
@@ -288,24 +522,16 @@ def get_phones_and_bert(text,language,version):
             formattext = text
         while "  " in formattext:
             formattext = formattext.replace("  ", " ")
-        if language == "zh":
-            if re.search(r'[A-Za-z]', formattext):
-                formattext = re.sub(r'[a-z]', lambda x: x.group(0).upper(), formattext)
-                formattext = chinese.text_normalize(formattext)
-                return get_phones_and_bert(formattext,"zh",version)
-            else:
-                phones, word2ph, norm_text = clean_text_inf(formattext, language, version)
-                bert = get_bert_feature(norm_text, word2ph).to(device)
+        if language == "zh" and re.search(r'[A-Za-z]', formattext):
+            formattext = re.sub(r'[a-z]', lambda x: x.group(0).upper(), formattext)
+            formattext = get_language_module("chinese").text_normalize(formattext)
+            return get_text_segments(formattext,"zh",version)
         elif language == "yue" and re.search(r'[A-Za-z]', formattext):
-                formattext = re.sub(r'[a-z]', lambda x: x.group(0).upper(), formattext)
-                formattext = chinese.text_normalize(formattext)
-                return get_phones_and_bert(formattext,"yue",version)
-        else:
-            phones, word2ph, norm_text = clean_text_inf(formattext, language, version)
-            bert = torch.zeros(
-                (1024, len(phones)),
-                dtype=torch.float16 if is_half == True else torch.float32,
-            ).to(device)
+            formattext = re.sub(r'[a-z]', lambda x: x.group(0).upper(), formattext)
+            formattext = get_language_module("chinese").text_normalize(formattext)
+            return get_text_segments(formattext,"yue",version)
+        phones, word2ph, norm_text = clean_text_inf(formattext, language, version)
+        return [(phones, word2ph, norm_text, language == "zh")]
     elif language in {"zh", "ja", "ko", "yue", "auto", "auto_yue"}:
         textlist=[]
         langlist=[]
@@ -328,21 +554,44 @@ def get_phones_and_bert(text,language,version):
                     # 因无法区别中日韩文汉字,以用户输入为准
                     langlist.append(language)
                 textlist.append(tmp["text"])
-        phones_list = []
-        bert_list = []
-        norm_text_list = []
+        segments = []
         for i in range(len(textlist)):
             lang = langlist[i]
             phones, word2ph, norm_text = clean_text_inf(textlist[i], lang, version)
-            bert = get_bert_inf(phones, word2ph, norm_text, lang)
-            phones_list.append(phones)
-            norm_text_list.append(norm_text)
-            bert_list.append(bert)
+            segments.append((phones, word2ph, norm_text, lang.replace("all_","") == "zh"))
+        return segments
+    raise ValueError(f"不支持的语言: {language}")
+
+
+def get_phones_and_bert_batch(texts,language,version,segments=None):
+    """
+    多句一起做前端: 所有句子里的中文段合并为一次 BERT 前向.
+    segments: {文本: get_text_segments 的结果}, 切块时已经做过 G2P 的块直接用, 不再重新切分语种和 G2P
+    """
+    segments_list = [
+        segments[text] if segments and text in segments else get_text_segments(text, language, version)
+        for text in texts
+    ]
+    bert_inputs = [(norm_text, word2ph) for segments in segments_list for _, word2ph, norm_text, need_bert in segments if need_bert]
+    bert_outputs = iter(get_bert_features(bert_inputs))
+    dtype = torch.float16 if is_half == True else torch.float32
+    results = []
+    for segments in segments_list:
+        bert_list = []
+        for phones, word2ph, norm_text, need_bert in segments:
+            if need_bert:
+                bert_list.append(next(bert_outputs).to(device))
+            else:
+                bert_list.append(torch.zeros((1024, len(phones)), dtype=dtype).to(device))
         bert = torch.cat(bert_list, dim=1)
-        phones = sum(phones_list, [])
-        norm_text = ''.join(norm_text_list)
+        phones = sum([segment[0] for segment in segments], [])
+        norm_text = ''.join(segment[2] for segment in segments)
+        results.append((phones, bert.to(dtype), norm_text))
+    return results
 
-    return phones,bert.to(torch.float16 if is_half == True else torch.float32),norm_text
+
+def get_phones_and_bert(text,language,version,segments=None):
+    return get_phones_and_bert_batch([text], language, version, segments)[0]
 
 
 class DictToAttrRecursive(dict):
@@ -374,7 +623,16 @@ class DictToAttrRecursive(dict):
 
 
 def get_spepc(hps, filename):
+    # tools.my_utils 会导入 gradio / pandas / ffmpeg, 只在从音频文件提取频谱时才导入
+    from tools.my_utils import load_audio
     audio = load_audio(filename, int(hps.data.sampling_rate))
+    return spectrogram_of(hps, audio)
+
+
+def spectrogram_of(hps, audio):
+    """模型采样率下的波形 -> 参考频谱"""
+    # mel_processing 在模块顶层导入 librosa
+    from module.mel_processing import spectrogram_torch
     audio = torch.FloatTensor(audio)
     audio_norm = audio
     audio_norm = audio_norm.unsqueeze(0)
@@ -383,102 +641,8 @@ def get_spepc(hps, filename):
     return spec
 
 
-def pack_audio(audio_bytes, data, rate):
-    if media_type == "ogg":
-        audio_bytes = pack_ogg(audio_bytes, data, rate)
-    elif media_type == "aac":
-        audio_bytes = pack_aac(audio_bytes, data, rate)
-    else:
-        # wav无法流式, 先暂存raw
-        audio_bytes = pack_raw(audio_bytes, data, rate)
-
-    return audio_bytes
-
-
-def pack_ogg(audio_bytes, data, rate):
-    # Author: AkagawaTsurunaki
-    # Issue:
-    #   Stack overflow probabilistically occurs
-    #   when the function `sf_writef_short` of `libsndfile_64bit.dll` is called
-    #   using the Python library `soundfile`
-    # Note:
-    #   This is an issue related to `libsndfile`, not this project itself.
-    #   It happens when you generate a large audio tensor (about 499804 frames in my PC)
-    #   and try to convert it to an ogg file.
-    # Related:
-    #   https://github.com/RVC-Boss/GPT-SoVITS/issues/1199
-    #   https://github.com/libsndfile/libsndfile/issues/1023
-    #   https://github.com/bastibe/python-soundfile/issues/396
-    # Suggestion:
-    #   Or split the whole audio data into smaller audio segment to avoid stack overflow?
-
-    def handle_pack_ogg():
-        with sf.SoundFile(audio_bytes, mode='w', samplerate=rate, channels=1, format='ogg') as audio_file:
-            audio_file.write(data)
-
-    import threading
-    # See: https://docs.python.org/3/library/threading.html
-    # The stack size of this thread is at least 32768
-    # If stack overflow error still occurs, just modify the `stack_size`.
-    # stack_size = n * 4096, where n should be a positive integer.
-    # Here we chose n = 4096.
-    stack_size = 4096 * 4096
-    try:
-        threading.stack_size(stack_size)
-        pack_ogg_thread = threading.Thread(target=handle_pack_ogg)
-        pack_ogg_thread.start()
-        pack_ogg_thread.join()
-    except RuntimeError as e:
-        # If changing the thread stack size is unsupported, a RuntimeError is raised.
-        print("RuntimeError: {}".format(e))
-        print("Changing the thread stack size is unsupported.")
-    except ValueError as e:
-        # If the specified stack size is invalid, a ValueError is raised and the stack size is unmodified.
-        print("ValueError: {}".format(e))
-        print("The specified stack size is invalid.")
-
-    return audio_bytes
-
-
-def pack_raw(audio_bytes, data, rate):
-    audio_bytes.write(data.tobytes())
-
-    return audio_bytes
-
-
-def pack_wav(audio_bytes, rate):
-    data = np.frombuffer(audio_bytes.getvalue(),dtype=np.int16)
-    wav_bytes = BytesIO()
-    sf.write(wav_bytes, data, rate, format='wav')
-
-    return wav_bytes
-
-
-def pack_aac(audio_bytes, data, rate):
-    process = subprocess.Popen([
-        'ffmpeg',
-        '-f', 's16le',  # 输入16位有符号小端整数PCM
-        '-ar', str(rate),  # 设置采样率
-        '-ac', '1',  # 单声道
-        '-i', 'pipe:0',  # 从管道读取输入
-        '-c:a', 'aac',  # 音频编码器为AAC
-        '-b:a', '192k',  # 比特率
-        '-vn',  # 不包含视频
-        '-f', 'adts',  # 输出AAC数据流格式
-        'pipe:1'  # 将输出写入管道
-    ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    out, _ = process.communicate(input=data.tobytes())
-    audio_bytes.write(out)
-
-    return audio_bytes
-
-
-def read_clean_buffer(audio_bytes):
-    audio_chunk = audio_bytes.getvalue()
-    audio_bytes.truncate(0)
-    audio_bytes.seek(0)
-
-    return audio_bytes, audio_chunk
+def to_pcm16(audio):
+    return (audio * 32768).astype(np.int16)
 
 
 def cut_text(text, punc):
@@ -503,107 +667,654 @@ def only_punc(text):
     return not any(t.isalnum() or t.isalpha() for t in text)
 
 
-def get_tts_wav(ref_wav_path, prompt_text, prompt_language, text, text_language, top_k= 20, top_p = 0.6, temperature = 0.6, speed = 1):
-    t0 = ttime()
-    prompt_text = prompt_text.strip("\n")
-    prompt_language, text = prompt_language, text.strip("\n")
-    zero_wav = np.zeros(int(hps.data.sampling_rate * 0.3), dtype=np.float16 if is_half == True else np.float32)
+def to_device(tensor):
+    """按 -fp / -hp 转成半精度并放到推理设备上"""
+    return tensor.half().to(device) if is_half == True else tensor.to(device)
+
+
+def load_wav16k(models, ref_wav_path):
+    """参考音频重采样到 16k, 末尾补 0.3s 静音, HuBERT 的输入"""
+    import librosa
+    wav16k, sr = librosa.load(ref_wav_path, sr=16000)
+    zero_wav = np.zeros(int(models.hps.data.sampling_rate * 0.3), dtype=np.float32)
+    return torch.cat([torch.from_numpy(wav16k), torch.from_numpy(zero_wav)])
+
+
+def extract_prompt_semantic(models, wav16k):
+    ssl_model = lazy["hubert"].get()
     with torch.no_grad():
-        wav16k, sr = librosa.load(ref_wav_path, sr=16000)
-        wav16k = torch.from_numpy(wav16k)
-        zero_wav_torch = torch.from_numpy(zero_wav)
-        if (is_half == True):
-            wav16k = wav16k.half().to(device)
-            zero_wav_torch = zero_wav_torch.half().to(device)
-        else:
-            wav16k = wav16k.to(device)
-            zero_wav_torch = zero_wav_torch.to(device)
-        wav16k = torch.cat([wav16k, zero_wav_torch])
-        ssl_content = ssl_model.model(wav16k.unsqueeze(0))["last_hidden_state"].transpose(1, 2)  # .float()
-        codes = vq_model.extract_latent(ssl_content)
-        prompt_semantic = codes[0, 0]
-    t1 = ttime()
-    version = vq_model.version
-    os.environ['version'] = version
-    prompt_language = dict_language[prompt_language.lower()]
-    text_language = dict_language[text_language.lower()]
+        ssl_content = ssl_model.model(to_device(wav16k).unsqueeze(0))["last_hidden_state"].transpose(1, 2)  # .float()
+        codes = models.vq_model.extract_latent(ssl_content)
+    return codes[0, 0]
+
+
+def voice_stamps(models):
+    """语音包里各部分依赖的模型身份, 与生成时不一致的部分加载时重新计算"""
+    data = models.hps.data
+    return {
+        "sovits": weights_identity(models.sovits_path),
+        "hubert": os.path.basename(os.path.normpath(cnhubert_base_path)),
+        "bert": os.path.basename(os.path.normpath(bert_path)),
+        "frontend": current_frontend_version(),
+        "version": models.vq_model.version,
+        "spec": [data.filter_length, data.sampling_rate, data.hop_length, data.win_length],
+    }
+
+
+def current_frontend_version():
+    global _frontend_version
+    if _frontend_version is None:
+        _frontend_version = frontend_cache.version if frontend_cache is not None else frontend_version()
+    return _frontend_version
+
+
+_frontend_version = None
+
+
+def compute_prompt_state(models, ref_wav_paths, prompt_text, prompt_language, version):
+    """
+    从参考音频计算推理条件. ref_wav_paths 的第一个为主参考音频 (HuBERT 语义 token 取自它),
+    其余只参与风格向量: 各自的频谱都交给 get_ge 取平均. 返回 (PromptState, 主参考音频的16k波形)
+    """
+    wav16k = load_wav16k(models, ref_wav_paths[0])
+    prompt_semantic = extract_prompt_semantic(models, wav16k)
     phones1, bert1, norm_text1 = get_phones_and_bert(prompt_text, prompt_language, version)
-    texts = text.split("\n")
-    audio_bytes = BytesIO()
+    refers = [to_device(get_spepc(models.hps, path)) for path in ref_wav_paths]
+    refer = refers if len(refers) > 1 else refers[0]
+    # 参考音频条件阶段: 频谱和 ref_enc 风格向量每个参考音频只算一次, 逐句解码直接复用
+    with torch.no_grad():
+        ge = models.vq_model.get_ge(refer)
+    return PromptState(prompt_semantic, phones1, bert1, norm_text1, refer, ge), wav16k
 
-    for text in texts:
-        # 简单防止纯符号引发参考音频泄露
-        if only_punc(text):
-            continue
-
-        audio_opt = []
-        phones2, bert2, norm_text2 = get_phones_and_bert(text, text_language, version)
-        bert = torch.cat([bert1, bert2], 1)
-
-        all_phoneme_ids = torch.LongTensor(phones1 + phones2).to(device).unsqueeze(0)
-        bert = bert.to(device).unsqueeze(0)
-        all_phoneme_len = torch.tensor([all_phoneme_ids.shape[-1]]).to(device)
-        prompt = prompt_semantic.unsqueeze(0).to(device)
-        t2 = ttime()
+
+def prompt_state_from_pack(models, path, prompt_text, prompt_language, version):
+    """
+    从语音包读取推理条件, 不经过 ffmpeg / HuBERT / BERT.
+    SoVITS / HuBERT 与生成时不同则用包里的16k波形重算语义 token 和风格向量; BERT / 前端 / 模型版本不同或参考文本不同则重算音素和BERT特征;
+    频谱参数不同时用包里原采样率的波形重采样 (librosa, 不经过 ffmpeg) 后重算频谱; 没有存波形的旧版语音包退回到读取原始参考音频
+    """
+    pack = VoicePack(path)
+    stamps = voice_stamps(models)
+    if pack.matches(stamps, SPEC_STAMPS):
+        refers = [to_device(refer) for refer in pack.refers]
+    elif pack.has_sources:
+        import librosa
+        logger.warning(f"语音包 {path} 的频谱参数与当前模型不同, 用包里的波形重算参考频谱")
+        sampling_rate = int(models.hps.data.sampling_rate)
+        refers = [
+            to_device(spectrogram_of(models.hps, librosa.resample(waveform.numpy(), orig_sr=rate, target_sr=sampling_rate)))
+            for waveform, rate in pack.sources()
+        ]
+    else:
+        logger.warning(f"语音包 {path} 的频谱参数与当前模型不同且没有存波形, 改用原始参考音频 {pack.meta['paths']} (需要 ffmpeg)")
+        return compute_prompt_state(models, pack.meta["paths"], prompt_text, prompt_language, version)[0]
+
+    refer = refers if len(refers) > 1 else refers[0]
+    if pack.matches(stamps, ACOUSTIC_STAMPS + SPEC_STAMPS):
+        prompt_semantic = pack.tensors["prompt_semantic"].to(device)
+        ge = to_device(pack.tensors["ge"])
+    else:
+        logger.warning(f"语音包 {path} 生成时的 SoVITS / HuBERT 与当前不同, 重新计算语义 token 和风格向量")
+        prompt_semantic = extract_prompt_semantic(models, pack.tensors["wav16k"])
         with torch.no_grad():
-            # pred_semantic = t2s_model.model.infer(
-            pred_semantic, idx = t2s_model.model.infer_panel(
+            ge = models.vq_model.get_ge(refer)
+
+    same_text = prompt_text == pack.prompt_text and prompt_language == dict_language[pack.prompt_language.lower()]
+    if same_text and pack.matches(stamps, TEXT_STAMPS):
+        bert_dtype = torch.float16 if is_half == True else torch.float32
+        phones1, bert1, norm_text1 = pack.phones, pack.tensors["bert"].to(device, bert_dtype), pack.meta["norm_text"]
+    else:
+        if same_text:
+            logger.warning(f"语音包 {path} 生成时的 BERT / 文本前端与当前不同, 重新计算参考文本特征")
+        phones1, bert1, norm_text1 = get_phones_and_bert(prompt_text, prompt_language, version)
+    return PromptState(prompt_semantic, phones1, bert1, norm_text1, refer, ge)
+
+
+def get_prompt_state(models, ref_wav_path, prompt_text, prompt_language, version):
+    """
+    提取参考音频的 prompt_semantic / phones1 / bert1 / 参考频谱, ref_wav_path 也可以是语音包.
+    结果按 (参考音频身份, 文本, 语种, 模型身份, 精度) 缓存, 命中时跳过 HuBERT 和 BERT.
+    """
+    key = (
+        file_identity(ref_wav_path), prompt_text, prompt_language,
+        file_identity(models.sovits_path), file_identity(models.gpt_path), is_half, device,
+    )
+    state = prompt_cache.get(key)
+    if state is not None:
+        return state
+
+    t = ttime()
+    if is_voice_pack(ref_wav_path):
+        state = prompt_state_from_pack(models, ref_wav_path, prompt_text, prompt_language, version)
+    else:
+        state = compute_prompt_state(models, [ref_wav_path], prompt_text, prompt_language, version)[0]
+    prompt_cache.put(key, state, (ttime() - t) * 1000)
+    return state
+
+
+def compile_voice(path, text, language, aux_paths=(), output=None):
+    """
+    参考音频 (及可选的辅助参考音频) -> 语音包, 返回语音包路径. 默认写在参考音频旁边, 文件名为 <音频名>.voice.safetensors
+    """
+    key, models = model_pool.acquire()
+    try:
+        paths = [path] + list(aux_paths)
+        prompt_text = text.strip("\n")
+        state, wav16k = compute_prompt_state(models, paths, prompt_text, dict_language[language.lower()], models.vq_model.version)
+        refers = state.refer if isinstance(state.refer, list) else [state.refer]
+        import librosa
+        sources = [librosa.load(p, sr=None, mono=True) for p in paths]
+        meta = {
+            "prompt_text": prompt_text,
+            "prompt_language": language,
+            "norm_text": state.norm_text1,
+            "paths": paths,
+            "stamps": voice_stamps(models),
+        }
+        return save_voice_pack(output or voice_pack_path(path), state.prompt_semantic, state.phones1, state.bert1,
+                               refers, state.ge, wav16k, meta, sources)
+    finally:
+        model_pool.release(key)
+
+
+def stop_callback(cancel_token):
+    return cancel_token.is_cancelled if cancel_token is not None else None
+
+
+def check_cancelled(cancel_token):
+    if cancel_token is not None:
+        cancel_token.check()
+
+
+def sentence_generator(seed, index, stage):
+    """
+    带 seed 的请求里第 index 句的随机数生成器, stage 0 为 T2S 采样, 1 为声码器噪声.
+    每句每阶段各用一个, 随机数的消耗与各句的执行顺序无关 (流水线 / 多块并行不影响结果);
+    批量解码 / 连续批处理的 logits 有数值误差, 不保证与逐句解码采到相同的 token. seed 为空时返回 None (全局随机状态)
+    """
+    if seed is None:
+        return None
+    return torch.Generator(device=device).manual_seed((int(seed) * 1000003 + index * 2 + stage) % (2 ** 63))
+
+
+def get_semantic_tokens(models, prompt_state, phones2, bert2, top_k, top_p, temperature, cancel_token=None, generator=None):
+    """单句 T2S: 返回 (1, 1, n) 的 semantic token; 请求被取消时在一步解码内抛出 Cancelled"""
+    bert = torch.cat([prompt_state.bert1, bert2], 1)
+    all_phoneme_ids = torch.LongTensor(prompt_state.phones1 + phones2).to(device).unsqueeze(0)
+    bert = bert.to(device).unsqueeze(0)
+    all_phoneme_len = torch.tensor([all_phoneme_ids.shape[-1]]).to(device)
+    prompt = prompt_state.prompt_semantic.unsqueeze(0).to(device)
+    if models.onnx is not None:
+        pred_semantic = models.onnx.infer_panel(
+            all_phoneme_ids.cpu().numpy(), prompt.cpu().numpy(), bert.float().cpu().numpy(), early_stop_num=models.hz * models.max_sec,
+            should_stop=stop_callback(cancel_token))
+        check_cancelled(cancel_token)
+        return torch.from_numpy(pred_semantic).to(device).unsqueeze(0)
+    with torch.no_grad():
+        # pred_semantic = models.t2s_model.model.infer(
+        pred_semantic, idx = models.t2s_model.model.infer_panel(
+            all_phoneme_ids,
+            all_phoneme_len,
+            prompt,
+            bert,
+            # prompt_phone_len=ph_offset,
+            top_k = top_k,
+            top_p = top_p,
+            temperature = temperature,
+            early_stop_num=models.hz * models.max_sec,
+            static_kv_cache=static_kv_cache,
+            should_stop=stop_callback(cancel_token),
+            fused_sampling=fused_sampling,
+            generator=generator)
+    check_cancelled(cancel_token)
+    # print(pred_semantic.shape,idx)
+    return pred_semantic[:, -idx:].unsqueeze(0)  # .unsqueeze(0)#mq要多unsqueeze一次
+
+
+def get_semantic_tokens_batch(models, prompt_state, phones2_list, bert2_list, top_k, top_p, temperature, cancel_token=None, generators=None):
+    """多句共享参考音频的批量 T2S, 返回与输入同序的 (1, 1, n) semantic token 列表"""
+    all_phoneme_ids = [torch.LongTensor(prompt_state.phones1 + phones2).to(device) for phones2 in phones2_list]
+    berts = [torch.cat([prompt_state.bert1, bert2], 1).to(device) for bert2 in bert2_list]
+    prompt = prompt_state.prompt_semantic.unsqueeze(0).to(device)
+    with torch.no_grad():
+        pred_semantic_list = models.t2s_model.model.infer_panel_batch(
+            all_phoneme_ids,
+            prompt,
+            berts,
+            top_k = top_k,
+            top_p = top_p,
+            temperature = temperature,
+            early_stop_num=models.hz * models.max_sec,
+            should_stop=stop_callback(cancel_token),
+            generators=generators)
+    check_cancelled(cancel_token)
+    return [pred_semantic.unsqueeze(0) for pred_semantic in pred_semantic_list]
+
+
+def vocode(models, prompt_state, pred_semantic, phones2, speed, generator=None):
+    if models.onnx is not None and speed == 1:
+        # 导出的解码图不含语速插值, 变速时仍走 torch
+        return models.onnx.decode(pred_semantic.cpu().numpy(), np.array([phones2]), prompt_state.ge.float().cpu().numpy())
+    # audio = models.vq_model.decode(pred_semantic, all_phoneme_ids, refer).detach().cpu().numpy()[0, 0]
+    return models.vq_model.decode(pred_semantic, torch.LongTensor(phones2).to(device).unsqueeze(0),
+                           prompt_state.refer,speed=speed,ge=prompt_state.ge,generator=generator).detach().cpu().numpy()[
+        0, 0]  ###试试重建不带上prompt部分
+
+
+def submit_semantic_job(models, prompt_state, phones2, bert2, top_k, top_p, temperature, cancel_token=None, generator=None):
+    """把单句 T2S 交给连续批处理调度器, 返回 future"""
+    bert = torch.cat([prompt_state.bert1, bert2], 1)
+    all_phoneme_ids = torch.LongTensor(prompt_state.phones1 + phones2).to(device).unsqueeze(0)
+    job = T2SJob(
+        models.t2s_model.model,
+        all_phoneme_ids,
+        prompt_state.prompt_semantic.unsqueeze(0).to(device),
+        bert.to(device).unsqueeze(0),
+        top_k, top_p, temperature,
+        models.hz * models.max_sec,
+        should_stop=stop_callback(cancel_token),
+        generator=generator,
+    )
+    return t2s_scheduler.submit(job)
+
+
+def iter_semantic_tokens(models, prompt_state, texts, text_language, version, top_k, top_p, temperature, cancel_token=None, timer=NULL_TIMER, seed=None, segments=None):
+    """按句子顺序产出 (phones2, pred_semantic); segments 为切块时算好的前端结果, 见 split_texts"""
+    if t2s_scheduler is not None:
+        # 连续批处理: 句子做完前端立即入队, 与其他请求的句子共享解码 batch
+        jobs = []
+        for i, text in enumerate(texts):
+            check_cancelled(cancel_token)
+            with timer.stage("frontend"):
+                phones2, bert2, norm_text2 = get_phones_and_bert(text, text_language, version, segments)
+            generator = sentence_generator(seed, i, 0)
+            jobs.append((phones2, submit_semantic_job(models, prompt_state, phones2, bert2, top_k, top_p, temperature, cancel_token, generator)))
+        for phones2, future in jobs:
+            with timer.stage("t2s"):
+                pred_semantic = future.result().unsqueeze(0)
+            timer.add_tokens(pred_semantic.shape[-1])
+            yield phones2, pred_semantic
+        return
+
+    # t2s_batch_size > 1 时同一批句子一起做 T2S 解码, 之后按原顺序逐句过声码器
+    for batch_start in range(0, len(texts), t2s_batch_size):
+        check_cancelled(cancel_token)
+        batch_texts = texts[batch_start:batch_start + t2s_batch_size]
+        with timer.stage("frontend"):
+            frontend = get_phones_and_bert_batch(batch_texts, text_language, version, segments)
+        phones2_list = [item[0] for item in frontend]
+        bert2_list = [item[1] for item in frontend]
+        generators = [sentence_generator(seed, batch_start + i, 0) for i in range(len(batch_texts))]
+        with timer.stage("t2s"):
+            if len(batch_texts) == 1:
+                pred_semantic_list = [get_semantic_tokens(models, prompt_state, phones2_list[0], bert2_list[0], top_k, top_p, temperature, cancel_token, generators[0])]
+            else:
+                pred_semantic_list = get_semantic_tokens_batch(models, prompt_state, phones2_list, bert2_list, top_k, top_p, temperature, cancel_token, generators)
+        timer.add_tokens(sum(pred_semantic.shape[-1] for pred_semantic in pred_semantic_list))
+        yield from zip(phones2_list, pred_semantic_list)
+
+
+def iter_streaming_audio(models, prompt_state, phones2, bert2, top_k, top_p, temperature, speed, cancel_token=None, timer=NULL_TIMER, seed=None, index=0):
+    """单句边解码 T2S 边出音频: 每 stream_chunk_tokens 个 token 在重叠窗口上跑一次声码器; index 为句子序号"""
+    bert = torch.cat([prompt_state.bert1, bert2], 1)
+    all_phoneme_ids = torch.LongTensor(prompt_state.phones1 + phones2).to(device).unsqueeze(0)
+    bert = bert.to(device).unsqueeze(0)
+    all_phoneme_len = torch.tensor([all_phoneme_ids.shape[-1]]).to(device)
+    prompt = prompt_state.prompt_semantic.unsqueeze(0).to(device)
+    vocoder = StreamingVocoder(
+        models.vq_model, torch.LongTensor(phones2).to(device).unsqueeze(0), prompt_state.refer, prompt_state.ge,
+        speed=speed, chunk_tokens=stream_chunk_tokens, sampling_rate=models.hps.data.sampling_rate,
+        generator=sentence_generator(seed, index, 1),
+    )
+    with torch.no_grad():
+        token_chunks = models.t2s_model.model.infer_panel_stream(
                 all_phoneme_ids,
                 all_phoneme_len,
                 prompt,
                 bert,
-                # prompt_phone_len=ph_offset,
                 top_k = top_k,
                 top_p = top_p,
                 temperature = temperature,
-                early_stop_num=hz * max_sec)
-        t3 = ttime()
-        # print(pred_semantic.shape,idx)
-        pred_semantic = pred_semantic[:, -idx:].unsqueeze(0)  # .unsqueeze(0)#mq要多unsqueeze一次
-        refer = get_spepc(hps, ref_wav_path)  # .to(device)
-        if (is_half == True):
-            refer = refer.half().to(device)
+                early_stop_num=models.hz * models.max_sec,
+                chunk_size=stream_chunk_tokens,
+                static_kv_cache=static_kv_cache,
+                should_stop=stop_callback(cancel_token),
+                generator=sentence_generator(seed, index, 0))
+        while True:
+            with timer.stage("t2s"):
+                tokens = next(token_chunks, None)
+            if tokens is None:
+                break
+            timer.add_tokens(tokens.shape[-1])
+            with timer.stage("vocoder"):
+                audio = vocoder.push(tokens)
+            if audio is not None and len(audio) > 0:
+                yield audio
+        check_cancelled(cancel_token)
+        with timer.stage("vocoder"):
+            audio = vocoder.flush()
+        yield audio
+
+
+def iter_pipelined_chunks(models, prompt_state, texts, line_ends, text_language, version, top_k, top_p, temperature, speed, joiner, encode, cancel_token=None, timer=NULL_TIMER, seed=None, segments=None):
+    """
+    前端 -> T2S -> 声码器 -> 编码 四个阶段各一个线程, 阶段间有界队列.
+    第 N+1 句的 G2P/BERT 和 T2S 与第 N 句的声码器/编码并行, 按句子顺序产出编码后的音频块.
+    line_ends[i] 为第 i 块是否是所在行的最后一块, 决定拼接时补静音还是 crossfade
+    """
+    def frontend(item):
+        i, text = item
+        check_cancelled(cancel_token)
+        with timer.stage("frontend"):
+            phones2, bert2, norm_text2 = get_phones_and_bert(text, text_language, version, segments)
+        return i, phones2, bert2
+
+    def t2s(item):
+        i, phones2, bert2 = item
+        generator = sentence_generator(seed, i, 0)
+        with timer.stage("t2s"):
+            if t2s_scheduler is not None:
+                pred_semantic = submit_semantic_job(models, prompt_state, phones2, bert2, top_k, top_p, temperature, cancel_token, generator).result().unsqueeze(0)
+            else:
+                pred_semantic = get_semantic_tokens(models, prompt_state, phones2, bert2, top_k, top_p, temperature, cancel_token, generator)
+        timer.add_tokens(pred_semantic.shape[-1])
+        return i, phones2, pred_semantic
+
+    def vocoder(item):
+        check_cancelled(cancel_token)
+        i, phones2, pred_semantic = item
+        with timer.stage("vocoder"):
+            audio = vocode(models, prompt_state, pred_semantic, phones2, speed, sentence_generator(seed, i, 1))
+        return joiner.push(audio, line_ends[i])
+
+    pipeline = StagedPipeline(
+        [("frontend", frontend), ("t2s", t2s), ("vocoder", vocoder), ("encode", encode)],
+        maxsize=pipeline_queue_size,
+    )
+    try:
+        yield from pipeline.run(list(enumerate(texts)))
+    finally:
+        logger.info(f"流水线各阶段耗时: {pipeline.report()}")
+
+
+def iter_parallel_chunks(models, prompt_state, texts, text_language, version, top_k, top_p, temperature, speed, cancel_token=None, timer=NULL_TIMER, seed=None, segments=None):
+    """
+    各块独立合成: 最多 chunk_parallel 块同时做 T2S + 声码器, 按顺序产出每块的音频.
+    前端 (含 BERT) 每 chunk_parallel 块批量做一次, 在调用方线程里进行
+    """
+    def synthesize_chunk(i, phones2, bert2):
+        check_cancelled(cancel_token)
+        with timer.stage("t2s"):
+            pred_semantic = get_semantic_tokens(models, prompt_state, phones2, bert2, top_k, top_p, temperature, cancel_token, sentence_generator(seed, i, 0))
+        timer.add_tokens(pred_semantic.shape[-1])
+        check_cancelled(cancel_token)
+        with timer.stage("vocoder"):
+            return vocode(models, prompt_state, pred_semantic, phones2, speed, sentence_generator(seed, i, 1))
+
+    executor = ThreadPoolExecutor(max_workers=chunk_parallel, thread_name_prefix="tts-chunk")
+    pending = deque()
+    try:
+        for start in range(0, len(texts), chunk_parallel):
+            check_cancelled(cancel_token)
+            with timer.stage("frontend"):
+                frontend = get_phones_and_bert_batch(texts[start:start + chunk_parallel], text_language, version, segments)
+            for offset, (phones2, bert2, norm_text2) in enumerate(frontend):
+                pending.append(executor.submit(synthesize_chunk, start + offset, phones2, bert2))
+            # 在途的块超过并发数时先交出最早的一块, 后面的块继续在线程池里合成
+            while len(pending) > chunk_parallel:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def merge_segments(segments):
+    """相邻的中文段合成一段, BERT 仍按块内连续的整段中文取上下文, 而不是逐个小句; 其他语种的段不需要 BERT, 原样保留"""
+    merged = []
+    for segment in segments:
+        if merged and merged[-1][3] and segment[3]:
+            phones, word2ph, norm_text, need_bert = merged[-1]
+            merged[-1] = (phones + segment[0], word2ph + segment[1], norm_text + segment[2], need_bert)
         else:
-            refer = refer.to(device)
-        # audio = vq_model.decode(pred_semantic, all_phoneme_ids, refer).detach().cpu().numpy()[0, 0]
-        audio = \
-            vq_model.decode(pred_semantic, torch.LongTensor(phones2).to(device).unsqueeze(0),
-                            refer,speed=speed).detach().cpu().numpy()[
-                0, 0]  ###试试重建不带上prompt部分
-        audio_opt.append(audio)
-        audio_opt.append(zero_wav)
-        t4 = ttime()
-        audio_bytes = pack_audio(audio_bytes,(np.concatenate(audio_opt, 0) * 32768).astype(np.int16),hps.data.sampling_rate)
-    # logger.info("%.3f\t%.3f\t%.3f\t%.3f" % (t1 - t0, t2 - t1, t3 - t2, t4 - t3))
-        if stream_mode == "normal":
-            audio_bytes, audio_chunk = read_clean_buffer(audio_bytes)
-            yield audio_chunk
-    
-    if not stream_mode == "normal": 
-        if media_type == "wav":
-            audio_bytes = pack_wav(audio_bytes,hps.data.sampling_rate)
-        yield audio_bytes.getvalue()
+            merged.append(segment)
+    return merged
+
+
+def split_texts(texts, language, version):
+    """
+    -tb 开启时把每行文本按音素预算切块; 返回 (块, 各块是否为所在行的最后一块, {块: 前端结果}).
+    计数时每个片段做一次语种切分和 G2P, 结果按块拼接后交给合成, 前端对每个片段只跑一次
+    """
+    if token_budget <= 0:
+        return texts, [True] * len(texts), {}
+    chunks, line_ends, segments = [], [], {}
+    for text in texts:
+        piece_segments = {}
+
+        def count_phones(piece):
+            if piece not in piece_segments:
+                piece_segments[piece] = get_text_segments(piece, language, version)
+            return sum(len(segment[0]) for segment in piece_segments[piece])
+
+        parts = split_by_budget(text, count_phones, token_budget)
+        for i, (chunk, pieces) in enumerate(parts):
+            chunks.append(chunk)
+            line_ends.append(i == len(parts) - 1)
+            # 纯标点 / 空白的片段没有计数, 也不送进前端
+            segments[chunk] = merge_segments([segment for piece in pieces for segment in piece_segments.get(piece, [])])
+    return chunks, line_ends, segments
+
+
+def get_tts_wav(ref_wav_path, prompt_text, prompt_language, text, text_language, top_k= 20, top_p = 0.6, temperature = 0.6, speed = 1, fmt=None, streaming=None, cancel_token=None, timer=None, seed=None):
+    # 固定请求开始时的模型, 期间 /set_model 切换不影响本次合成
+    key, models = model_pool.acquire()
+    try:
+        yield from synthesize(models, ref_wav_path, prompt_text, prompt_language, text, text_language, top_k, top_p, temperature, speed, fmt, streaming, cancel_token, timer, seed)
+    finally:
+        model_pool.release(key)
+
+
+def audio_cache_key(models, ref_wav_path, prompt_text, prompt_language, texts, text_language, top_k, top_p, temperature, speed, seed, fmt, streaming):
+    """
+    合成结果缓存的键: 切分后的句子, 参考音频, 模型文件, 采样参数, seed, 编码格式, 以及影响输出的服务端设置.
+    缓存在磁盘上, 跨重启和 worker 共用, 所以批量解码 / 连续批处理 / 定长kv缓存 / 融合采样这些会改变 token 的解码方式也要算进键里
+    """
+    return AudioCache.make_key(
+        texts=texts, text_language=text_language,
+        refer=file_identity(ref_wav_path), prompt_text=prompt_text, prompt_language=prompt_language,
+        gpt=file_identity(models.gpt_path), sovits=file_identity(models.sovits_path),
+        top_k=top_k, top_p=top_p, temperature=temperature, speed=speed, seed=int(seed),
+        media_type=fmt, streaming=streaming, stream_chunk_tokens=stream_chunk_tokens if streaming else 0, token_budget=token_budget,
+        engine=args.engine, is_half=is_half, int8=quantize_int8, device=device,
+        t2s_batch_size=t2s_batch_size if pipeline_queue_size == 0 else 1, continuous_batching=t2s_scheduler is not None,
+        static_kv_cache=static_kv_cache, fused_sampling=fused_sampling,
+    )
+
+
+def store_audio(cache_key, chunks):
+    try:
+        audio_cache.put(cache_key, b"".join(chunks))
+    except OSError as e:
+        logger.warning(f"写入音频缓存失败: {e}")
+
+
+def iter_cached_audio(data):
+    """缓存命中时直接分块发送存下的编码字节"""
+    for start in range(0, len(data), AUDIO_CACHE_CHUNK):
+        yield data[start:start + AUDIO_CACHE_CHUNK]
+
+
+def synthesize(models, ref_wav_path, prompt_text, prompt_language, text, text_language, top_k, top_p, temperature, speed, fmt=None, streaming=None, cancel_token=None, timer=None, seed=None):
+    """
+    fmt / streaming 为空时使用 -mt / -sm 的设置; cancel_token 被取消后不再产出音频, 正在进行的 T2S 在一步内结束.
+    timer 记录各阶段耗时, 为空时按 -mx 新建 (未开启指标时不做记录).
+    seed 不为空时各句的采样和声码器噪声固定, 开启 -ac 时结果写入音频缓存, 相同请求直接返回缓存的字节
+    """
+    timer = metrics.request() if timer is None else timer
+    fmt = fmt or media_type
+    streaming = stream_mode == "normal" if streaming is None else streaming
+    t0 = ttime()
+    prompt_text = prompt_text.strip("\n")
+    prompt_language, text = prompt_language, text.strip("\n")
+    prompt_language = dict_language[prompt_language.lower()]
+    text_language = dict_language[text_language.lower()]
+    version = models.vq_model.version
+    # 简单防止纯符号引发参考音频泄露
+    texts = [text for text in text.split("\n") if not only_punc(text)]
+
+    cache_key = None
+    if audio_cache is not None and seed is not None:
+        cache_key = audio_cache_key(models, ref_wav_path, prompt_text, prompt_language, texts, text_language,
+                                    top_k, top_p, temperature, speed, seed, fmt, streaming)
+        cached = audio_cache.get(cache_key)
+        if cached is not None:
+            record_ttfa(ttime() - t0)
+            record_request(timer, "cached")
+            yield from iter_cached_audio(cached)
+            return
+
+    texts, line_ends, segments = split_texts(texts, text_language, version)
+    zero_wav = np.zeros(int(models.hps.data.sampling_rate * 0.3), dtype=np.float16 if is_half == True else np.float32)
+    with timer.stage("refer"):
+        prompt_state = get_prompt_state(models, ref_wav_path, prompt_text, prompt_language, version)
+    # 整个响应共用一个编码会话, 输出是一个连续的音频流
+    sampling_rate = models.hps.data.sampling_rate
+    encoder = open_encoder(fmt, sampling_rate, encoder_backend)
+    # 每行 (cut_punc 切分后的句子) 后补 0.3s 静音; 切块后同一行内的块之间用短 crossfade 拼接
+    joiner = ChunkJoiner(int(sampling_rate * CHUNK_CROSSFADE), zero_wav) if token_budget > 0 else PaddingJoiner(zero_wav)
+    first_chunk = True
+    status = "ok"
+
+    def encode(audio):
+        timer.add_audio(len(audio) / sampling_rate)
+        with timer.stage("encode"):
+            return encoder.write(to_pcm16(audio))
+
+    def encoded_chunks():
+        if streaming and stream_chunk_tokens > 0:
+            # token 级流式: 首段音频只需等第一个窗口, 不用等整句解码完
+            for i, text in enumerate(texts):
+                check_cancelled(cancel_token)
+                with timer.stage("frontend"):
+                    phones2, bert2, norm_text2 = get_phones_and_bert(text, text_language, version, segments)
+                for audio in itertools.chain(
+                        iter_streaming_audio(models, prompt_state, phones2, bert2, top_k, top_p, temperature, speed, cancel_token, timer, seed, i), [zero_wav]):
+                    yield encode(audio)
+        elif pipeline_queue_size > 0:
+            yield from iter_pipelined_chunks(models, prompt_state, texts, line_ends, text_language, version, top_k, top_p, temperature, speed, joiner, encode, cancel_token, timer, seed, segments)
+        elif chunk_parallel > 1 and t2s_scheduler is None and len(texts) > 1:
+            chunks = iter_parallel_chunks(models, prompt_state, texts, text_language, version, top_k, top_p, temperature, speed, cancel_token, timer, seed, segments)
+            for i, audio in enumerate(chunks):
+                yield encode(joiner.push(audio, line_ends[i]))
+        else:
+            semantic = iter_semantic_tokens(models, prompt_state, texts, text_language, version, top_k, top_p, temperature, cancel_token, timer, seed, segments)
+            for i, (phones2, pred_semantic) in enumerate(semantic):
+                check_cancelled(cancel_token)
+                with timer.stage("vocoder"):
+                    audio = vocode(models, prompt_state, pred_semantic, phones2, speed, sentence_generator(seed, i, 1))
+                yield encode(joiner.push(audio, line_ends[i]))
+        tail = joiner.flush()
+        if len(tail) > 0:
+            yield encode(tail)
+        with timer.stage("encode"):
+            tail = encoder.close()
+        yield tail
+
+    # 带 seed 且开启缓存时记下发送的字节, 完整合成后写入缓存
+    sent = [] if cache_key is not None else None
+    try:
+        if streaming:
+            for audio_chunk in encoded_chunks():
+                if not audio_chunk:
+                    continue
+                if first_chunk:
+                    record_ttfa(ttime() - t0)
+                    first_chunk = False
+                if sent is not None:
+                    sent.append(audio_chunk)
+                yield audio_chunk
+        else:
+            audio_bytes = b"".join(encoded_chunks())
+            record_ttfa(ttime() - t0)
+            if sent is not None:
+                sent.append(audio_bytes)
+                store_audio(cache_key, sent)
+                sent = None
+            yield audio_bytes
+        if sent is not None:
+            store_audio(cache_key, sent)
+    except Cancelled as e:
+        # 已发送的音频保留, 剩余句子不再合成
+        status = "cancelled"
+        logger.info(f"合成已取消: {e}, 耗时 {(ttime() - t0) * 1000:.0f}ms")
+    except GeneratorExit:
+        # 调用方不再读取 (客户端断开)
+        status = "cancelled"
+        raise
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        # 客户端断开时结束编码进程
+        encoder.abort()
+        record_request(timer, status)
+
+
+def record_ttfa(seconds):
+    ttfa_ms.append(seconds * 1000)
+    if metrics.enabled:
+        ttfa_seconds.observe(seconds)
+
+
+def record_request(timer, status):
+    """请求结束时计入总耗时 / token 数 / 音频时长 / T2S 速度 / 实时率"""
+    if not metrics.enabled:
+        return
+    elapsed = timer.elapsed()
+    requests_total.inc(1, status)
+    request_seconds.observe(elapsed)
+    tokens_total.inc(timer.tokens)
+    audio_seconds_total.inc(timer.audio_seconds)
+    t2s_elapsed = timer.stages.get("t2s", 0.0)
+    if timer.tokens and t2s_elapsed > 0:
+        t2s_tokens_per_second.observe(timer.tokens / t2s_elapsed)
+    if timer.audio_seconds > 0:
+        real_time_factor.observe(elapsed / timer.audio_seconds)
 
 
 
 def handle_control(command):
+    # 多进程模式下由主进程重启 / 结束全部 worker
     if command == "restart":
+        if worker_index is not None:
+            os.kill(os.getppid(), signal.SIGHUP)
+            return
         os.execl(g_config.python_exec, g_config.python_exec, *sys.argv)
     elif command == "exit":
-        os.kill(os.getpid(), signal.SIGTERM)
+        os.kill(os.getppid() if worker_index is not None else os.getpid(), signal.SIGTERM)
         exit(0)
 
 
+def fill_from_pack(path, text, language):
+    """语音包自带参考文本和语种, 未指定时从文件头读取"""
+    if is_voice_pack(path) and (is_empty(text) or is_empty(language)):
+        try:
+            meta = read_meta(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取语音包 {path} 失败: {e}")
+            return text, language
+        text = meta["prompt_text"] if is_empty(text) else text
+        language = meta["prompt_language"] if is_empty(language) else language
+    return text, language
+
+
 def handle_change(path, text, language):
+    text, language = fill_from_pack(path, text, language)
     if is_empty(path, text, language):
         return JSONResponse({"code": 400, "message": '缺少任意一项以下参数: "path", "text", "language"'}, status_code=400)
 
-    if path != "" or path is not None:
-        default_refer.path = path
-    if text != "" or text is not None:
-        default_refer.text = text
-    if language != "" or language is not None:
-        default_refer.language = language
+    default_refer.set(path, text, language)
 
     logger.info(f"当前默认参考音频路径: {default_refer.path}")
     logger.info(f"当前默认参考音频文本: {default_refer.text}")
@@ -614,18 +1325,39 @@ def handle_change(path, text, language):
     return JSONResponse({"code": 0, "message": "Success"}, status_code=200)
 
 
-def handle(refer_wav_path, prompt_text, prompt_language, text, text_language, cut_punc, top_k, top_p, temperature, speed):
+async def cancellable_stream(request, request_id, token, chunks):
+    """在线程池里迭代合成生成器; 客户端断开时取消 token, 正在进行的 T2S 在一步内停止"""
+    async def watch_disconnect():
+        while not token.is_cancelled():
+            if await request.is_disconnected():
+                token.cancel("disconnected")
+                return
+            # 多进程模式下 /cancel 可能落在别的 worker 上, 经共享状态转过来
+            if workers > 1 and request_id in shared_state.get()["cancelled"]:
+                token.cancel("cancelled")
+                return
+            await asyncio.sleep(0.1)
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            yield chunk
+    finally:
+        watcher.cancel()
+        if not token.is_cancelled() and await request.is_disconnected():
+            token.cancel("disconnected")
+        request_registry.unregister(request_id, token)
+
+
+async def handle(request, request_id, refer_wav_path, prompt_text, prompt_language, text, text_language, cut_punc, top_k, top_p, temperature, speed, seed=None):
+    prompt_text, prompt_language = fill_from_pack(refer_wav_path, prompt_text, prompt_language)
     if (
             refer_wav_path == "" or refer_wav_path is None
             or prompt_text == "" or prompt_text is None
             or prompt_language == "" or prompt_language is None
     ):
-        refer_wav_path, prompt_text, prompt_language = (
-            default_refer.path,
-            default_refer.text,
-            default_refer.language,
-        )
-        if not default_refer.is_ready():
+        refer_wav_path, prompt_text, prompt_language = default_refer.snapshot()
+        if not is_full(refer_wav_path, prompt_text, prompt_language):
             return JSONResponse({"code": 400, "message": "未指定参考音频且接口无预设"}, status_code=400)
 
     if cut_punc == None:
@@ -633,7 +1365,22 @@ def handle(refer_wav_path, prompt_text, prompt_language, text, text_language, cu
     else:
         text = cut_text(text,cut_punc)
 
-    return StreamingResponse(get_tts_wav(refer_wav_path, prompt_text, prompt_language, text, text_language, top_k, top_p, temperature, speed), media_type="audio/"+media_type)
+    if seed is not None:
+        try:
+            seed = int(seed)
+        except (TypeError, ValueError):
+            return JSONResponse({"code": 400, "message": "seed 须为整数"}, status_code=400)
+
+    request_id, token = request_registry.register(request_id or request.headers.get("x-request-id"))
+    timer = metrics.request()
+    chunks = get_tts_wav(refer_wav_path, prompt_text, prompt_language, text, text_language, top_k, top_p, temperature, speed, cancel_token=token, timer=timer, seed=seed)
+    stream = cancellable_stream(request, request_id, token, chunks)
+    if server_timing and stream_mode != "normal":
+        # 非流式响应合成完才发送, 响应头里可以带上各阶段耗时
+        body = b"".join([chunk async for chunk in stream])
+        return Response(body, media_type=MEDIA_TYPES[media_type],
+                        headers={"X-Request-ID": request_id, "Server-Timing": timer.server_timing()})
+    return StreamingResponse(stream, media_type=MEDIA_TYPES[media_type], headers={"X-Request-ID": request_id})
 
 
 
@@ -689,11 +1436,40 @@ parser.add_argument("-hp", "--half_precision", action="store_true", default=Fals
 # bool值的用法为 `python ./api.py -fp ...`
 # 此时 full_precision==True, half_precision==False
 parser.add_argument("-sm", "--stream_mode", type=str, default="close", help="流式返回模式, close / normal / keepalive")
-parser.add_argument("-mt", "--media_type", type=str, default="wav", help="音频编码格式, wav / ogg / aac")
+parser.add_argument("-mt", "--media_type", type=str, default="wav", help="音频编码格式, wav / ogg / opus / aac / raw")
+parser.add_argument("-eb", "--encoder_backend", type=str, default="auto", choices=["auto", "ffmpeg"], help="ogg 在进程内编码(auto)还是走 ffmpeg 管道")
 parser.add_argument("-cp", "--cut_punc", type=str, default="", help="文本切分符号设定, 符号范围,.;?!、，。？！；：…")
 # 切割常用分句符为 `python ./api.py -cp ".?!。？！"`
 parser.add_argument("-hb", "--hubert_path", type=str, default=g_config.cnhubert_path, help="覆盖config.cnhubert_path")
 parser.add_argument("-b", "--bert_path", type=str, default=g_config.bert_path, help="覆盖config.bert_path")
+parser.add_argument("-bs", "--batch_size", type=int, default=1, help="多句T2S批量解码的句数, 1为逐句解码")
+parser.add_argument("-stc", "--stream_chunk_tokens", type=int, default=0, help="token级流式: 每N个semantic token解码一段音频, 0为关闭, 需配合-sm normal")
+parser.add_argument("-pl", "--pipeline", type=int, default=0, help="句子级流水线的阶段间队列长度, 0为关闭")
+parser.add_argument("-tb", "--token_budget", type=int, default=0, help="长文本按音素数切块的预算, 0为关闭")
+parser.add_argument("-tp", "--chunk_parallel", type=int, default=1, help="切块后同时合成的块数")
+parser.add_argument("-cb", "--continuous_batching", action="store_true", default=False, help="跨请求连续批处理T2S解码")
+parser.add_argument("-mbs", "--max_batch_size", type=int, default=8, help="连续批处理的最大并发序列数")
+parser.add_argument("-skv", "--static_kv_cache", action="store_true", default=False, help="T2S解码使用预分配的定长kv缓存")
+parser.add_argument("-fs", "--fused_sampling", action="store_true", default=False, help="逐句T2S解码用融合采样并延迟EOS同步")
+parser.add_argument("-pc", "--prompt_cache_mb", type=int, default=256, help="参考音频特征缓存上限(MB), 0为关闭")
+parser.add_argument("-bc", "--bert_cache_mb", type=int, default=64, help="分段BERT特征缓存上限(MB), 0为关闭")
+parser.add_argument("-fc", "--frontend_cache_size", type=int, default=4096, help="文本前端结果缓存条数, 0为关闭")
+parser.add_argument("-fcd", "--frontend_cache_db", type=str, default="", help="文本前端缓存的 sqlite 文件路径, 为空不落盘")
+parser.add_argument("-ac", "--audio_cache_dir", type=str, default="", help="带 seed 的请求的合成结果缓存目录, 为空关闭")
+parser.add_argument("-acm", "--audio_cache_mb", type=int, default=512, help="合成结果缓存上限(MB)")
+parser.add_argument("-cv", "--compile_voices", action="store_true", default=False, help="把 voices_config.json 的全部语音编译成语音包后退出")
+parser.add_argument("-vb", "--vits_batch_size", type=int, default=4, help="VITS 一次 infer 合成的句数")
+parser.add_argument("-e", "--engine", type=str, default="torch", choices=["torch", "onnx"], help="T2S与SoVITS解码的推理引擎")
+parser.add_argument("-od", "--onnx_dir", type=str, default="", help="inference.onnx_export 导出的目录, --engine onnx 时使用")
+parser.add_argument("-mp", "--model_pool_mb", type=int, default=0, help="常驻模型池内存上限(MB), 0为只保留当前模型")
+parser.add_argument("-q", "--quantize", type=str, default="none", choices=["none", "int8"], help="CPU上对T2S/BERT/HuBERT的线性层做int8动态量化")
+parser.add_argument("-ot", "--onnx_threads", type=int, default=0, help="onnxruntime 线程数, 0为默认")
+parser.add_argument("-pw", "--prewarm", type=str, default="", help="启动后预热的组件, 逗号分隔: bert,hubert,langsegment,zh,en,ja,ko,yue,vits 或 all")
+parser.add_argument("-pwb", "--prewarm_blocking", action="store_true", default=False, help="预热完成后才开始接受请求")
+parser.add_argument("-mx", "--metrics", action="store_true", default=False, help="记录各阶段耗时等指标, 通过 /metrics 导出")
+parser.add_argument("-stm", "--server_timing", action="store_true", default=False, help="非流式响应带 Server-Timing 头")
+parser.add_argument("-w", "--workers", type=int, default=1, help="worker 进程数, 大于1时共享主进程加载的模型权重, 仅CPU")
+parser.add_argument("-wt", "--worker_threads", type=int, default=0, help="每个 worker 的 torch 线程数, 0为CPU核数/worker数")
 
 args = parser.parse_args()
 sovits_path = args.sovits_path
@@ -704,9 +1480,25 @@ host = args.bind_addr
 cnhubert_base_path = args.hubert_path
 bert_path = args.bert_path
 default_cut_punc = args.cut_punc
-
-# 应用参数配置
-default_refer = DefaultRefer(args.default_refer_path, args.default_refer_text, args.default_refer_language)
+static_kv_cache = args.static_kv_cache
+fused_sampling = args.fused_sampling
+t2s_batch_size = max(1, args.batch_size)
+stream_chunk_tokens = max(0, args.stream_chunk_tokens)
+pipeline_queue_size = max(0, args.pipeline)
+token_budget = max(0, args.token_budget)
+chunk_parallel = max(1, args.chunk_parallel)
+# 切块后相邻块的 crossfade 时长(秒)
+CHUNK_CROSSFADE = 0.03
+
+# 多进程共享的状态: 默认参考音频, 须在 fork 之前创建
+shared_state = SharedState({
+    "refer_path": args.default_refer_path,
+    "refer_text": args.default_refer_text,
+    "refer_language": args.default_refer_language,
+    # 最近转发给其他 worker 的 /cancel 请求
+    "cancelled": [],
+})
+default_refer = DefaultRefer(shared_state)
 
 # 模型路径检查
 if sovits_path == "":
@@ -717,8 +1509,8 @@ if gpt_path == "":
     logger.warn(f"未指定GPT模型路径, fallback后当前值: {gpt_path}")
 
 # 指定默认参考音频, 调用方 未提供/未给全 参考音频参数时使用
-if default_refer.path == "" or default_refer.text == "" or default_refer.language == "":
-    default_refer.path, default_refer.text, default_refer.language = "", "", ""
+if not default_refer.is_ready():
+    default_refer.set("", "", "")
     logger.info("未指定默认参考音频")
 else:
     logger.info(f"默认参考音频路径: {default_refer.path}")
@@ -735,6 +1527,28 @@ if args.full_precision and args.half_precision:
     is_half = g_config.is_half  # 炒饭fallback
 logger.info(f"半精: {is_half}")
 
+# int8 动态量化只有 CPU 算子
+quantize_int8 = args.quantize == "int8"
+if quantize_int8 and device != "cpu":
+    logger.warning("int8动态量化仅支持CPU推理, 已关闭")
+    quantize_int8 = False
+if quantize_int8:
+    is_half = False
+    logger.info("T2S / BERT / HuBERT 使用int8动态量化")
+
+# 多进程: 主进程加载模型后 fork 出 worker, 共用监听 socket 和只读的模型权重
+workers = max(1, args.workers)
+if workers > 1 and (device != "cpu" or not prefork.supported()):
+    logger.warning("多进程模式仅支持 CPU 推理和有 fork 的系统, 已改为单进程")
+    workers = 1
+# 当前进程是第几个 worker, 单进程模式为 None
+worker_index = None
+if workers > 1:
+    worker_threads = args.worker_threads or max(1, (os.cpu_count() or 1) // workers)
+    # 主进程不启动 OpenMP 线程池, 子进程继承到的线程池不可用; fork 之后各 worker 再按份额设置线程数
+    torch.set_num_threads(1)
+    logger.info(f"多进程模式: {workers} 个 worker, 每个 {worker_threads} 个 torch 线程")
+
 # 流式返回模式
 if args.stream_mode.lower() in ["normal","n"]:
     stream_mode = "normal"
@@ -743,29 +1557,145 @@ else:
     stream_mode = "close"
 
 # 音频编码格式
-if args.media_type.lower() in ["aac","ogg"]:
+if args.media_type.lower() in ["aac","ogg","opus","raw"]:
     media_type = args.media_type.lower()
 elif stream_mode == "close":
     media_type = "wav"
 else:
     media_type = "ogg"
+encoder_backend = args.encoder_backend
 logger.info(f"编码格式: {media_type}")
 
-# 初始化模型
-cnhubert.cnhubert_base_path = cnhubert_base_path
-tokenizer = AutoTokenizer.from_pretrained(bert_path)
-bert_model = AutoModelForMaskedLM.from_pretrained(bert_path)
-ssl_model = cnhubert.get_model()
-if is_half:
-    bert_model = bert_model.half().to(device)
-    ssl_model = ssl_model.half().to(device)
+# 连续批处理调度器
+if args.continuous_batching:
+    t2s_scheduler = T2SScheduler(max_batch_size=args.max_batch_size)
+    logger.info(f"T2S连续批处理已开启, 最大batch: {args.max_batch_size}")
 else:
-    bert_model = bert_model.to(device)
-    ssl_model = ssl_model.to(device)
-change_sovits_weights(sovits_path)
-change_gpt_weights(gpt_path)
+    t2s_scheduler = None
+# 最近请求的首段音频耗时(ms)
+ttfa_ms = deque(maxlen=1000)
+# 进行中的推理请求, 供 /cancel/{request_id} 和断开检测取消
+request_registry = RequestRegistry()
+
+# 延迟 / 吞吐指标, -mx 开启 /metrics, -stm 开启 Server-Timing 响应头; 都不开启时计时全部为空操作
+server_timing = args.server_timing
+metrics = Metrics(enabled=args.metrics or server_timing)
+requests_total = metrics.counter("tts_requests_total", "结束的推理请求数", ["status"])
+request_seconds = metrics.histogram("tts_request_seconds", "请求从开始合成到最后一段音频的耗时")
+ttfa_seconds = metrics.histogram("tts_ttfa_seconds", "请求开始到首段音频的耗时")
+tokens_total = metrics.counter("tts_semantic_tokens_total", "T2S 生成的 semantic token 数")
+audio_seconds_total = metrics.counter("tts_audio_seconds_total", "生成的音频时长(秒), 含句间静音")
+t2s_tokens_per_second = metrics.histogram(
+    "tts_t2s_tokens_per_second", "单个请求的 T2S 解码速度", buckets=(10, 25, 50, 75, 100, 150, 200, 300, 500, 1000))
+real_time_factor = metrics.histogram(
+    "tts_real_time_factor", "合成耗时 / 音频时长, 小于1为快于实时", buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0))
+# 事件循环阻塞: 定时探测任务实际醒来比预定晚了多少, 同步的推理代码占住事件循环时这里会升高
+event_loop_lag_seconds = metrics.histogram(
+    "tts_event_loop_lag_seconds", "事件循环的阻塞时长", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+EVENT_LOOP_PROBE_INTERVAL = 0.05
+event_loop_watch = None
+if metrics.enabled and t2s_scheduler is not None:
+    t2s_scheduler.on_queue_wait = lambda seconds: metrics.stage_seconds.observe(seconds, "queue_wait")
+
+# 参考音频特征缓存
+prompt_cache = LRUCache(args.prompt_cache_mb * 1024 * 1024)
+logger.info(f"参考音频特征缓存: {args.prompt_cache_mb}MB")
+# 分段 BERT 特征缓存, 以规范化后的文本为键
+bert_cache = LRUCache(args.bert_cache_mb * 1024 * 1024)
+logger.info(f"BERT特征缓存: {args.bert_cache_mb}MB")
+# 文本前端缓存, 键里带词典版本号
+if args.frontend_cache_size > 0:
+    frontend_cache = FrontendCache(args.frontend_cache_size, args.frontend_cache_db or None)
+    set_frontend_cache(frontend_cache)
+    logger.info(f"文本前端缓存: {args.frontend_cache_size}条, 版本 {frontend_cache.version}")
+else:
+    frontend_cache = None
+# 合成结果缓存: 只缓存带 seed 的请求, 相同请求直接返回存下的编码字节
+if args.audio_cache_dir and args.audio_cache_mb > 0:
+    audio_cache = AudioCache(args.audio_cache_dir, args.audio_cache_mb * 1024 * 1024)
+    logger.info(f"合成结果缓存: {args.audio_cache_dir}, {args.audio_cache_mb}MB, 已有{audio_cache.stats()['entries']}条")
+else:
+    audio_cache = None
+# 缓存命中时每次发送的字节数
+AUDIO_CACHE_CHUNK = 64 * 1024
+
+# 按需初始化的组件: BERT / HuBERT / 语种切分 / 各语种前端 / VITS 在第一次用到时才导入和加载
+def load_bert():
+    from transformers import AutoModelForMaskedLM, AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(bert_path)
+    bert_model = AutoModelForMaskedLM.from_pretrained(bert_path)
+    bert_model = bert_model.half().to(device) if is_half else bert_model.to(device)
+    if quantize_int8:
+        quantize_linear_layers(bert_model)
+    logger.info("BERT已加载")
+    return tokenizer, bert_model
+
+
+def load_ssl_model():
+    from feature_extractor import cnhubert
+    cnhubert.cnhubert_base_path = cnhubert_base_path
+    ssl_model = cnhubert.get_model()
+    ssl_model = ssl_model.half().to(device) if is_half else ssl_model.to(device)
+    if quantize_int8:
+        quantize_linear_layers(ssl_model)
+    logger.info("HuBERT已加载")
+    return ssl_model
+
+
+def load_lang_segment():
+    from vendor.LangSegment import LangSegment
+    return LangSegment
+
+
+# 预热语种前端时用的短句, 顺带加载 jieba / g2pw / pyopenjtalk 等的词典
+FRONTEND_WARMUP = {"zh": "你好。", "en": "Hello.", "ja": "こんにちは。", "ko": "안녕하세요.", "yue": "你好。"}
+
+
+def frontend_loader(language):
+    def load():
+        return clean_text(FRONTEND_WARMUP[language], language, "v2")
+    return load
+
+
+lazy = LazyRegistry()
+lazy.register("bert", load_bert)
+lazy.register("hubert", load_ssl_model)
+lazy.register("langsegment", load_lang_segment)
+for language in FRONTEND_WARMUP:
+    lazy.register(language, frontend_loader(language))
+prewarm_names = lazy.names() + ["vits"] if args.prewarm == "all" else [name.strip() for name in args.prewarm.split(",") if name.strip()]
+
+# ONNX 推理引擎 (CPU), T2S 采样参数在导出时固定, 仅支持逐句解码
+if args.engine == "onnx":
+    from inference.onnx_engine import OnnxEngine
+    onnx_engine = OnnxEngine(args.onnx_dir, args.onnx_threads)
+    logger.info(f"ONNX推理引擎: {args.onnx_dir}, top_k固定为{onnx_engine.meta['top_k']}, 忽略请求的 top_p / temperature")
+    if t2s_batch_size > 1 or t2s_scheduler is not None or stream_chunk_tokens > 0:
+        logger.warning("ONNX推理引擎不支持 -bs / -cb / -stc, 已关闭")
+        t2s_batch_size, t2s_scheduler, stream_chunk_tokens = 1, None, 0
+else:
+    onnx_engine = None
+
+# 常驻模型池, 启动时同步加载默认模型
+model_pool = ModelPool(lambda key: ModelPair(*key), max_bytes=args.model_pool_mb * 1024 * 1024)
+model_pool.activate((gpt_path, sovits_path)).result()
 
 
+def cache_stats_rows(field):
+    caches = {"prompt": prompt_cache, "bert": bert_cache, "frontend": frontend_cache, "audio": audio_cache}
+    return [((name,), cache.stats()[field]) for name, cache in caches.items() if cache is not None]
+
+
+metrics.callback("tts_cache_hits", "缓存命中数", lambda: cache_stats_rows("hits"), ["cache"], kind="counter")
+metrics.callback("tts_cache_misses", "缓存未命中数", lambda: cache_stats_rows("misses"), ["cache"], kind="counter")
+metrics.callback("tts_cache_hit_rate", "缓存命中率", lambda: cache_stats_rows("hit_rate"), ["cache"])
+metrics.callback("tts_audio_cache_bytes_served", "合成结果缓存命中时发送的字节数",
+                 lambda: [((), audio_cache.stats()["bytes_served"])] if audio_cache is not None else [], kind="counter")
+metrics.callback("tts_active_requests", "进行中的推理请求", lambda: [((), request_registry.stats()["active"])])
+if t2s_scheduler is not None:
+    metrics.callback("tts_scheduler_queue_depth", "连续批处理排队的序列数", lambda: [((), t2s_scheduler.stats()["queue_depth"])])
+    metrics.callback("tts_scheduler_active_rows", "连续批处理正在解码的序列数", lambda: [((), t2s_scheduler.stats()["active_rows"])])
+logger.info(f"模型池内存上限: {args.model_pool_mb}MB")
 
 
 # --------------------------------
@@ -794,6 +1724,29 @@ except FileNotFoundError:
         json.dump(voices_config, f, ensure_ascii=False, indent=4)
 
 
+def save_voices_config():
+    with open(VOICES_CONFIG_FILE, 'w', encoding='utf-8') as f:
+        json.dump(voices_config, f, ensure_ascii=False, indent=4)
+
+
+def voice_refer_path(voice):
+    """
+    语音配置对应的参考: 有语音包 ("pack" 字段, 或参考音频旁边的 .voice.safetensors) 时用语音包, 否则用原始参考音频.
+    各 worker 的配置各自加载, 别的 worker 或命令行编译出的语音包按文件名找到
+    """
+    for pack in (voice.get("pack"), voice.get("path") and voice_pack_path(voice["path"])):
+        if pack and os.path.exists(pack):
+            return pack
+    return voice.get("path")
+
+
+def compile_voice_entry(voice):
+    """编译一条语音配置, "aux_paths" 中的辅助参考音频参与风格向量的平均; 语音包路径记入 "pack" 字段"""
+    pack = compile_voice(voice["path"], voice["text"], voice["language"], voice.get("aux_paths", ()), voice.get("pack"))
+    voice["pack"] = pack
+    return pack
+
+
 @app.get("/voices")
 async def get_voices():
     """获取所有可用的语音配置"""
@@ -807,20 +1760,89 @@ async def select_voice_get(id: int):
         return JSONResponse({"code": 400, "message": "无效的语音ID"}, status_code=400)
 
     voice = voices_config[id]
-    return handle_change(voice.get("path"), voice.get("text"), voice.get("language"))
+    return handle_change(voice_refer_path(voice), voice.get("text"), voice.get("language"))
+
+
+@app.get("/compile_voice/{id}")
+async def compile_voice_get(id: int):
+    """把语音配置编译成语音包, 之后 /select_voice 直接加载语音包"""
+    if id < 0 or id >= len(voices_config):
+        return JSONResponse({"code": 400, "message": "无效的语音ID"}, status_code=400)
+    try:
+        pack = await run_in_threadpool(compile_voice_entry, voices_config[id])
+    except Exception as e:
+        logger.error(f"编译语音包失败: {e}")
+        return JSONResponse({"code": 400, "message": f"编译语音包失败: {e}"}, status_code=400)
+    save_voices_config()
+    return {"code": 0, "pack": pack}
+
+
+@app.get("/cache_stats")
+async def cache_stats():
+    """参考音频特征缓存的命中统计"""
+    return {
+        "prompt_cache": prompt_cache.stats(),
+        "bert_cache": bert_cache.stats(),
+        "frontend_cache": frontend_cache.stats() if frontend_cache is not None else None,
+        "audio_cache": audio_cache.stats() if audio_cache is not None else None,
+        "model_pool": model_pool.stats(),
+        "lazy": lazy.stats(),
+        "worker": {"index": worker_index, "pid": os.getpid()},
+    }
+
+
+@app.get("/scheduler_stats")
+async def scheduler_stats():
+    """连续批处理队列深度/batch占用率, 以及最近请求的首段音频耗时"""
+    ttfa = sorted(ttfa_ms)
+    return {
+        "scheduler": t2s_scheduler.stats() if t2s_scheduler is not None else None,
+        "ttfa_ms_p50": ttfa[len(ttfa) // 2] if ttfa else 0.0,
+        "ttfa_ms_p95": ttfa[int(len(ttfa) * 0.95)] if ttfa else 0.0,
+        "requests": len(ttfa),
+        "cancellation": request_registry.stats(),
+    }
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus 文本格式的指标, 需要 -mx 开启"""
+    if not metrics.enabled:
+        return JSONResponse({"code": 404, "message": "指标未开启, 启动时加 -mx"}, status_code=404)
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.post("/cancel/{request_id}")
+@app.get("/cancel/{request_id}")
+async def cancel(request_id: str):
+    """取消进行中的推理请求, 已发送的音频不受影响"""
+    found = request_registry.cancel(request_id)
+    if found or workers == 1:
+        return {"code": 0, "cancelled": found}
+    # 不在本 worker 上: 记入共享状态, 处理该请求的 worker 在 0.1s 内发现
+    shared_state.append("cancelled", request_id, limit=256)
+    return {"code": 0, "cancelled": False, "forwarded": True}
 
 
 @app.post("/set_model")
 async def set_model(request: Request):
     json_post_raw = await request.json()
-    global gpt_path
-    gpt_path=json_post_raw.get("gpt_model_path")
-    global sovits_path
-    sovits_path=json_post_raw.get("sovits_model_path")
-    logger.info("gptpath"+gpt_path+";vitspath"+sovits_path)
-    change_sovits_weights(sovits_path)
-    change_gpt_weights(gpt_path)
-    return "ok"
+    if workers > 1:
+        # 权重只在 fork 前由主进程加载一次; 各 worker 自己加载会让每个 worker 多出一份私有权重
+        return JSONResponse({"code": 400, "message": "多进程模式下不支持切换模型, 请用新的 -s / -g 重启服务"}, status_code=400)
+    # 模型路径只存在模型池里 (wanted_key / active_key 和各 ModelPair), 不改启动时的全局 gpt_path / sovits_path
+    key = (json_post_raw.get("gpt_model_path"), json_post_raw.get("sovits_model_path"))
+    logger.info("gptpath"+key[0]+";vitspath"+key[1])
+    # 已常驻的模型立即切换; 否则后台加载, 加载完成前仍用当前模型服务
+    future = model_pool.activate(key)
+    future.add_done_callback(
+        lambda f: f.exception() is not None and logger.error(f"模型加载失败: {f.exception()}"))
+    if json_post_raw.get("wait", False):
+        try:
+            await asyncio.wrap_future(future)
+        except Exception as e:
+            return JSONResponse({"code": 400, "message": f"模型加载失败: {e}"}, status_code=400)
+    return {"code": 0, "status": "ready" if future.done() and future.exception() is None else "loading"}
 
 
 @app.post("/control")
@@ -856,7 +1878,9 @@ async def change_refer(
 @app.post("/")
 async def tts_endpoint(request: Request):
     json_post_raw = await request.json()
-    return handle(
+    return await handle(
+        request,
+        json_post_raw.get("request_id"),
         json_post_raw.get("refer_wav_path"),
         json_post_raw.get("prompt_text"),
         json_post_raw.get("prompt_language"),
@@ -866,12 +1890,15 @@ async def tts_endpoint(request: Request):
         json_post_raw.get("top_k", 10),
         json_post_raw.get("top_p", 1.0),
         json_post_raw.get("temperature", 1.0),
-        json_post_raw.get("speed", 1.0)
+        json_post_raw.get("speed", 1.0),
+        json_post_raw.get("seed"),
     )
 
 
 @app.get("/")
 async def tts_endpoint(
+        request: Request,
+        request_id: str = None,
         refer_wav_path: str = None,
         prompt_text: str = None,
         prompt_language: str = None,
@@ -881,9 +1908,143 @@ async def tts_endpoint(
         top_k: int = 10,
         top_p: float = 1.0,
         temperature: float = 1.0,
-        speed: float = 1.0
+        speed: float = 1.0,
+        seed: int = None
 ):
-    return handle(refer_wav_path, prompt_text, prompt_language, text, text_language, cut_punc, top_k, top_p, temperature, speed)
+    return await handle(request, request_id, refer_wav_path, prompt_text, prompt_language, text, text_language, cut_punc, top_k, top_p, temperature, speed, seed)
+
+
+class TTSSession:
+    """一个 WebSocket 连接上的合成参数, start 消息可以修改, 之后的句子都用这一组"""
+    FIELDS = ("refer_wav_path", "prompt_text", "prompt_language", "text_language", "top_k", "top_p", "temperature", "speed", "media_type", "seed")
+
+    def __init__(self):
+        self.refer_wav_path, self.prompt_text, self.prompt_language = default_refer.snapshot()
+        self.text_language = "zh"
+        self.top_k = 10
+        self.top_p = 1.0
+        self.temperature = 1.0
+        self.speed = 1.0
+        self.media_type = media_type
+        self.seed = None
+
+    def update(self, message):
+        """先在副本上合并并校验, 全部通过才生效; 校验失败时本连接保持原来的参数"""
+        values = {field: getattr(self, field) for field in self.FIELDS}
+        for field in self.FIELDS:
+            if message.get(field) is not None:
+                values[field] = message[field]
+        if not is_full(values["refer_wav_path"], values["prompt_text"], values["prompt_language"]):
+            raise ValueError("未指定参考音频且接口无预设")
+        for language in (values["prompt_language"], values["text_language"]):
+            if not isinstance(language, str) or language.lower() not in dict_language:
+                raise ValueError(f"不支持的语言: {language}")
+        if values["media_type"] not in MEDIA_TYPES:
+            raise ValueError(f"不支持的音频格式: {values['media_type']}")
+        if values["seed"] is not None and not isinstance(values["seed"], int):
+            raise ValueError("seed 须为整数")
+        for field, value in values.items():
+            setattr(self, field, value)
+
+
+@app.websocket("/v1/ws/tts")
+async def tts_websocket(websocket: WebSocket):
+    """
+    客户端推送 LLM 的文本增量, 服务端增量切句并依次合成, 音频按句编号流式返回.
+    收文本和合成并行: 前一句还在发送/播放时下一句已经开始合成.
+    """
+    await websocket.accept()
+    session = TTSSession()
+    segmenter = IncrementalSegmenter()
+    sentences = asyncio.Queue()
+    seq = 0
+    # cancel 消息取消当前句子和排队的句子, 之后的句子换用新的 token
+    token = CancelToken()
+
+    async def enqueue(texts):
+        nonlocal seq
+        for text in texts:
+            await sentences.put((seq, text))
+            seq += 1
+
+    def cancel_pending():
+        nonlocal token
+        token.cancel("client cancel")
+        token = CancelToken()
+        segmenter.reset()
+        while not sentences.empty():
+            sentences.get_nowait()
+
+    async def receive():
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                await websocket.send_json({"type": "error", "message": "消息不是合法的json"})
+                continue
+            kind = message.get("type")
+            if kind == "start":
+                try:
+                    session.update(message)
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "message": str(e)})
+            elif kind == "text":
+                await enqueue(segmenter.push(message.get("text", "")))
+            elif kind == "flush":
+                await enqueue(segmenter.flush())
+            elif kind == "cancel":
+                cancel_pending()
+                await websocket.send_json({"type": "cancelled", "seq": seq})
+            elif kind == "end":
+                await enqueue(segmenter.flush())
+                await sentences.put(None)
+                return
+            else:
+                await websocket.send_json({"type": "error", "message": f"未知消息类型: {kind}"})
+
+    async def synthesize_sentences():
+        while True:
+            item = await sentences.get()
+            if item is None:
+                break
+            n, text = item
+            sentence_token = token
+            await websocket.send_json({"type": "sentence_start", "seq": n, "text": text})
+            header = struct.pack(">I", n)
+            try:
+                chunks = get_tts_wav(
+                    session.refer_wav_path, session.prompt_text, session.prompt_language, text, session.text_language,
+                    session.top_k, session.top_p, session.temperature, session.speed,
+                    fmt=session.media_type, streaming=True, cancel_token=sentence_token, seed=session.seed,
+                )
+                async for chunk in iterate_in_threadpool(chunks):
+                    await websocket.send_bytes(header + chunk)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.error(f"WebSocket 合成失败: {e}", exc_info=True)
+                await websocket.send_json({"type": "error", "seq": n, "message": str(e)})
+            await websocket.send_json({"type": "sentence_end", "seq": n})
+        await websocket.send_json({"type": "done"})
+
+    try:
+        session.update({})
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+    receiver = asyncio.create_task(receive())
+    synthesizer = asyncio.create_task(synthesize_sentences())
+    try:
+        done, _ = await asyncio.wait({receiver, synthesizer}, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+        await synthesizer
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info("WebSocket 客户端已断开")
+    finally:
+        token.cancel("disconnected")
+        receiver.cancel()
+        synthesizer.cancel()
 
 
 import os
@@ -912,27 +2073,43 @@ from fastapi.responses import StreamingResponse, JSONResponse
 # 或者你需要根据你的项目结构调整
 # sys.path.append(os.path.join(now_dir, "moegoe")) # 一种可能的处理方式，如果直接 from .moegoe 不工作
 
-try:
-    from .moegoe import utils as vits_utils
-    from .moegoe.models import SynthesizerTrn as VitsSynthesizerTrn
-    from .moegoe.text import text_to_sequence as vits_text_to_sequence
-    from .moegoe.text import _clean_text as vits_clean_text # 如果需要
-    from .moegoe import commons as vits_commons
-    # 如果 MoeGoe 使用 scipy.io.wavfile, 你可能需要它，或者用 soundfile 替代
-    # from scipy.io.wavfile import write as vits_write_wav
-except ImportError as e:
-    sys.path.append(os.path.join(now_dir, "moegoe"))
-    from moegoe import utils as vits_utils
-    from moegoe.models import SynthesizerTrn as VitsSynthesizerTrn
-    from moegoe.text import text_to_sequence as vits_text_to_sequence
-    from moegoe.text import _clean_text as vits_clean_text # 如果需要
-    from moegoe import commons as vits_commons
-    logger.error(f"Failed to import MoeGoe submodule components. Ensure 'moegoe' is a valid submodule/package in the path: {e}")
-    # 你可以在这里决定是否因为导入失败而退出程序
-    # sys.exit(1)
-    # 为了示例继续，我们假设导入成功，但在实际应用中需要处理这个错误
+# 整个 moegoe 栈在第一次加载 VITS 模型时才导入
+vits_utils = None
+VitsSynthesizerTrn = None
+vits_text_to_sequence = None
+vits_clean_text = None
+vits_commons = None
+
+
+def import_vits():
+    global vits_utils, VitsSynthesizerTrn, vits_text_to_sequence, vits_clean_text, vits_commons
+    if vits_utils is not None:
+        return
+    try:
+        from .moegoe import utils as _utils
+        from .moegoe.models import SynthesizerTrn as _SynthesizerTrn
+        from .moegoe.text import text_to_sequence as _text_to_sequence
+        from .moegoe.text import _clean_text # 如果需要
+        from .moegoe import commons as _commons
+        # 如果 MoeGoe 使用 scipy.io.wavfile, 你可能需要它，或者用 soundfile 替代
+        # from scipy.io.wavfile import write as vits_write_wav
+    except ImportError as e:
+        sys.path.append(os.path.join(now_dir, "moegoe"))
+        from moegoe import utils as _utils
+        from moegoe.models import SynthesizerTrn as _SynthesizerTrn
+        from moegoe.text import text_to_sequence as _text_to_sequence
+        from moegoe.text import _clean_text # 如果需要
+        from moegoe import commons as _commons
+        logger.error(f"Failed to import MoeGoe submodule components. Ensure 'moegoe' is a valid submodule/package in the path: {e}")
+    VitsSynthesizerTrn, vits_text_to_sequence, vits_clean_text, vits_commons = _SynthesizerTrn, _text_to_sequence, _clean_text, _commons
+    vits_utils = _utils
 
 # --- VITS/MoeGoe 全局状态 ---
+# VITS 推理全部在这一个线程里执行, 事件循环不会被合成阻塞; 并发请求的批次在此排队
+vits_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vits")
+vits_batch_size = max(1, args.vits_batch_size)
+# 句间静音时长(秒)
+VITS_SENTENCE_GAP = 0.15
 vits_hps_global = None
 vits_net_g_global = None
 vits_speakers_global = None # 通常是一个列表或字典
@@ -954,6 +2131,7 @@ def load_vits_model(model_path: str, config_path: str):
     logger.info(f"Loading VITS config from: {config_path}")
 
     try:
+        import_vits()
         vits_hps_global = vits_utils.get_hparams_from_file(config_path)
         vits_n_symbols_global = len(vits_hps_global.symbols) if hasattr(vits_hps_global, 'symbols') else 0
         n_speakers_vits = getattr(vits_hps_global.data, 'n_speakers', 0) # 使用 getattr 更安全
@@ -1001,6 +2179,45 @@ def vits_get_text_internal(text: str, hps, cleaned: bool = False):
     text_norm = LongTensor(text_norm)
     return text_norm
 
+def split_vits_sentences(text):
+    """按句末和逗号类标点切句, 每句单独合成; 纯标点的句子丢弃"""
+    segmenter = IncrementalSegmenter()
+    return segmenter.push(text) + segmenter.flush()
+
+
+def vits_batches(sentences):
+    """第一句单独成批, 尽快产出首段音频; 之后每 -vb 句一批"""
+    yield sentences[:1]
+    for start in range(1, len(sentences), vits_batch_size):
+        yield sentences[start:start + vits_batch_size]
+
+
+def vits_synthesize_batch(net_g, hps, sentences, language_code, cleaned, speaker_id, length_scale, noise_scale, noise_scale_w):
+    """
+    在 VITS 专用线程里执行: 多句的音素序列补齐到同一长度, 带 x_lengths 一次 infer,
+    再按 y_mask 给出的各句帧数切出各自的音频. 返回每句的 float32 音频
+    """
+    sequences = [vits_get_text_internal(f"[{language_code}]{sentence}[{language_code}]", hps, cleaned=cleaned) for sentence in sentences]
+    x_lengths = LongTensor([seq.size(0) for seq in sequences])
+    x = torch.zeros((len(sequences), int(x_lengths.max())), dtype=torch.long)
+    for i, seq in enumerate(sequences):
+        x[i, :seq.size(0)] = seq
+    with no_grad():
+        # MoeGoe 的 infer 返回 `o, attn, y_mask, (z, z_p, m_p, logs_p)`, o 为 (batch, 1, 最长帧数 * hop_length)
+        o, attn, y_mask, _ = net_g.infer(
+            x.to(device),
+            x_lengths.to(device),
+            sid=LongTensor([speaker_id] * len(sequences)).to(device),
+            noise_scale=noise_scale,
+            noise_scale_w=noise_scale_w,
+            length_scale=length_scale,
+            emotion_embedding=None,
+        )
+        n_samples = (y_mask.sum([1, 2]) * hps.data.hop_length).long().tolist()
+        audio = o[:, 0].data.cpu().float().numpy()
+    return [audio[i, :n] for i, n in enumerate(n_samples)]
+
+
 async def get_vits_tts_audio_stream(
     text: str,
     language_code: str,
@@ -1013,6 +2230,7 @@ async def get_vits_tts_audio_stream(
 ):
     """
     VITS TTS 核心推理逻辑，作为异步生成器返回音频块。
+    文本按句切分, 在 VITS 专用线程里分批合成, 事件循环只负责等待和发送; 每批合成完即编码发送, 整个响应是一个连续的音频流
     """
     global vits_hps_global, vits_net_g_global, vits_speakers_global, device, is_half, logger, stream_mode, media_type
 
@@ -1020,117 +2238,50 @@ async def get_vits_tts_audio_stream(
         logger.error("VITS Model not loaded. Cannot perform TTS.")
         yield b'ERROR:VITS Model not loaded.'
         return
+    # 固定请求开始时的模型, 期间 /set_vits_model 切换不影响本次合成
+    net_g, hps = vits_net_g_global, vits_hps_global
 
     # 1. 文本预处理和语言标记解析 (关键部分)
-    text = f"[{language_code}]{text}[{language_code}]"
-    print(text)
     cleaned_flag = "[CLEANED]" in text # 你仍然可以保留这个标记，如果需要
-    if cleaned_flag:
-        processed_text = text.replace("[CLEANED]", "")
-    else:
-        processed_text = text
+    processed_text = text.replace("[CLEANED]", "")
+    sentences = split_vits_sentences(processed_text)
 
-    if not processed_text.strip():
+    if not sentences:
         logger.error("Processed text for VITS is empty.")
         yield b'ERROR:Processed text is empty.'
         return
 
     # 2. 检查 Speaker ID
-    actual_n_speakers = getattr(vits_hps_global.data, 'n_speakers', 0)
+    actual_n_speakers = getattr(hps.data, 'n_speakers', 0)
     if not (0 <= speaker_id < actual_n_speakers):
         logger.error(f"Invalid VITS Speaker ID: {speaker_id}. Expected 0 to {actual_n_speakers - 1}.")
         yield b'ERROR:Invalid VITS Speaker ID.'
         return
 
-    # 3. 将文本转换为音素序列
+    # 3. 分批推理, 每批完成后立即编码发送
+    loop = asyncio.get_running_loop()
+    current_sampling_rate = hps.data.sampling_rate
+    joiner = PaddingJoiner(np.zeros(int(current_sampling_rate * VITS_SENTENCE_GAP), dtype=np.float32))
+    encoder = open_encoder(media_type, current_sampling_rate, encoder_backend)
     try:
-        # 注意：这里传入的 `processed_text` 应该是纯净的、该语言的文本
-        # `vits_hps_global` 应该包含对应语言的 `symbols` 和 `text_cleaners`
-        stn_tst = vits_get_text_internal(processed_text, vits_hps_global, cleaned=cleaned_flag)
-    except Exception as e:
-        logger.error(f"Error during VITS text processing: {e}", exc_info=True)
-        yield b'ERROR:VITS text processing failed.'
-        return
-
-    # 4. 执行推理
-    audio_output_buffer = BytesIO() # 用于收集所有音频块（如果非流式）或当前块
-    try:
-        with no_grad(): # 确保在推理模式下
-            x_tst = stn_tst.unsqueeze(0).to(device)
-            x_tst_lengths = LongTensor([stn_tst.size(0)]).to(device)
-            sid_tensor = LongTensor([speaker_id]).to(device)
-            current_emotion_embedding = None # 实现情感嵌入加载逻辑（如果需要）
-
-            # 调用 VITS 模型的 infer 方法
-            # 注意：确保你的 VitsSynthesizerTrn.infer 方法返回的是 (audio_numpy_array, ...)
-            # 并且第一个元素是音频数据
-            # MoeGoe的infer返回 `o, attn, y_mask, (z, z_p, m_p, logs_p)`
-            # 我们需要 o[0][0,0].data.cpu().float().numpy()
-            inference_output = vits_net_g_global.infer(
-                x_tst,
-                x_tst_lengths,
-                sid=sid_tensor,
-                noise_scale=noise_scale,
-                noise_scale_w=noise_scale_w,
-                length_scale=length_scale,
-                emotion_embedding=current_emotion_embedding # 传递情感嵌入
-            )
-            audio_numpy = inference_output[0][0, 0].data.cpu().float().numpy()
-
-        # 5. 音频打包和流式处理
-        # 使用 GPT-SoVITS 的 pack_audio, pack_wav (全局函数)
-        # 注意：pack_audio 和 pack_wav 是从 GPT-SoVITS 的 api.py 来的，需要确保它们在作用域内
-        # 我们假设它们是全局可用的
-        audio_data_int16 = (audio_numpy * 32768).astype(np.int16)
-        current_sampling_rate = vits_hps_global.data.sampling_rate
-
-        # MoeGoe/VITS 通常一次性生成整个音频，所以“流式”在这里主要是指
-        # 服务器可以分块发送已生成的完整音频，而不是边生成边发送小片段。
-        # 如果你想实现真正的逐句流式，需要在 get_vits_tts_audio_stream 外层做文本切分和循环调用。
-        # 这里我们简化为一次生成并发送。
-
-        if stream_mode == "normal": # 分块发送已生成的音频 (如果音频很大)
-            # 对于 'normal' 流式，我们将完整的音频数据打包成目标格式，然后可以分块 yield
-            # 但由于 VITS 一次生成，这里简单地一次性 yield
-            temp_buffer = BytesIO()
-            if media_type == "wav":
-                sf.write(temp_buffer, audio_data_int16, current_sampling_rate, format='WAV')
-            elif media_type == "ogg":
-                sf.write(temp_buffer, audio_data_int16, current_sampling_rate, format='OGG', subtype='VORBIS')
-            elif media_type == "aac":
-                # 使用 pack_aac (来自GPT-SoVITS api.py)
-                process = subprocess.Popen([
-                    'ffmpeg', '-f', 's16le', '-ar', str(current_sampling_rate), '-ac', '1', '-i', 'pipe:0',
-                    '-c:a', 'aac', '-b:a', '192k', '-vn', '-f', 'adts', 'pipe:1'
-                ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                out_aac, _ = process.communicate(input=audio_data_int16.tobytes())
-                temp_buffer.write(out_aac)
-            else: # 默认为 wav
-                 sf.write(temp_buffer, audio_data_int16, current_sampling_rate, format='WAV')
-            temp_buffer.seek(0)
-            yield temp_buffer.read() # 一次性 yield
-        else: # "close" 模式，也是一次性生成和发送
-            if media_type == "wav":
-                sf.write(audio_output_buffer, audio_data_int16, current_sampling_rate, format='WAV')
-            elif media_type == "ogg":
-                sf.write(audio_output_buffer, audio_data_int16, current_sampling_rate, format='OGG', subtype='VORBIS')
-            elif media_type == "aac":
-                process = subprocess.Popen([
-                    'ffmpeg', '-f', 's16le', '-ar', str(current_sampling_rate), '-ac', '1', '-i', 'pipe:0',
-                    '-c:a', 'aac', '-b:a', '192k', '-vn', '-f', 'adts', 'pipe:1'
-                ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                out_aac, _ = process.communicate(input=audio_data_int16.tobytes())
-                audio_output_buffer.write(out_aac)
-            else: # 默认为 wav
-                sf.write(audio_output_buffer, audio_data_int16, current_sampling_rate, format='WAV')
-
-            audio_output_buffer.seek(0)
-            yield audio_output_buffer.getvalue()
-
-    except Exception as e:
-        logger.error(f"Error during VITS TTS inference or audio packing: {e}", exc_info=True)
-        yield b'ERROR:VITS TTS inference failed.'
-        return
+        for batch in vits_batches(sentences):
+            try:
+                audios = await loop.run_in_executor(
+                    vits_executor, vits_synthesize_batch, net_g, hps, batch, language_code, cleaned_flag,
+                    speaker_id, length_scale, noise_scale, noise_scale_w)
+            except Exception as e:
+                logger.error(f"Error during VITS TTS inference: {e}", exc_info=True)
+                yield b'ERROR:VITS TTS inference failed.'
+                return
+            pcm = to_pcm16(np.concatenate([joiner.push(audio) for audio in audios]))
+            chunk = await run_in_threadpool(encoder.write, pcm)
+            if chunk:
+                yield chunk
+        tail = await run_in_threadpool(encoder.close)
+        if tail:
+            yield tail
+    finally:
+        encoder.abort()
 
 # --- FastAPI 端点定义 (VITS/MoeGoe 相关) ---
 # 假设 app = FastAPI() 已经在 api.py 中定义
@@ -1151,7 +2302,8 @@ async def set_vits_model_endpoint(request: Request):
             )
         # 路径可以是相对 api.py 的，或者绝对路径
         # 为安全起见，最好对路径进行一些校验或限制
-        load_vits_model(vits_model_path, vits_config_path)
+        # 在 VITS 线程里加载, 不阻塞事件循环, 也不会与进行中的批次交错
+        await asyncio.get_running_loop().run_in_executor(vits_executor, load_vits_model, vits_model_path, vits_config_path)
         return JSONResponse({"code": 0, "message": "VITS model changed successfully."}, status_code=200)
     except FileNotFoundError as fe:
         logger.error(f"File not found when setting VITS model: {fe}")
@@ -1174,7 +2326,11 @@ async def _handle_vits_tts_request(
     if not text:
         raise HTTPException(status_code=400, detail="Text is required for VITS TTS")
     if vits_net_g_global is None:
-        raise HTTPException(status_code=503, detail="VITS Model not loaded. Use /set_vits_model first.")
+        # 未通过 /set_vits_model 指定时, 第一次请求加载默认模型
+        try:
+            await asyncio.to_thread(lazy["vits"].get)
+        except FileNotFoundError:
+            raise HTTPException(status_code=503, detail="VITS Model not loaded. Use /set_vits_model first.")
 
     # 创建一个包装生成器来处理可能的错误标记并转换为HTTPException（如果非流式）
     # 或者让客户端处理流中的错误标记
@@ -1198,7 +2354,7 @@ async def _handle_vits_tts_request(
                 raise HTTPException(status_code=500, detail=f"VITS TTS failed: {error_message}")
             yield chunk
 
-    return StreamingResponse(stream_wrapper(), media_type="audio/" + media_type)
+    return StreamingResponse(stream_wrapper(), media_type=MEDIA_TYPES[media_type])
 
 
 @app.post("/vits-tts/")
@@ -1249,20 +2405,83 @@ async def vits_tts_endpoint_get(
         logger.error(f"Unexpected error in /vits-tts/ GET endpoint: {e}", exc_info=True)
         return JSONResponse({"code": 500, "message": f"Internal server error: {str(e)}"}, status_code=500)
 
-if __name__ == "__main__":
-       # 假设 g_config 已经从 config.py 或命令行参数初始化
+def load_default_vits():
+    """默认 VITS 模型, 第一次 VITS 请求或预热时加载"""
+    # 假设 g_config 已经从 config.py 或命令行参数初始化
     default_vits_model_path_from_config = getattr(g_config, 'vits_model_path', os.path.join(now_dir, "moegoe", "lib", "seraphim.pth"))
     default_vits_config_path_from_config = getattr(g_config, 'vits_config_path', os.path.join(now_dir, "moegoe", "lib", "seraphim.json"))
 
-    if default_vits_model_path_from_config and default_vits_config_path_from_config and \
-        os.path.exists(default_vits_model_path_from_config) and \
-        os.path.exists(default_vits_config_path_from_config):
-        try:
-           logger.info("Loading default VITS model on startup...")
-           load_vits_model(default_vits_model_path_from_config, default_vits_config_path_from_config)
-        except Exception as e:
-           logger.error(f"Failed to load default VITS model on startup: {e}", exc_info=True)
+    if not (default_vits_model_path_from_config and default_vits_config_path_from_config and
+            os.path.exists(default_vits_model_path_from_config) and
+            os.path.exists(default_vits_config_path_from_config)):
+        logger.warning("Default VITS model or config path not found or not specified in config.py. "
+                       "Use /set_vits_model API to load a VITS model.")
+        raise FileNotFoundError(default_vits_model_path_from_config)
+    logger.info("Loading default VITS model...")
+    load_vits_model(default_vits_model_path_from_config, default_vits_config_path_from_config)
+    return vits_net_g_global
+
+
+lazy.register("vits", load_default_vits)
+
+
+def on_prewarm_error(name, e):
+    logger.error(f"预热 {name} 失败: {e}")
+
+
+@app.on_event("startup")
+def prewarm():
+    if not prewarm_names:
+        return
+    logger.info(f"预热: {', '.join(prewarm_names)}")
+    lazy.prewarm(prewarm_names, background=not args.prewarm_blocking, on_error=on_prewarm_error)
+
+
+async def watch_event_loop():
+    loop = asyncio.get_running_loop()
+    while True:
+        t = loop.time()
+        await asyncio.sleep(EVENT_LOOP_PROBE_INTERVAL)
+        event_loop_lag_seconds.observe(max(0.0, loop.time() - t - EVENT_LOOP_PROBE_INTERVAL))
+
+
+@app.on_event("startup")
+async def start_event_loop_watch():
+    global event_loop_watch
+    if metrics.enabled:
+        event_loop_watch = asyncio.get_running_loop().create_task(watch_event_loop())
+
+
+def init_worker(index):
+    """fork 出的 worker 开始接受连接之前调用"""
+    global worker_index
+    worker_index = index
+    torch.set_num_threads(worker_threads)
+    model_pool.after_fork()
+    if frontend_cache is not None:
+        frontend_cache.after_fork()
+    logger.info(f"worker {index} (pid {os.getpid()}) 已启动")
+
+
+if __name__ == "__main__":
+    if args.compile_voices:
+        failed = 0
+        for i, voice in enumerate(voices_config):
+            t = ttime()
+            try:
+                pack = compile_voice_entry(voice)
+            except Exception as e:
+                failed += 1
+                logger.error(f"语音 {i} ({voice.get('name')}) 编译失败: {e}")
+                continue
+            logger.info(f"语音 {i} ({voice.get('name')}) -> {pack}, {(ttime() - t) * 1000:.0f}ms")
+        save_voices_config()
+        exit(1 if failed else 0)
+    if workers > 1:
+        # BERT / HuBERT 和要预热的组件也在 fork 之前加载, 由所有 worker 共享
+        lazy.prewarm(["bert", "hubert"] + prewarm_names, background=False, on_error=on_prewarm_error)
+        server = prefork.PreforkServer(app, host, port, workers, on_worker_start=init_worker)
+        if server.run():
+            os.execl(g_config.python_exec, g_config.python_exec, *sys.argv)
     else:
-       logger.warning("Default VITS model or config path not found or not specified in config.py. "
-                      "Use /set_vits_model API to load a VITS model.")
-    uvicorn.run(app, host=host, port=port, workers=1)
+        uvicorn.run(app, host=host, port=port, workers=1)